@@ -0,0 +1,32 @@
+"""Add applied_writes (idempotency keys of buffered writes)
+
+Revision ID: 5e2a9c7d1f84
+Revises: d4b7e19a3c52
+Create Date: 2026-10-18 19:02:47.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a9c7d1f84'
+down_revision: Union[str, Sequence[str], None] = 'd4b7e19a3c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('applied_writes',
+    sa.Column('key', sa.String(length=32), nullable=False),
+    sa.Column('applied_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('applied_writes')
@@ -0,0 +1,43 @@
+"""Add composite indexes for hot queries
+
+Revision ID: 64260c3d67f6
+Revises: e2398e8ed0c5
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '64260c3d67f6'
+down_revision: Union[str, Sequence[str], None] = 'e2398e8ed0c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # max(cycle_no) for the next cycle + per-row lookups in the cycle editor
+    op.create_index(
+        'ix_cycles_cell_id_cycle_no', 'cycles', ['cell_id', 'cycle_no'], unique=False
+    )
+    # dashboard aggregate: GROUP BY cell_id, max(created_at)
+    op.create_index(
+        'ix_cycles_cell_id_created_at',
+        'cycles',
+        ['cell_id', 'created_at'],
+        unique=False,
+    )
+    # running-cell lists and the "is this channel busy" check
+    op.create_index(
+        'ix_cells_status_channel', 'cells', ['status', 'channel'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cells_status_channel', table_name='cells')
+    op.drop_index('ix_cycles_cell_id_created_at', table_name='cycles')
+    op.drop_index('ix_cycles_cell_id_cycle_no', table_name='cycles')
@@ -0,0 +1,29 @@
+"""Index applied_writes.applied_at (pruning of old idempotency keys)
+
+Revision ID: 7c1d5a9e3f28
+Revises: 8b3f6d2e1a97
+Create Date: 2026-10-18 21:03:12.417206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d5a9e3f28'
+down_revision: Union[str, Sequence[str], None] = '8b3f6d2e1a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_applied_writes_applied_at', 'applied_writes', ['applied_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_applied_writes_applied_at', table_name='applied_writes')
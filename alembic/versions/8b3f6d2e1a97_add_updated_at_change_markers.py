@@ -0,0 +1,35 @@
+"""Add updated_at change markers to cells and cycles
+
+Revision ID: 8b3f6d2e1a97
+Revises: 5e2a9c7d1f84
+Create Date: 2026-10-18 20:14:36.081527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3f6d2e1a97'
+down_revision: Union[str, Sequence[str], None] = '5e2a9c7d1f84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMNs (no batch table rebuild, which would drop the FTS
+    # triggers on SQLite). Existing rows stay NULL: the read replica copies
+    # everything on its first sync and only needs the marker for later edits.
+    op.add_column('cells', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('cycles', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_cycles_updated_at', 'cycles', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cycles_updated_at', table_name='cycles')
+    op.drop_column('cycles', 'updated_at')
+    op.drop_column('cells', 'updated_at')
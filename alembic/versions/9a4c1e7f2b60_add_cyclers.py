@@ -0,0 +1,72 @@
+"""Add cyclers and cells.cycler_id
+
+Revision ID: 9a4c1e7f2b60
+Revises: c81f4a2d6e07
+Create Date: 2026-10-18 15:02:44.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c1e7f2b60'
+down_revision: Union[str, Sequence[str], None] = 'c81f4a2d6e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_CYCLER = 'Cycler 1'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cyclers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('channel_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.add_column('cells', sa.Column('cycler_id', sa.Integer(), nullable=True))
+    # SQLite can't add a constraint to an existing table, and a batch
+    # (copy-and-rename) migration would drop the cells FTS triggers
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key(
+            'fk_cells_cycler_id_cyclers', 'cells', 'cyclers', ['cycler_id'], ['id']
+        )
+    op.create_index(
+        'ix_cells_cycler_id_channel_status',
+        'cells',
+        ['cycler_id', 'channel', 'status'],
+        unique=False,
+    )
+
+    # --- Every existing cell was on the one 8-channel cycler ---
+    conn = op.get_bind()
+    max_channel = conn.execute(sa.text('SELECT max(channel) FROM cells')).scalar()
+    cyclers = sa.table(
+        'cyclers',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('channel_count', sa.Integer),
+    )
+    conn.execute(
+        cyclers.insert().values(
+            name=DEFAULT_CYCLER, channel_count=max(8, max_channel or 0)
+        )
+    )
+    default_id = conn.execute(
+        sa.select(cyclers.c.id).where(cyclers.c.name == DEFAULT_CYCLER)
+    ).scalar()
+    conn.execute(sa.text('UPDATE cells SET cycler_id = :id'), {'id': default_id})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cells_cycler_id_channel_status', table_name='cells')
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint('fk_cells_cycler_id_cyclers', 'cells', type_='foreignkey')
+    op.drop_column('cells', 'cycler_id')
+    op.drop_table('cyclers')
@@ -0,0 +1,105 @@
+"""Add cell_stats summary table
+
+Revision ID: b5e0c2a4d913
+Revises: 64260c3d67f6
+Create Date: 2026-10-18 10:02:17.554630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e0c2a4d913'
+down_revision: Union[str, Sequence[str], None] = '64260c3d67f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cell_stats',
+    sa.Column('cell_id', sa.Integer(), nullable=False),
+    sa.Column('cycle_count', sa.Integer(), nullable=False),
+    sa.Column('last_cycle_no', sa.Integer(), nullable=True),
+    sa.Column('last_update', sa.DateTime(), nullable=True),
+    sa.Column('last_ce_pct', sa.Float(), nullable=True),
+    sa.Column('last_delta_V', sa.Float(), nullable=True),
+    sa.Column('last_capacity_mAh', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['cell_id'], ['cells.id'], ),
+    sa.PrimaryKeyConstraint('cell_id')
+    )
+
+    # --- Backfill from the existing cycles (same result as rebuild_cell_stats) ---
+    cells = sa.table('cells', sa.column('id', sa.Integer))
+    cycles = sa.table(
+        'cycles',
+        sa.column('id', sa.Integer),
+        sa.column('cell_id', sa.Integer),
+        sa.column('cycle_no', sa.Integer),
+        sa.column('created_at', sa.DateTime),
+        sa.column('ce_pct', sa.Float),
+        sa.column('delta_V', sa.Float),
+        sa.column('capacity_mAh', sa.Float),
+    )
+    cell_stats = sa.table(
+        'cell_stats',
+        sa.column('cell_id', sa.Integer),
+        sa.column('cycle_count', sa.Integer),
+        sa.column('last_cycle_no', sa.Integer),
+        sa.column('last_update', sa.DateTime),
+        sa.column('last_ce_pct', sa.Float),
+        sa.column('last_delta_V', sa.Float),
+        sa.column('last_capacity_mAh', sa.Float),
+    )
+
+    agg = (
+        sa.select(
+            cycles.c.cell_id,
+            sa.func.count(cycles.c.id).label('cycle_count'),
+            sa.func.max(cycles.c.cycle_no).label('last_cycle_no'),
+            sa.func.max(cycles.c.created_at).label('last_update'),
+        )
+        .group_by(cycles.c.cell_id)
+        .subquery('agg')
+    )
+    # newest row of the highest cycle_no per cell
+    last_id = (
+        sa.select(sa.func.max(cycles.c.id))
+        .where(
+            cycles.c.cell_id == agg.c.cell_id,
+            cycles.c.cycle_no == agg.c.last_cycle_no,
+        )
+        .scalar_subquery()
+    )
+    last = cycles.alias('last')
+    backfill = (
+        sa.select(
+            cells.c.id,
+            sa.func.coalesce(agg.c.cycle_count, 0),
+            agg.c.last_cycle_no,
+            agg.c.last_update,
+            last.c.ce_pct,
+            last.c.delta_V,
+            last.c.capacity_mAh,
+        )
+        .select_from(cells)
+        .outerjoin(agg, agg.c.cell_id == cells.c.id)
+        .outerjoin(last, last.c.id == last_id)
+    )
+    op.execute(
+        cell_stats.insert().from_select(
+            [
+                'cell_id', 'cycle_count', 'last_cycle_no', 'last_update',
+                'last_ce_pct', 'last_delta_V', 'last_capacity_mAh',
+            ],
+            backfill,
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cell_stats')
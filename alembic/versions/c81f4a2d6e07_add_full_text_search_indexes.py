@@ -0,0 +1,101 @@
+"""Add full-text search indexes for the cell selector
+
+Revision ID: c81f4a2d6e07
+Revises: 3f9d7be21c58
+Create Date: 2026-10-18 13:40:52.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4a2d6e07'
+down_revision: Union[str, Sequence[str], None] = '3f9d7be21c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same statements as models/base.py (copied so this revision never changes)
+SQLITE_UPGRADE = [
+    "CREATE INDEX ix_cells_cell_id_nocase ON cells (cell_id COLLATE NOCASE)",
+    "CREATE VIRTUAL TABLE cells_fts USING fts5("
+    "cell_id, notes, content='cells', content_rowid='id')",
+    "CREATE TRIGGER cells_fts_ai AFTER INSERT ON cells BEGIN "
+    "INSERT INTO cells_fts(rowid, cell_id, notes) "
+    "VALUES (new.id, new.cell_id, new.notes); END",
+    "CREATE TRIGGER cells_fts_ad AFTER DELETE ON cells BEGIN "
+    "INSERT INTO cells_fts(cells_fts, rowid, cell_id, notes) "
+    "VALUES ('delete', old.id, old.cell_id, old.notes); END",
+    "CREATE TRIGGER cells_fts_au AFTER UPDATE OF cell_id, notes ON cells BEGIN "
+    "INSERT INTO cells_fts(cells_fts, rowid, cell_id, notes) "
+    "VALUES ('delete', old.id, old.cell_id, old.notes); "
+    "INSERT INTO cells_fts(rowid, cell_id, notes) "
+    "VALUES (new.id, new.cell_id, new.notes); END",
+    "CREATE VIRTUAL TABLE cycles_fts USING fts5("
+    "observation, content='cycles', content_rowid='id')",
+    "CREATE TRIGGER cycles_fts_ai AFTER INSERT ON cycles BEGIN "
+    "INSERT INTO cycles_fts(rowid, observation) "
+    "VALUES (new.id, new.observation); END",
+    "CREATE TRIGGER cycles_fts_ad AFTER DELETE ON cycles BEGIN "
+    "INSERT INTO cycles_fts(cycles_fts, rowid, observation) "
+    "VALUES ('delete', old.id, old.observation); END",
+    "CREATE TRIGGER cycles_fts_au AFTER UPDATE OF observation ON cycles BEGIN "
+    "INSERT INTO cycles_fts(cycles_fts, rowid, observation) "
+    "VALUES ('delete', old.id, old.observation); "
+    "INSERT INTO cycles_fts(rowid, observation) "
+    "VALUES (new.id, new.observation); END",
+    # index the rows that already exist
+    "INSERT INTO cells_fts(cells_fts) VALUES ('rebuild')",
+    "INSERT INTO cycles_fts(cycles_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    *[
+        f"DROP TRIGGER {table}_fts_{event}"
+        for table in ("cycles", "cells")
+        for event in ("ai", "ad", "au")
+    ],
+    "DROP TABLE cycles_fts",
+    "DROP TABLE cells_fts",
+    "DROP INDEX ix_cells_cell_id_nocase",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE INDEX ix_cells_cell_id_lower ON cells (lower(cell_id) text_pattern_ops)",
+    "CREATE INDEX ix_cells_cell_id_fts ON cells "
+    "USING gin (to_tsvector('simple'::regconfig, coalesce(cell_id, ''::text)))",
+    "CREATE INDEX ix_cells_notes_fts ON cells "
+    "USING gin (to_tsvector('english'::regconfig, coalesce(notes, ''::text)))",
+    "CREATE INDEX ix_cycles_observation_fts ON cycles "
+    "USING gin (to_tsvector('english'::regconfig, coalesce(observation, ''::text)))",
+]
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX ix_cycles_observation_fts",
+    "DROP INDEX ix_cells_notes_fts",
+    "DROP INDEX ix_cells_cell_id_fts",
+    "DROP INDEX ix_cells_cell_id_lower",
+]
+
+
+def _run(statements) -> None:
+    for sql in statements:
+        op.execute(sa.text(sql))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_DOWNGRADE)
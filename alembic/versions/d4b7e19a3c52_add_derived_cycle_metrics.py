@@ -0,0 +1,34 @@
+"""Add derived cycle metrics
+
+Revision ID: d4b7e19a3c52
+Revises: 9a4c1e7f2b60
+Create Date: 2026-10-18 17:41:19.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b7e19a3c52'
+down_revision: Union[str, Sequence[str], None] = '9a4c1e7f2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ['voltage_efficiency_pct', 'energy_efficiency_pct', 'normalized_capacity']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMNs (no batch table rebuild, which would drop the FTS
+    # triggers on SQLite). Fill them with: python scripts/recompute_metrics.py
+    for name in COLUMNS:
+        op.add_column('cycles', sa.Column(name, sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in reversed(COLUMNS):
+        op.drop_column('cycles', name)
@@ -1,100 +1,128 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import func
+from datetime import datetime
 from zoneinfo import ZoneInfo # For timezone conversion
 
 # Imports updated
 from database import get_db
-from models.base import Cell, Cycle
+from models.base import Cell
+from services import outbox, queries, querylog, warmup
+from services.live import LiveBoard
 
 st.set_page_config(layout="wide")
+querylog.begin(__file__)
+warmup.start()  # heavy imports + caches in the background, once
 st.header("📊 Cycler Dashboard")
+outbox.status_line()  # pending writes of the local buffer, if any
 
-# --- 1. ADVANCED QUERY TO GET ALL DATA AT ONCE ---
-with get_db() as db:
-    # Subquery to get cycle count and last update time for each cell
-    cycle_agg = (
-        db.query(
-            Cycle.cell_id,
-            func.count(Cycle.id).label("cycle_count"),
-            func.max(Cycle.created_at).label("last_update")
-        )
-        .group_by(Cycle.cell_id)
-        .subquery()
-    )
-
-    # Main query to join running cells with the aggregated cycle data
-    results = (
-        db.query(Cell, cycle_agg.c.cycle_count, cycle_agg.c.last_update)
-        .outerjoin(cycle_agg, Cell.id == cycle_agg.c.cell_id)
-        .filter(Cell.status == "running")
-        .all()
-    )
-
-# --- 2. PROCESS RESULTS FOR DISPLAY ---
-running_data_list = []
-running_cells_map = {}
-for cell, cycle_count, last_update in results:
-    # Convert UTC time from DB to local time for display
-    last_update_local = "—"
-    if last_update:
-        utc_time = last_update.replace(tzinfo=ZoneInfo("UTC"))
-        local_time = utc_time.astimezone(ZoneInfo("Asia/Kolkata"))
-        last_update_local = local_time.strftime("%d-%b-%Y %H:%M")
+# --- 1. ONE QUERY: EVERY CHANNEL OF THE CHOSEN CYCLERS + ITS RUNNING CELL ---
+# Empty channels are generated in SQL (services/queries.channel_board) and the
+# stats come from cell_stats, so this is one indexed query at any channel count.
+# Cached until a cycler, cell or cycle is written (services/queries.py).
+all_cyclers = queries.cyclers()
+if not all_cyclers:
+    st.info("No cyclers yet. Add one on the Dashboard page.")
+    st.stop()
+cycler_ids = {c.name: c.id for c in all_cyclers}
+col_pick, col_live, col_every = st.columns([4, 1, 2])
+shown = col_pick.multiselect("Cyclers", list(cycler_ids), default=list(cycler_ids))
+if not shown:
+    st.info("Pick at least one cycler.")
+    st.stop()
+shown_ids = tuple(cycler_ids[name] for name in shown)
 
-    running_data_list.append({
-        "Channel": cell.channel,
-        "Cell ID": cell.cell_id,
-        "Cycles": cycle_count or 0,
-        "Last Update": last_update_local,
-        "Asm Date": cell.assembly_date.date() if cell.assembly_date else "—",
-    })
-    running_cells_map[cell.channel] = cell
+# Live mode: only the fragment below reruns on the timer, and each tick asks
+# the database for cycles newer than the last one seen (services/live.py)
+live = col_live.toggle("🔴 Live", help="Refresh the channel table automatically")
+every = col_every.select_slider(
+    "Refresh every", [2, 5, 10, 30, 60], value=5,
+    format_func=lambda s: f"{s} s", disabled=not live,
+)
 
-df_running = pd.DataFrame(running_data_list)
 
-# Ensure the DataFrame has at least the merge key
-if df_running.empty:
-    df_running = pd.DataFrame(columns=["Channel"])
+def channel_table():
+    querylog.begin_fragment("channel_table")  # live ticks are logged apart
+    watermark, results = queries.board_snapshot(shown_ids)
+    board = st.session_state.get("live_board")
+    if board is None or board.key != (shown_ids, watermark):
+        board = st.session_state["live_board"] = LiveBoard(
+            (shown_ids, watermark), watermark, results
+        )
+    if live:
+        board.refresh()
 
-# Merge with a full channel list to show all 8 channels
-dash = (
-    pd.DataFrame({"Channel": range(1, 9)})
-    .merge(df_running, how="left", on="Channel")
-)
+    # --- 2. PROCESS RESULTS FOR DISPLAY ---
+    # Status changes still in the local write buffer (services/outbox.py)
+    buffered = outbox.pending_statuses()
+    rows = []
+    for ch in board.rows:
+        # Convert UTC time from DB to local time for display
+        last_update_local = "—"
+        if ch["last_update"]:
+            utc_time = ch["last_update"].replace(tzinfo=ZoneInfo("UTC"))
+            local_time = utc_time.astimezone(ZoneInfo("Asia/Kolkata"))
+            last_update_local = local_time.strftime("%d-%b-%Y %H:%M")
 
-# Define all columns to ensure they exist even if no cells are running
-display_cols = ["Cell ID", "Cycles", "Last Update", "Asm Date"]
-for col in display_cols:
-    if col not in dash.columns:
-        dash[col] = "—"
-dash.fillna("—", inplace=True)
+        last_ce = ch["last_ce_pct"]
+        rows.append({
+            "Cycler": ch["cycler"],
+            "Channel": ch["channel"],
+            "Cell ID": (
+                f"{ch['cell_id']} (⏳ {buffered[ch['id']]})"
+                if ch["id"] in buffered
+                else ch["cell_id"] or "—"
+            ),
+            "Cycles": (ch["cycle_count"] or 0) if ch["id"] else None,
+            "Last Update": last_update_local,
+            "Last CE %": round(last_ce, 2) if last_ce is not None else None,
+            "Asm Date": ch["assembly_date"].date() if ch["assembly_date"] else None,
+        })
 
-# Reorder columns for a better layout
-final_cols = ["Channel", "Cell ID", "Cycles", "Last Update", "Asm Date"]
-st.dataframe(dash[final_cols], hide_index=True, use_container_width=True)
+    # One table, one selection: the action widgets below are only drawn for the
+    # selected row, so the widget count doesn't grow with the number of channels
+    event = st.dataframe(
+        pd.DataFrame(rows),
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="channel_board",
+    )
+    if live:
+        st.caption(f"Live · updated {datetime.now():%H:%M:%S}")
 
+    # --- 3. ACTIONS FOR THE SELECTED CHANNEL ---
+    st.write("---")
+    selected = event.selection.rows
+    if not selected:
+        st.caption("Select a channel in the table to start, log or stop a cell.")
+        return
 
-# --- 3. ACTION BUTTONS (NO CHANGE IN LOGIC) ---
-st.write("---")
-for ch in range(1, 9):
+    ch = board.rows[selected[0]]
     col_label, col_action1, col_action2 = st.columns([3, 1, 1])
-    col_label.write(f"**Channel {ch}**")
+    col_label.write(f"**{ch['cycler']} · Channel {ch['channel']}**")
 
-    if ch not in running_cells_map:
-        if col_action1.button("▶️ Start", key=f"start_{ch}"):
-            st.session_state["new_channel"] = ch
+    if ch["id"] is None:
+        if col_action1.button("▶️ Start"):
+            st.session_state["new_cycler"] = ch["cycler_pk"]
+            st.session_state["new_channel"] = ch["channel"]
             st.switch_page("pages/01_Add_Cell.py")
     else:
-        cell = running_cells_map[ch]
-        if col_action1.button("✍️ Log", key=f"log_{ch}"):
-            st.session_state["log_cell_id"] = cell.id
+        if col_action1.button("✍️ Log"):
+            st.session_state["log_cell_id"] = ch["id"]
             st.switch_page("pages/02_Log_Cycle.py")
 
-        if col_action2.button("⏹️ Stop", key=f"stop_{ch}"):
-            with get_db() as db:
-                cell_to_stop = db.query(Cell).filter(Cell.id == cell.id).first()
-                if cell_to_stop:
-                    cell_to_stop.status = "stopped"
-                    db.commit()
+        if col_action2.button("⏹️ Stop"):
+            if outbox.enabled():
+                outbox.set_status(ch["id"], "stopped")  # synced in the background
+            else:
+                with get_db() as db:
+                    cell_to_stop = db.query(Cell).filter(Cell.id == ch["id"]).first()
+                    if cell_to_stop:
+                        cell_to_stop.status = "stopped"
+                        db.commit()
             st.rerun()
+
+
+# The table (and its selection) reruns on its own; the timer only runs when live
+st.fragment(channel_table, run_every=every if live else None)()
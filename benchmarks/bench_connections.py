@@ -0,0 +1,251 @@
+"""Round trips and wall time per page: old per-block sessions vs read_db().
+
+Usage:
+    python benchmarks/bench_connections.py                       # scratch SQLite
+    python benchmarks/bench_connections.py --latency-ms 25       # simulate a WAN
+    python benchmarks/bench_connections.py --url postgresql://…/scratch
+
+"before" replays the queries the pages issued with a default engine and one
+session per `with get_db()` block; "after" replays the current pages with the
+tuned engine and a single read_db() connection per rerun. Round trips count
+connects, pre-pings, statements and commit/rollback.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import make_engine, pool_settings  # noqa: E402
+from models.base import Base, Cell, CellStats, Cycle  # noqa: E402
+from services.cell_stats import rebuild_all_cell_stats  # noqa: E402
+
+
+class RoundTrips:
+    """Counts (and optionally delays) every network round trip of an engine."""
+
+    def __init__(self, engine, latency_ms: float, connect_ms: float):
+        self.count = 0
+        self.latency = latency_ms / 1000
+        pre_ping = engine.pool._pre_ping
+
+        def trip(delay):
+            self.count += 1
+            if delay:
+                time.sleep(delay)
+
+        event.listen(engine, "connect", lambda *a: trip(connect_ms / 1000))
+        event.listen(engine, "before_cursor_execute", lambda *a: trip(self.latency))
+        event.listen(engine, "commit", lambda *a: trip(self.latency))
+        event.listen(engine, "rollback", lambda *a: trip(self.latency))
+        if pre_ping:
+            event.listen(engine, "checkout", lambda *a: trip(self.latency))
+
+
+# ── Page read patterns ──────────────────────────────────────────────────────
+# Each takes a `db_block` context manager factory; "before" opens a session per
+# call (the old `with get_db()` blocks), "after" shares one read_db() session.
+def dashboard_before(db_block):
+    with db_block() as db:
+        agg = (
+            db.query(
+                Cycle.cell_id,
+                func.count(Cycle.id).label("n"),
+                func.max(Cycle.created_at).label("last"),
+            )
+            .group_by(Cycle.cell_id)
+            .subquery()
+        )
+        db.query(Cell, agg.c.n, agg.c.last).outerjoin(
+            agg, Cell.id == agg.c.cell_id
+        ).filter(Cell.status == "running").all()
+
+
+def dashboard_after(db_block):
+    with db_block() as db:
+        db.query(Cell, CellStats.cycle_count, CellStats.last_update).outerjoin(
+            CellStats, Cell.id == CellStats.cell_id
+        ).filter(Cell.status == "running").all()
+
+
+def log_cycle_before(db_block):
+    with db_block() as db:
+        cells = db.query(Cell).filter(Cell.status == "running").all()
+    with db_block() as db:
+        db.query(func.max(Cycle.cycle_no)).filter(Cycle.cell_id == cells[0].id).scalar()
+
+
+def log_cycle_after(db_block):
+    with db_block() as db:
+        last_no = (
+            select(func.max(Cycle.cycle_no))
+            .where(Cycle.cell_id == Cell.id)
+            .correlate(Cell)
+            .scalar_subquery()
+        )
+        db.query(Cell, last_no).filter(Cell.status == "running").all()
+
+
+def select_cell_before(db_block):
+    with db_block() as db:
+        cells = db.query(Cell).order_by(Cell.cell_id).all()
+        db.query(Cycle.cell_id, func.count()).filter(
+            Cycle.cell_id.in_([c.id for c in cells])
+        ).group_by(Cycle.cell_id).all()
+
+
+def select_cell_after(db_block):
+    with db_block() as db:
+        db.query(Cell, CellStats.cycle_count).outerjoin(
+            CellStats, Cell.id == CellStats.cell_id
+        ).order_by(Cell.cell_id).all()
+
+
+def view_cells_before(db_block):
+    with db_block() as db:
+        cells = db.query(Cell).order_by(Cell.cell_id).all()
+    with db_block() as db:
+        db.get(Cell, cells[0].id)
+        db.query(Cycle).filter(Cycle.cell_id == cells[0].id).order_by(
+            Cycle.cycle_no
+        ).all()
+
+
+def view_cells_after(db_block):
+    with db_block() as db:
+        cells = db.query(Cell).order_by(Cell.cell_id).all()
+        db.query(Cycle).filter(Cycle.cell_id == cells[0].id).order_by(
+            Cycle.cycle_no
+        ).all()
+
+
+PAGES = {
+    "app.py (dashboard)": (dashboard_before, dashboard_after),
+    "02_Log_Cycle": (log_cycle_before, log_cycle_after),
+    "02_Select_Cell": (select_cell_before, select_cell_after),
+    "03_View_Cells": (view_cells_before, view_cells_after),
+}
+
+
+def session_per_block(engine):
+    @contextmanager
+    def block():
+        with Session(engine) as db:
+            yield db
+
+    return block
+
+
+def one_connection(session):
+    @contextmanager
+    def block():
+        yield session
+
+    return block
+
+
+def seed(engine, n_cells: int, n_cycles: int) -> None:
+    Base.metadata.create_all(engine)
+    start = datetime(2025, 1, 1)
+    with Session(engine) as db:
+        db.execute(
+            insert(Cell),
+            [
+                {"id": i, "cell_id": f"S-{i:03d}", "channel": (i % 8) + 1,
+                 "status": "running" if i <= 8 else "stopped"}
+                for i in range(1, n_cells + 1)
+            ],
+        )
+        for cell_pk in range(1, n_cells + 1):
+            db.execute(
+                insert(Cycle),
+                [
+                    {"cell_id": cell_pk, "cycle_no": n, "ce_pct": 95.0,
+                     "created_at": start + timedelta(hours=n)}
+                    for n in range(1, n_cycles + 1)
+                ],
+            )
+        rebuild_all_cell_stats(db)
+        db.commit()
+
+
+def measure(rerun, runs: int, counter: RoundTrips):
+    """Median wall ms and round trips of one simulated page rerun."""
+    times, trips = [], []
+    for _ in range(runs):
+        counter.count = 0
+        t0 = time.perf_counter()
+        rerun()
+        times.append((time.perf_counter() - t0) * 1000)
+        trips.append(counter.count)
+    return statistics.median(times), statistics.median(trips)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", help="scratch database URL (default: temp SQLite file)"
+    )
+    parser.add_argument("--cells", type=int, default=40)
+    parser.add_argument("--cycles", type=int, default=500, help="cycles per cell")
+    parser.add_argument("--runs", type=int, default=20, help="reruns per page")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated delay per round trip")
+    parser.add_argument("--connect-ms", type=float, default=None,
+                        help="simulated connection setup (default 3× latency)")
+    args = parser.parse_args()
+    connect_ms = args.connect_ms if args.connect_ms is not None else 3 * args.latency_ms
+
+    tmp = None
+    url = args.url
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    seed_engine = create_engine(url)
+    if inspect(seed_engine).has_table("cells"):
+        sys.exit("Refusing to run: 'cells' already exists. Use a scratch database.")
+    seed(seed_engine, args.cells, args.cycles)
+    seed_engine.dispose()
+
+    print(f"{args.cells} cells × {args.cycles} cycles, {args.runs} reruns, "
+          f"latency {args.latency_ms} ms, connect {connect_ms} ms\n")
+    print(f"{'page':<22}{'before ms':>11}{'trips':>7}{'after ms':>11}{'trips':>7}")
+    try:
+        for page, (before, after) in PAGES.items():
+            # before: default engine, new session per `with get_db()` block
+            old = create_engine(url)
+            old_trips = RoundTrips(old, args.latency_ms, connect_ms)
+            b_ms, b_trips = measure(
+                lambda: before(session_per_block(old)), args.runs, old_trips
+            )
+            old.dispose()
+
+            # after: tuned process-wide engine, one read_db() connection per rerun
+            new = make_engine(url, pool_settings())
+            new_trips = RoundTrips(new, args.latency_ms, connect_ms)
+
+            def rerun_after():
+                with new.connect() as conn, Session(bind=conn) as db:
+                    after(one_connection(db))
+
+            a_ms, a_trips = measure(rerun_after, args.runs, new_trips)
+            new.dispose()
+            print(f"{page:<22}{b_ms:>11.2f}{b_trips:>7.0f}{a_ms:>11.2f}{a_trips:>7.0f}")
+    finally:
+        Base.metadata.drop_all(create_engine(url))
+        if tmp:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""PDF report time and size for a cell with a photo on every cycle.
+
+Usage:
+    python benchmarks/bench_pdf.py                        # 1000 cycles
+    python benchmarks/bench_pdf.py --cycles 1000 --unique-photos 200
+
+"before" replays the old build_pdf() drawing loop: one text line per cycle and
+drawImage() on the full-resolution photo. "after (cold)" is services/pdf.py
+with an empty thumbnail cache, "after (warm)" the same report again with the
+thumbnails already cached. "voltages only" is a cell whose cycles have no CE
+or capacity at all (a cycler import without capacity columns), whose plots
+must fall back to a "no data" line. Everything runs in a temp directory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from models.base import Base, Cell, Cycle  # noqa: E402
+from services import media, pdf  # noqa: E402
+
+
+def make_photos(folder: str, n: int, size) -> list:
+    """n distinct camera-like JPEGs (gradient + noise, so they don't compress away)."""
+    rng = np.random.default_rng(0)
+    w, h = size
+    ramp = np.linspace(0, 200, w, dtype=np.float32)[None, :, None]
+    base = np.clip(ramp + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8)
+    paths = []
+    for i in range(n):
+        # a different tint and offset per photo makes every file unique
+        px = np.roll(base, i * 7, axis=1) + np.uint8(i % 40)
+        path = os.path.join(folder, f"photo_{i:04d}.jpg")
+        Image.fromarray(px).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def seed(db: Session, n_cycles: int, photos: list) -> int:
+    cell = Cell(cell_id="BENCH-PDF", chemistry="Zn–Br", rated_capacity=10.0,
+                assembly_date=datetime(2025, 1, 1), status="running", notes="bench")
+    db.add(cell)
+    db.flush()
+    rng = np.random.default_rng(1)
+    db.execute(
+        insert(Cycle),
+        [
+            {"cell_id": cell.id, "cycle_no": n, "current_density": 20.0,
+             "charge_V": 1.9, "discharge_V": 1.5, "delta_V": 0.4,
+             "ce_pct": float(95 + rng.normal(0, 1)),
+             "capacity_mAh": 9.5 - n * 0.002, "pH": 3.1,
+             "photo_path": photos[(n - 1) % len(photos)],
+             "created_at": datetime(2025, 1, 1) + timedelta(hours=n)}
+            for n in range(1, n_cycles + 1)
+        ],
+    )
+    db.commit()
+    return cell.id
+
+
+def seed_voltages_only(db: Session, n_cycles: int) -> int:
+    """A cell whose cycles carry only charge/discharge voltages."""
+    cell = Cell(cell_id="BENCH-PDF-V", chemistry="Zn–Br", rated_capacity=10.0,
+                assembly_date=datetime(2025, 1, 1), status="running")
+    db.add(cell)
+    db.flush()
+    db.execute(
+        insert(Cycle),
+        [
+            {"cell_id": cell.id, "cycle_no": n, "charge_V": 1.9,
+             "discharge_V": 1.5,
+             "created_at": datetime(2025, 1, 1) + timedelta(hours=n)}
+            for n in range(1, n_cycles + 1)
+        ],
+    )
+    db.commit()
+    return cell.id
+
+
+def build_before(db: Session, cell_pk: int, filename: str) -> None:
+    """The old report loop, minus the Cell attributes that no longer exist."""
+    cycles = db.execute(
+        select(Cycle).where(Cycle.cell_id == cell_pk).order_by(Cycle.cycle_no)
+    ).scalars()
+    c = canvas.Canvas(filename, pagesize=A4)
+    height = A4[1]
+    y = height - 50
+    c.setFont("Helvetica", 10)
+    for cycle in cycles:
+        c.drawString(60, y, f"Cycle {cycle.cycle_no} | CE%: {cycle.ce_pct} "
+                            f"| dV: {cycle.delta_V} ")
+        y -= 15
+        if cycle.photo_path and os.path.exists(cycle.photo_path):
+            img_width, img_height = 6 * cm, 4.5 * cm
+            if y < img_height + 60:
+                c.showPage()
+                y = height - 50
+            c.drawImage(cycle.photo_path, 60, y - img_height,
+                        width=img_width, height=img_height)
+            y -= img_height + 10
+        y -= 10
+        if y < 100:
+            c.showPage()
+            y = height - 50
+    c.save()
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--unique-photos", type=int, default=None,
+                        help="distinct photo files, reused round-robin "
+                             "(default: one per cycle)")
+    parser.add_argument("--photo-size", default="1600x1200", help="WxH pixels")
+    parser.add_argument("--skip-before", action="store_true",
+                        help="skip the old loop (minutes at 1000 full-size photos)")
+    args = parser.parse_args()
+    n_photos = args.unique_photos or args.cycles
+    size = tuple(int(v) for v in args.photo_size.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        photos = make_photos(tmp, n_photos, size)
+        photo_mb = sum(os.path.getsize(p) for p in photos) / 1e6
+        print(f"{args.cycles} cycles, {n_photos} photos {args.photo_size} "
+              f"({photo_mb:.0f} MB, generated in {time.perf_counter() - t:.1f} s)\n")
+
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        media.THUMB_DIR = os.path.join(tmp, "thumbnails")
+
+        with Session(engine) as db:
+            cell_pk = seed(db, args.cycles, photos)
+            sparse_pk = seed_voltages_only(db, args.cycles)
+            runs = [
+                ("before", "before.pdf",
+                 lambda f: build_before(db, cell_pk, f)),
+                ("after (cold)", "cold.pdf",
+                 lambda f: pdf.build_pdf(db, cell_pk, file=f)),
+                ("after (warm)", "warm.pdf",
+                 lambda f: pdf.build_pdf(db, cell_pk, file=f)),
+                ("voltages only", "sparse.pdf",
+                 lambda f: pdf.build_pdf(db, sparse_pk, file=f)),
+            ]
+            print(f"{'run':<16}{'seconds':>10}{'size MB':>10}")
+            for name, filename, build in runs[args.skip_before:]:
+                path = os.path.join(tmp, filename)
+                seconds = timed(lambda: build(path))
+                size_mb = os.path.getsize(path) / 1e6
+                print(f"{name:<16}{seconds:>10.2f}{size_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Timings of the hot paths at several data sizes, saved as JSON per commit.
+
+Usage:
+    python benchmarks/bench_suite.py                         # full matrix
+    python benchmarks/bench_suite.py --cells 10,100 --cycles 100 --repeat 3
+    python benchmarks/bench_suite.py --data-dir /tmp/labs    # keep the databases
+    python benchmarks/bench_suite.py --compare benchmarks/results/abc1234.json
+
+For every cells × cycles scale, benchmarks/synthetic.py fills a fresh SQLite
+database (photos included) and each case below runs --repeat times against it,
+uncached (the functions behind the st.cache_data wrappers):
+
+    dashboard       queries.board_snapshot(): the channel board of app.py
+    selector        search.search_cells(): first page of running cells
+    selector_text   the same with a word search ("leak")
+    viewer          all_cells + cycle_summary + cycle_page (middle of the cell)
+    save_edits      update_cycles_in_db(): save_cycle_edits on a 100-row page
+    build_excel     services/excel.build_excel for one cell
+    build_pdf       services/pdf.build_pdf for one cell (thumbnails warm)
+
+Results (median / min ms per case and scale, plus the commit, machine and
+generation time) go to benchmarks/results/<commit>.json unless --out says
+otherwise; --compare prints the change against an earlier results file.
+With --data-dir an existing <cells>x<cycles>.db there is reused as is.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+import database  # noqa: E402
+from benchmarks.synthetic import generate  # noqa: E402
+from models.base import Cell, Cycle  # noqa: E402
+from services import excel, media, pdf, queries, search  # noqa: E402
+from services.cycle_edits import save_cycle_edits  # noqa: E402
+
+RESULTS_DIR = os.path.join(project_root, "benchmarks", "results")
+EDIT_ROWS = 100
+EDITOR_FIELDS = {
+    "Cycle #": "cycle_no",
+    "Current (mA/cm²)": "current_density",
+    "Charge V": "charge_V",
+    "Discharge V": "discharge_V",
+    "ΔV": "delta_V",
+    "CE %": "ce_pct",
+    "Cap. (mAh)": "capacity_mAh",
+    "Obs": "observation",
+}
+
+
+def _uncached(fn):
+    # queries.versioned() wraps the real function; version=None bypasses it
+    return lambda *args, **kwargs: fn.__wrapped__(None, *args, **kwargs)
+
+
+def _editor_frame(rows) -> pd.DataFrame:
+    """The Cell Viewer's editor table for a page of cycles."""
+    return pd.DataFrame(
+        [{col: getattr(r, attr) for col, attr in EDITOR_FIELDS.items()} for r in rows],
+        columns=list(EDITOR_FIELDS),
+    )
+
+
+def cases(engine, n_cycles: int) -> dict:
+    """Case name → callable, for a database filled by synthetic.generate()."""
+    with Session(engine) as db:
+        cell_pk = db.execute(
+            select(Cell.id).where(Cell.status == "running").order_by(Cell.id)
+        ).scalar()
+        middle = max(1, n_cycles // 2)
+
+    def dashboard():
+        _uncached(queries.board_snapshot)()
+
+    def selector():
+        _uncached(search.search_cells)("", "running")
+
+    def selector_text():
+        _uncached(search.search_cells)("leak", None)
+
+    def viewer():
+        with database.read_db():
+            _uncached(queries.all_cells)()
+            _uncached(queries.cycle_summary)(cell_pk)
+            _uncached(queries.cycle_page)(cell_pk, start=middle)
+
+    nudge = [0.001]
+
+    def save_edits():
+        # Same page every run; alternate the sign so values don't drift away
+        rows, _, _ = _uncached(queries.cycle_page)(
+            cell_pk, start=middle, page_size=EDIT_ROWS
+        )
+        orig = _editor_frame(rows)
+        edited = orig.assign(**{"Charge V": orig["Charge V"] + nudge[0]})
+        nudge[0] = -nudge[0]
+        with Session(engine) as db:
+            save_cycle_edits(db, cell_pk, orig, edited)
+
+    def build_excel():
+        with Session(engine) as db:
+            excel.build_excel(db, cell_pk, file=io.BytesIO())
+
+    def build_pdf():
+        with Session(engine) as db:
+            pdf.build_pdf(db, cell_pk, file=io.BytesIO())
+
+    return {
+        "dashboard": dashboard,
+        "selector": selector,
+        "selector_text": selector_text,
+        "viewer": viewer,
+        "save_edits": save_edits,
+        "build_excel": build_excel,
+        "build_pdf": build_pdf,
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    """Median and min wall ms of `repeat` runs, after one warm-up run."""
+    fn()  # warm-up: imports, SQLite page cache, PDF thumbnails
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "median_ms": round(statistics.median(times), 2),
+        "min_ms": round(min(times), 2),
+    }
+
+
+def run_scale(folder: str, n_cells: int, n_cycles: int, repeat: int) -> dict:
+    """Generate (or reuse) one scale's database and time every case on it."""
+    db_path = os.path.join(folder, f"{n_cells}x{n_cycles}.db")
+    media.STORE_DIR = Path(folder) / "media" / "store"
+    media.THUMB_DIR = Path(folder) / "media" / "thumbnails"
+    url = f"sqlite:///{db_path}"
+
+    result = {"cells": n_cells, "cycles_per_cell": n_cycles}
+    if not os.path.exists(db_path):
+        t0 = time.perf_counter()
+        generate(url, n_cells, n_cycles)
+        result["generate_s"] = round(time.perf_counter() - t0, 1)
+
+    # The services read through database.get_engine(): point it at this scale
+    engine = database.make_engine(url)
+    database.get_engine = lambda: engine
+    with Session(engine) as db:
+        result["rows"] = db.execute(select(func.count(Cycle.id))).scalar()
+    result["db_mb"] = round(os.path.getsize(db_path) / 1e6, 1)
+
+    result["cases"] = {}
+    for name, fn in cases(engine, n_cycles).items():
+        result["cases"][name] = measure(fn, repeat)
+        print(f"  {name:<14}{result['cases'][name]['median_ms']:>12.1f} ms", flush=True)
+    engine.dispose()
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    """Print each case's median against the same case/scale in a baseline file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {
+        (s["cells"], s["cycles_per_cell"], name): case["median_ms"]
+        for s in baseline["scales"]
+        for name, case in s["cases"].items()
+    }
+    print(f"\nvs {baseline['commit']} ({baseline_path})")
+    for s in results["scales"]:
+        for name, case in s["cases"].items():
+            before = old.get((s["cells"], s["cycles_per_cell"], name))
+            if not before:
+                continue
+            change = (case["median_ms"] - before) / before * 100
+            print(
+                f"  {s['cells']:>5} × {s['cycles_per_cell']:<6} {name:<14}"
+                f"{before:>10.1f} → {case['median_ms']:>10.1f} ms  {change:+6.1f} %"
+            )
+
+
+def _ints(text: str) -> list:
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=_ints, default=[10, 100, 1000],
+                        help="comma-separated cell counts")
+    parser.add_argument("--cycles", type=_ints, default=[100, 10000],
+                        help="comma-separated cycles per cell")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--data-dir", help="keep (and reuse) the databases here")
+    parser.add_argument("--out", help="results file (default: results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU",
+        "repeat": args.repeat,
+        "scales": [],
+    }
+    tmp = None
+    folder = args.data_dir
+    if not folder:
+        tmp = tempfile.TemporaryDirectory()
+        folder = tmp.name
+    os.makedirs(folder, exist_ok=True)
+    try:
+        for n_cells in args.cells:
+            for n_cycles in args.cycles:
+                print(f"{n_cells:,} cells × {n_cycles:,} cycles", flush=True)
+                results["scales"].append(
+                    run_scale(folder, n_cells, n_cycles, args.repeat)
+                )
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults → {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
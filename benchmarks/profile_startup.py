@@ -0,0 +1,126 @@
+"""Time to first render per page, in a fresh interpreter each.
+
+Usage:
+    python benchmarks/profile_startup.py                      # every page
+    python benchmarks/profile_startup.py pages/01_Add_Cell.py --top 10
+    python benchmarks/profile_startup.py --url sqlite:////tmp/lab/lab.db --json
+
+Each page runs once under streamlit.testing's AppTest in its own
+`python -X importtime` process, i.e. the first visit after a server start.
+Streamlit itself is imported before the clock starts (a server has it loaded
+before any page), so "first render" is the page's own imports plus its first
+run against the database; "imports" is the part of it spent importing, and
+the heavy libraries the page pulled in are listed with their cumulative
+import times. --top also prints the slowest individual imports.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import get_setting  # noqa: E402
+
+HEAVY = ["pandas", "numpy", "pyarrow", "plotly", "PIL", "reportlab", "xlsxwriter"]
+MARKER = "--- page ---"
+
+# Runs inside the child interpreter: argv = page path
+_CHILD = f"""
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": ms, "errors": [str(e.value) for e in at.exception]}}))
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self µs, cumulative µs, depth) of imports after the marker."""
+    rows = []
+    _, _, after = stderr.partition(MARKER)
+    for line in after.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows
+
+
+def profile(page: str, url: str) -> dict:
+    """First render of `page` (relative to the project root) in a new process."""
+    env = {**os.environ, "DATABASE_URL": url, "PYTHONPATH": project_root}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, page],
+        cwd=project_root, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"{page} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(proc.stderr)
+    # The shallowest entries are what the page (and AppTest) imported directly
+    top_depth = min((d for *_, d in imports), default=1)
+    import_us = sum(c for _, _, c, d in imports if d == top_depth)
+    heavy = {
+        name: round(cumulative / 1000, 1)
+        for name, _, cumulative, _ in imports
+        if name in HEAVY
+    }
+    slowest = sorted(imports, key=lambda r: -r[1])
+    return {
+        "page": page,
+        "first_render_ms": round(result["ms"], 1),
+        "imports_ms": round(import_us / 1000, 1),
+        "heavy": heavy,
+        "slowest": [(name, round(us / 1000, 1)) for name, us, _, _ in slowest],
+        "errors": result["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="default: app.py and pages/*.py")
+    parser.add_argument("--url", default=get_setting("DATABASE_URL"))
+    parser.add_argument("--top", type=int, default=0, help="slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="print JSON instead")
+    args = parser.parse_args()
+    if not args.url:
+        sys.exit("DATABASE_URL not found in .streamlit/secrets.toml (or pass --url)")
+
+    pages = args.pages or [
+        "app.py",
+        *sorted(
+            os.path.relpath(p, project_root)
+            for p in glob.glob(os.path.join(project_root, "pages", "*.py"))
+        ),
+    ]
+    results = [profile(p, args.url) for p in pages]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'page':<28}{'first render':>14}{'imports':>10}  heavy libraries (ms)")
+    for r in results:
+        heavy = ", ".join(f"{k} {v:.0f}" for k, v in r["heavy"].items()) or "—"
+        print(f"{r['page']:<28}{r['first_render_ms']:>11.0f} ms"
+              f"{r['imports_ms']:>7.0f} ms  {heavy}")
+        for name, ms in r["slowest"][: args.top]:
+            print(f"    {ms:>8.1f} ms  {name}")
+        if r["errors"]:
+            print(f"    ! {r['errors'][0][:120]}")
+
+
+if __name__ == "__main__":
+    main()
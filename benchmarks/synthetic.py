@@ -0,0 +1,207 @@
+"""Synthetic lab data: N cells × M cycles in a database, with attachment files.
+
+Usage (standalone; bench_suite.py imports generate()):
+    python benchmarks/synthetic.py --cells 100 --cycles 1000 --out /tmp/lab
+    python benchmarks/synthetic.py --cells 10 --cycles 100 --photo-every 0
+
+Distributions, roughly what the lab produces:
+- cyclers of 8 channels; about a third of the cells running, one per channel
+- rated capacity ~ N(10, 1.5) mAh; assembly dates spread over two years
+- discharge capacity fading exponentially at a per-cell log-normal rate, plus
+  noise; CE ~ 95 ± 1.5 % with rare dips; ΔV creeping up as the cell ages
+- about 2 % of cycles with an observation, every `photo_every`-th cycle with a
+  photo, drawn from a small pool of JPEGs (so the media store deduplicates)
+"""
+import argparse
+import io
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+from sqlalchemy import create_engine, insert, inspect
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from models.base import Base, Cell, Cycle, Cycler  # noqa: E402
+from services import derived, media  # noqa: E402
+from services.cell_stats import rebuild_all_cell_stats  # noqa: E402
+from services.importer import to_records  # noqa: E402
+
+CHANNELS = 8
+OBSERVATIONS = [
+    "slight leak at the gasket",
+    "electrolyte colour darker",
+    "bromine smell",
+    "zinc dendrites visible",
+    "restarted after power cut",
+]
+
+
+def make_photos(n: int, size=(1280, 960), seed: int = 0) -> list:
+    """n distinct JPEGs in the media store; returns their store paths."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    ramp = np.linspace(30, 200, w, dtype=np.float32)[None, :, None]
+    base = np.clip(ramp + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8)
+    paths = []
+    for i in range(n):
+        buf = io.BytesIO()
+        Image.fromarray(np.roll(base, i * 11, axis=1) + np.uint8(i % 40)).save(
+            buf, "JPEG", quality=85
+        )
+        buf.seek(0)
+        paths.append(str(media.save_stream(buf, ".jpg")))
+    return paths
+
+
+def _cells(rng, n_cells: int, n_cyclers: int) -> list:
+    n_running = min(n_cells, max(1, n_cells // 3), n_cyclers * CHANNELS)
+    start = datetime(2024, 1, 1)
+    chem = rng.choice(
+        ["Zn–Br", "Zn–Br (TEACl)", "Zn–Br (PTFE)"], n_cells, p=[0.6, 0.3, 0.1]
+    )
+    rows = []
+    for i in range(n_cells):
+        running = i < n_running
+        # running cells fill channels cycler by cycler; stopped ones are anywhere
+        cycler = i // CHANNELS + 1 if running else int(rng.integers(1, n_cyclers + 1))
+        rows.append(
+            {
+                "id": i + 1,
+                "cell_id": f"ZB-{i + 1:04d}",
+                "chemistry": str(chem[i]),
+                "configuration": str(rng.choice(["flow", "static"])),
+                "rated_capacity": float(np.clip(rng.normal(10, 1.5), 4, 20)),
+                "znbr_molarity": float(rng.choice([1.0, 2.0, 3.0])),
+                "teacl_molarity": float(rng.choice([0.0, 0.5, 1.0])),
+                "assembly_date": start + timedelta(days=float(rng.uniform(0, 730))),
+                "status": "running" if running else "stopped",
+                "cycler_id": cycler,
+                "channel": (i % CHANNELS) + 1,
+                "notes": f"batch {int(rng.integers(1, 40))}, membrane "
+                f"{rng.choice(['Nafion', 'Daramic', 'SPEEK'])}",
+            }
+        )
+    return rows
+
+
+def _cycles(rng, cell: dict, n_cycles: int, photos: list, photo_every: int):
+    n = np.arange(1, n_cycles + 1)
+    rate = rng.lognormal(mean=math.log(1e-4), sigma=0.6)
+    noise = rng.normal(1, 0.01, n_cycles)
+    discharge = cell["rated_capacity"] * np.exp(-rate * n) * noise
+    ce = np.clip(rng.normal(95, 1.5, n_cycles), 60, 99.9)
+    dips = rng.random(n_cycles) < 0.005
+    ce[dips] -= rng.uniform(5, 25, dips.sum())
+    charge_v = 1.85 + 2e-5 * n + rng.normal(0, 0.005, n_cycles)
+    discharge_v = 1.55 - 1.5e-5 * n + rng.normal(0, 0.005, n_cycles)
+    hours = np.cumsum(rng.normal(2.5, 0.2, n_cycles).clip(0.5))
+    created = pd.Timestamp(cell["assembly_date"]) + pd.to_timedelta(hours, unit="h")
+
+    frame = pd.DataFrame(
+        {
+            "cell_id": cell["id"],
+            "cycle_no": n,
+            "current_density": float(rng.choice([10.0, 20.0, 40.0])),
+            "charge_V": charge_v,
+            "discharge_V": discharge_v,
+            "capacity_mAh": discharge,
+            "charge_capacity_mAh": discharge / ce * 100,
+            "pH": rng.normal(3.2, 0.15, n_cycles),
+            "created_at": created.to_pydatetime(),
+            "rated_capacity": cell["rated_capacity"],
+        }
+    )
+    frame = frame.join(derived.derive(frame, list(derived.METRICS)))
+    noted = rng.random(n_cycles) < 0.02
+    frame["observation"] = np.where(noted, rng.choice(OBSERVATIONS, n_cycles), None)
+    photo = np.full(n_cycles, None, dtype=object)
+    if photos and photo_every:
+        idx = np.arange(photo_every - 1, n_cycles, photo_every)
+        photo[idx] = [photos[i] for i in rng.integers(0, len(photos), len(idx))]
+    frame["photo_path"] = photo
+    return frame.drop(columns="rated_capacity")
+
+
+def generate(
+    url: str,
+    n_cells: int,
+    n_cycles: int,
+    photo_every: int = 50,
+    n_photos: int = 20,
+    seed: int = 0,
+    progress=None,
+) -> dict:
+    """Fill an empty database at `url`; returns row/file counts.
+
+    Attachments go to the media store (point media.STORE_DIR somewhere first).
+    """
+    engine = create_engine(url)
+    if inspect(engine).has_table("cells"):
+        raise ValueError("Refusing to fill a database that already has cells")
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(seed)
+    photos = make_photos(n_photos, seed=seed) if photo_every else []
+    n_cyclers = max(1, math.ceil(n_cells / 3 / CHANNELS))
+
+    with Session(engine) as db:
+        db.execute(
+            insert(Cycler),
+            [
+                {"id": i, "name": f"Cycler {i}", "channel_count": CHANNELS}
+                for i in range(1, n_cyclers + 1)
+            ],
+        )
+        cells = _cells(rng, n_cells, n_cyclers)
+        db.execute(insert(Cell), cells)
+        for i, cell in enumerate(cells, 1):
+            frame = _cycles(rng, cell, n_cycles, photos, photo_every)
+            db.execute(insert(Cycle), to_records(frame))
+            if i % 50 == 0:
+                db.commit()
+                if progress:
+                    progress(i)
+        rebuild_all_cell_stats(db)
+        db.commit()
+    engine.dispose()
+    return {"cells": n_cells, "cycles": n_cells * n_cycles, "photos": len(photos)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", help="folder for lab.db and media/ (default: .)")
+    parser.add_argument("--url", help="database URL (default: <out>/lab.db)")
+    parser.add_argument("--cells", type=int, default=100)
+    parser.add_argument("--cycles", type=int, default=1000, help="cycles per cell")
+    parser.add_argument("--photo-every", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.out or "."
+    os.makedirs(out, exist_ok=True)
+    media.STORE_DIR = Path(out) / "media" / "store"
+    url = args.url or f"sqlite:///{os.path.join(out, 'lab.db')}"
+    counts = generate(
+        url,
+        args.cells,
+        args.cycles,
+        args.photo_every,
+        seed=args.seed,
+        progress=lambda i: print(f"\r{i:,} cells", end="", flush=True),
+    )
+    print(
+        f"\n{counts['cells']:,} cells, {counts['cycles']:,} cycles, "
+        f"{counts['photos']} photos → {url}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,209 @@
 # database.py
-import streamlit as st
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+import threading
 from contextlib import contextmanager
 
-# Get secrets from st.secrets to connect to Turso
-db_url = st.secrets["DATABASE_URL"]
+import streamlit as st
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+# Registers the flush hook that keeps cell_stats in sync with cycles
+import services.cell_stats  # noqa: F401
+from services import querylog, replica
+
+# Connection-pool settings. Each one can be overridden in .streamlit/secrets.toml
+# (or as an environment variable of the same name).
+POOL_DEFAULTS = {
+    "DB_POOL_SIZE": 5,  # connections kept open per process
+    "DB_MAX_OVERFLOW": 5,  # extra connections allowed under bursts
+    "DB_POOL_PRE_PING": True,  # drop connections the server closed while idle
+    "DB_POOL_RECYCLE": 1800,  # seconds; stay below the server's idle timeout
+    "DB_STATEMENT_TIMEOUT_MS": 15000,  # PostgreSQL only; 0 disables
+}
+
+
+def get_setting(name, default=None):
+    """Read a setting from st.secrets, falling back to the environment."""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except FileNotFoundError:  # no secrets.toml (CLI scripts, CI)
+        pass
+    return os.environ.get(name, default)
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def pool_settings() -> dict:
+    """Current pool settings with secrets/env overrides applied."""
+    settings = {}
+    for name, default in POOL_DEFAULTS.items():
+        value = get_setting(name, default)
+        settings[name] = _as_bool(value) if isinstance(default, bool) else int(value)
+    return settings
+
+
+def make_engine(db_url: str, settings: dict = None):
+    """Build an engine for db_url with the tuned pool settings."""
+    settings = settings or pool_settings()
+    url = make_url(db_url)
+    kwargs = {
+        "pool_pre_ping": settings["DB_POOL_PRE_PING"],
+        "pool_recycle": settings["DB_POOL_RECYCLE"],
+    }
+    # In-memory SQLite lives in a single connection, so it can't be pooled
+    in_memory = url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:")
+    )
+    if not in_memory:
+        kwargs["pool_size"] = settings["DB_POOL_SIZE"]
+        kwargs["max_overflow"] = settings["DB_MAX_OVERFLOW"]
 
-# Create the SQLAlchemy engine for the Streamlit app
-engine = create_engine(db_url)
+    timeout_ms = settings["DB_STATEMENT_TIMEOUT_MS"]
+    if url.get_backend_name() == "postgresql" and timeout_ms:
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-@contextmanager 
+    engine = create_engine(url, **kwargs)
+    querylog.instrument(engine)  # per-rerun statement counts and timings
+    return engine
+
+
+@st.cache_resource
+def get_engine():
+    """The process-wide engine; cached so reruns and page switches reuse its pool."""
+    # Get secrets from st.secrets to connect to Turso
+    db_url = get_setting("DATABASE_URL")
+    if not db_url:
+        raise ValueError("DATABASE_URL must be set in .streamlit/secrets.toml")
+    return make_engine(db_url)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Session of the read_db() block currently open in this script thread, if any
+_reads = threading.local()
+
+
+@contextmanager
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def read_db():
+    """One connection for all the reads of a rerun.
+
+    Open it once around a page's queries. Nested read_db() calls (e.g. from
+    services/queries.py) reuse the same session, and the session only checks
+    out its connection on the first query, so a rerun served entirely from
+    cache never touches the pool. With READ_REPLICA on it reads from the local
+    replica while that is fresh enough (services/replica.py).
+    """
+    current = getattr(_reads, "db", None)
+    if current is not None:
+        yield current
+        return
+
+    db = SessionLocal(bind=replica.read_engine() or get_engine())
+    _reads.db = db
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        _reads.db = None
+        db.close()
+
+
+# ── Per-table data versions ──────────────────────────────────────────────────
+# services/queries.py keys its caches on these counters. Every committed write
+# made through a Session bumps the counters of the tables it touched, so cached
+# reads are never served after the data they came from has changed.
+#
+# Other processes (e.g. scripts/ingest_daemon.py) commit without these hooks, so
+# they call note_external_write() afterwards. That touches WRITES_STAMP, and a
+# newer stamp counts as a write to every table here: one stat() per lookup.
+WRITES_STAMP = os.path.join("media", ".external_writes")
+
+
+@st.cache_resource
+def _version_store():
+    return {
+        "lock": threading.Lock(),
+        "versions": {},
+        "stamp": None,  # WRITES_STAMP mtime last seen
+        "external": 0,  # bumped whenever that changes
+    }
+
+
+def _stamp():
+    try:
+        return os.stat(WRITES_STAMP).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def table_version(*tables) -> tuple:
+    """Current version of each table, usable as a cache key."""
+    store = _version_store()
+    stamp = _stamp()
+    with store["lock"]:
+        if stamp != store["stamp"]:
+            store["stamp"] = stamp
+            store["external"] += 1
+        versions = tuple(store["versions"].get(t, 0) for t in tables)
+        return versions + (store["external"],)
+
+
+def note_external_write() -> None:
+    """Tell app processes that this process committed to the database."""
+    os.makedirs(os.path.dirname(WRITES_STAMP), exist_ok=True)
+    with open(WRITES_STAMP, "a"):
+        pass
+    os.utime(WRITES_STAMP)
+
+
+def bump_version(*tables) -> None:
+    """Invalidate cached reads of the given tables."""
+    store = _version_store()
+    with store["lock"]:
+        for t in tables:
+            store["versions"][t] = store["versions"].get(t, 0) + 1
+
+
+def _touched(session) -> set:
+    return session.info.setdefault("touched_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        _touched(session).add(obj.__table__.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(state):
+    # insert()/update()/delete() run through session.execute skip the flush
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None:
+            _touched(state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop("touched_tables", None)
+    if tables:
+        bump_version(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_tables(session):
+    session.info.pop("touched_tables", None)
@@ -1,6 +1,7 @@
 # models/base.py
 from datetime import datetime
 from sqlalchemy import (
+    DDL,
     Column,
     Integer,
     String,
@@ -8,11 +9,21 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Text,
+    Index,
+    event,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# ─────────────────── Cycler ──────────────────
+class Cycler(Base):
+    __tablename__ = "cyclers"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    channel_count = Column(Integer, nullable=False, default=8)
+    cells = relationship("Cell", back_populates="cycler")
+
 # ─────────────────── Cell ────────────────────
 class Cell(Base):
     __tablename__ = "cells"
@@ -25,9 +36,24 @@ class Cell(Base):
     notes = Column(Text)
     znbr_molarity = Column(Float)
     teacl_molarity = Column(Float)
+    cycler_id = Column(Integer, ForeignKey("cyclers.id"))
     channel = Column(Integer)
     status = Column(String)
+    # Change marker for the read replica (services/replica.py); NULL on rows
+    # last written before it existed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    cycler = relationship("Cycler", back_populates="cells")
     cycles = relationship("Cycle", back_populates="cell", cascade="all,delete")
+    stats = relationship(
+        "CellStats", back_populates="cell", uselist=False, cascade="all,delete"
+    )
+
+    __table_args__ = (
+        # Dashboard / Log Cycle filter on status
+        Index("ix_cells_status_channel", "status", "channel"),
+        # channel board join and Add Cell's "is this channel busy" check
+        Index("ix_cells_cycler_id_channel_status", "cycler_id", "channel", "status"),
+    )
 
 # ─────────────────── Cycle ───────────────────
 class Cycle(Base):
@@ -38,12 +64,121 @@ class Cycle(Base):
     current_density = Column(Float)
     charge_V = Column(Float)
     discharge_V = Column(Float)
-    capacity_mAh = Column(Float)
+    capacity_mAh = Column(Float)  # discharge capacity
+    charge_capacity_mAh = Column(Float)
     pH = Column(Float)
     csv_path = Column(String)
     ce_pct = Column(Float)
     delta_V = Column(Float)
+    # Derived from the columns above by services/derived.py
+    voltage_efficiency_pct = Column(Float)
+    energy_efficiency_pct = Column(Float)
+    normalized_capacity = Column(Float)  # capacity_mAh / Cell.rated_capacity
     observation = Column(Text)
     photo_path = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
-    cell = relationship("Cell", back_populates="cycles")
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    cell = relationship("Cell", back_populates="cycles")
+
+    __table_args__ = (
+        # next cycle number (max cycle_no) and per-row lookups in the editor
+        Index("ix_cycles_cell_id_cycle_no", "cell_id", "cycle_no"),
+        # dashboard GROUP BY cell_id with max(created_at)
+        Index("ix_cycles_cell_id_created_at", "cell_id", "created_at"),
+        # read replica's pull of changed rows
+        Index("ix_cycles_updated_at", "updated_at"),
+    )
+
+
+# ─────────────────── CellStats ───────────────
+# One summary row per cell, kept in sync by services/cell_stats.py whenever
+# cycles are flushed, so the dashboard never aggregates the cycles table.
+class CellStats(Base):
+    __tablename__ = "cell_stats"
+    cell_id = Column(Integer, ForeignKey("cells.id"), primary_key=True)
+    cycle_count = Column(Integer, nullable=False, default=0)
+    last_cycle_no = Column(Integer)
+    last_update = Column(DateTime)
+    last_ce_pct = Column(Float)
+    last_delta_V = Column(Float)
+    last_capacity_mAh = Column(Float)
+    cell = relationship("Cell", back_populates="stats")
+
+
+# ─────────────────── AppliedWrite ────────────
+# Idempotency keys of buffered writes (services/outbox.py), committed in the
+# same transaction as the write itself: a flush retried after a lost reply
+# finds its key here and doesn't apply the write twice.
+class AppliedWrite(Base):
+    __tablename__ = "applied_writes"
+    key = Column(String(32), primary_key=True)
+    applied_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # keys older than outbox.KEEP_APPLIED_S are deleted as batches apply
+        Index("ix_applied_writes_applied_at", "applied_at"),
+    )
+
+
+# ─────────────────── Search ──────────────────
+# Cell selector search (services/search.py). Kept out of the ORM classes because
+# it is dialect specific: SQLite gets FTS5 tables synced by triggers, PostgreSQL
+# gets GIN indexes on tsvector expressions. alembic/versions/c81f4a2d6e07 holds
+# the same statements for existing databases; these cover create_all().
+SQLITE_CELL_SEARCH = [
+    "CREATE INDEX ix_cells_cell_id_nocase ON cells (cell_id COLLATE NOCASE)",
+    "CREATE VIRTUAL TABLE cells_fts USING fts5("
+    "cell_id, notes, content='cells', content_rowid='id')",
+    "CREATE TRIGGER cells_fts_ai AFTER INSERT ON cells BEGIN "
+    "INSERT INTO cells_fts(rowid, cell_id, notes) "
+    "VALUES (new.id, new.cell_id, new.notes); END",
+    "CREATE TRIGGER cells_fts_ad AFTER DELETE ON cells BEGIN "
+    "INSERT INTO cells_fts(cells_fts, rowid, cell_id, notes) "
+    "VALUES ('delete', old.id, old.cell_id, old.notes); END",
+    "CREATE TRIGGER cells_fts_au AFTER UPDATE OF cell_id, notes ON cells BEGIN "
+    "INSERT INTO cells_fts(cells_fts, rowid, cell_id, notes) "
+    "VALUES ('delete', old.id, old.cell_id, old.notes); "
+    "INSERT INTO cells_fts(rowid, cell_id, notes) "
+    "VALUES (new.id, new.cell_id, new.notes); END",
+]
+SQLITE_CYCLE_SEARCH = [
+    "CREATE VIRTUAL TABLE cycles_fts USING fts5("
+    "observation, content='cycles', content_rowid='id')",
+    "CREATE TRIGGER cycles_fts_ai AFTER INSERT ON cycles BEGIN "
+    "INSERT INTO cycles_fts(rowid, observation) "
+    "VALUES (new.id, new.observation); END",
+    "CREATE TRIGGER cycles_fts_ad AFTER DELETE ON cycles BEGIN "
+    "INSERT INTO cycles_fts(cycles_fts, rowid, observation) "
+    "VALUES ('delete', old.id, old.observation); END",
+    "CREATE TRIGGER cycles_fts_au AFTER UPDATE OF observation ON cycles BEGIN "
+    "INSERT INTO cycles_fts(cycles_fts, rowid, observation) "
+    "VALUES ('delete', old.id, old.observation); "
+    "INSERT INTO cycles_fts(rowid, observation) "
+    "VALUES (new.id, new.observation); END",
+]
+POSTGRES_CELL_SEARCH = [
+    "CREATE INDEX ix_cells_cell_id_lower ON cells (lower(cell_id) text_pattern_ops)",
+    "CREATE INDEX ix_cells_cell_id_fts ON cells "
+    "USING gin (to_tsvector('simple'::regconfig, coalesce(cell_id, ''::text)))",
+    "CREATE INDEX ix_cells_notes_fts ON cells "
+    "USING gin (to_tsvector('english'::regconfig, coalesce(notes, ''::text)))",
+]
+POSTGRES_CYCLE_SEARCH = [
+    "CREATE INDEX ix_cycles_observation_fts ON cycles "
+    "USING gin (to_tsvector('english'::regconfig, coalesce(observation, ''::text)))",
+]
+
+for _table, _dialect, _statements in [
+    (Cell.__table__, "sqlite", SQLITE_CELL_SEARCH),
+    (Cycle.__table__, "sqlite", SQLITE_CYCLE_SEARCH),
+    (Cell.__table__, "postgresql", POSTGRES_CELL_SEARCH),
+    (Cycle.__table__, "postgresql", POSTGRES_CYCLE_SEARCH),
+]:
+    for _sql in _statements:
+        event.listen(_table, "after_create", DDL(_sql).execute_if(dialect=_dialect))
+for _table, _fts in [(Cell.__table__, "cells_fts"), (Cycle.__table__, "cycles_fts")]:
+    event.listen(
+        _table,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {_fts}").execute_if(dialect="sqlite"),
+    )
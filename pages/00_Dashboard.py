@@ -3,81 +3,111 @@ import pandas as pd
 
 # --- 1. IMPORTS UPDATED ---
 from database import get_db
-from models.base import Cell
+from models.base import Cell, Cycler
+from services import outbox, queries, querylog, warmup
 # --------------------------
 
-st.header("📊 Cycler Dashboard (8 channels)")
+querylog.begin(__file__)
+warmup.start()
+st.header("📊 Cycler Dashboard")
+outbox.status_line()  # pending writes of the local buffer, if any
 
-# --- 2. SESSION HANDLING UPDATED & REFACTORED ---
-# Fetch all necessary data from the database ONCE.
-with get_db() as db:
-    running_cells = (
-        db.query(Cell)
-        .filter(Cell.status == "running")
-        .all()
-    )
-# Create a dictionary for quick lookups: {channel_number: cell_object}
-running_cells_map = {cell.channel: cell for cell in running_cells}
-# ------------------------------------------------
+# --- Cyclers: add one (channels are numbered 1..channel_count) ---
+with st.expander("➕ Add a cycler"):
+    with st.form("add_cycler"):
+        c1, c2 = st.columns(2)
+        name = c1.text_input("Name*", placeholder="e.g. Neware 2")
+        channel_count = c2.number_input("Channels*", min_value=1, value=16, step=1)
+        if st.form_submit_button("Add cycler"):
+            with get_db() as db:
+                if not name.strip():
+                    st.error("Give the cycler a name.")
+                elif db.query(Cycler).filter(Cycler.name == name.strip()).first():
+                    st.error(f"A cycler called ‘{name.strip()}’ already exists.")
+                else:
+                    db.add(Cycler(name=name.strip(), channel_count=int(channel_count)))
+                    db.commit()
+                    st.rerun()
 
-# Create a list of dictionaries for the main display DataFrame
-running_data_list = [
-    {
-        "Channel": c.channel,
-        "Cell ID": c.cell_id,
-        "Chemistry": c.chemistry,
-        "Asm Date": c.assembly_date.date() if c.assembly_date else None,
-        "Rated Cap (mAh)": c.rated_capacity,
-    }
-    for c in running_cells
-]
+all_cyclers = queries.cyclers()
+if not all_cyclers:
+    st.info("No cyclers yet. Add one above.")
+    st.stop()
 
-df_running = pd.DataFrame(running_data_list)
+# --- 2. SESSION HANDLING UPDATED & REFACTORED ---
+# Fetch every channel of the chosen cyclers with its running cell in ONE query
+# (cached until the next write); empty channels are generated in SQL.
+cycler_ids = {c.name: c.id for c in all_cyclers}
+shown = st.multiselect("Cyclers", list(cycler_ids), default=list(cycler_ids))
+if not shown:
+    st.info("Pick at least one cycler.")
+    st.stop()
+board = queries.channel_board(tuple(cycler_ids[n] for n in shown))
+# ------------------------------------------------
 
-# Ensure the DataFrame has at least the merge key
-if df_running.empty:
-    df_running = pd.DataFrame(columns=["Channel"])
+# Status changes still in the local write buffer (services/outbox.py)
+buffered = outbox.pending_statuses()
 
-# Merge with a full channel list to show all 8 channels
-dash = (
-    pd.DataFrame({"Channel": range(1, 9)})
-    .merge(df_running, how="left", on="Channel")
+# Create a list of dictionaries for the main display DataFrame
+dash = pd.DataFrame(
+    [
+        {
+            "Cycler": ch.cycler,
+            "Channel": ch.channel,
+            "Cell ID": (
+                f"{ch.cell_id} (⏳ {buffered[ch.id]})"
+                if ch.id in buffered
+                else ch.cell_id or "—"
+            ),
+            "Chemistry": ch.chemistry or "—",
+            "Asm Date": ch.assembly_date.date() if ch.assembly_date else None,
+            "Rated Cap (mAh)": ch.rated_capacity,
+        }
+        for ch in board
+    ]
 )
 
-# Add any missing detail columns and fill with "—"
-detail_cols = ["Cell ID", "Chemistry", "Asm Date", "Rated Cap (mAh)"]
-for col in detail_cols:
-    if col not in dash.columns:
-        dash[col] = "—"
-dash.fillna("—", inplace=True)
-
-st.dataframe(dash, hide_index=True, use_container_width=True)
+# Action widgets are drawn for the selected row only, not per channel
+event = st.dataframe(
+    dash,
+    hide_index=True,
+    use_container_width=True,
+    on_select="rerun",
+    selection_mode="single-row",
+    key="channel_board",
+)
 
-# ── 3. Action buttons per channel ─────────────────────────────────
-for ch in range(1, 9):
-    col_label, col_action1, col_action2 = st.columns([3, 1, 1])
-    col_label.write(f"**Channel {ch}**")
+# ── 3. Actions for the selected channel ───────────────────────────
+selected = event.selection.rows
+if not selected:
+    st.caption("Select a channel in the table to start, log or stop a cell.")
+    st.stop()
 
-    # Check if the channel is empty by looking in our map
-    if ch not in running_cells_map:
-        if col_action1.button("Start", key=f"start_{ch}"):
-            st.session_state["new_channel"] = ch
-            st.switch_page("pages/01_Add_Cell.py")
-    else:
-        # Get the cell object from our map (no new DB query needed)
-        cell = running_cells_map[ch]
+ch = board[selected[0]]
+col_label, col_action1, col_action2 = st.columns([3, 1, 1])
+col_label.write(f"**{ch.cycler} · Channel {ch.channel}**")
 
-        # LOG button
-        if col_action1.button("Log", key=f"log_{ch}"):
-            st.session_state["log_cell_id"] = cell.id
-            st.switch_page("pages/02_Log_Cycle.py")
+# Check if the channel is empty (no running cell joined to it)
+if ch.id is None:
+    if col_action1.button("Start"):
+        st.session_state["new_cycler"] = ch.cycler_pk
+        st.session_state["new_channel"] = ch.channel
+        st.switch_page("pages/01_Add_Cell.py")
+else:
+    # LOG button
+    if col_action1.button("Log"):
+        st.session_state["log_cell_id"] = ch.id
+        st.switch_page("pages/02_Log_Cycle.py")
 
-        # STOP button
-        if col_action2.button("Stop", key=f"stop_{ch}"):
+    # STOP button
+    if col_action2.button("Stop"):
+        if outbox.enabled():
+            outbox.set_status(ch.id, "stopped")  # synced in the background
+        else:
             # This action MODIFIES the database, so it needs a new session
             with get_db() as db:
-                cell_to_stop = db.query(Cell).filter(Cell.id == cell.id).first()
+                cell_to_stop = db.query(Cell).filter(Cell.id == ch.id).first()
                 if cell_to_stop:
                     cell_to_stop.status = "stopped"
                     db.commit()
-            st.rerun()
\ No newline at end of file
+        st.rerun()
@@ -1,14 +1,33 @@
 import streamlit as st
 from datetime import datetime
+from sqlalchemy import or_
 
 # Imports updated
 from database import get_db
 from models.base import Cell
+from services import outbox, queries, querylog, warmup
 
 prefill = st.session_state.get("new_channel")
+prefill_cycler = st.session_state.get("new_cycler")
+querylog.begin(__file__)
+warmup.start()
 st.header("➕ Register New Cell")
-if prefill:
-    st.subheader(f"Assigning to Channel {prefill}")
+
+all_cyclers = queries.cyclers()
+if not all_cyclers:
+    st.info("No cyclers yet. Add one on the Dashboard page first.")
+    st.stop()
+
+# Outside the form so the channel list follows the chosen cycler
+cycler_ids = [c.id for c in all_cyclers]
+cycler = st.selectbox(
+    "Cycler",
+    all_cyclers,
+    index=cycler_ids.index(prefill_cycler) if prefill_cycler in cycler_ids else 0,
+    format_func=lambda c: f"{c.name} ({c.channel_count} channels)",
+)
+if prefill and prefill_cycler == cycler.id:
+    st.subheader(f"Assigning to {cycler.name} · Channel {prefill}")
 
 with st.form("add_cell"):
     c1, c2 = st.columns(2)
@@ -20,8 +39,11 @@ with st.form("add_cell"):
     znbr_molarity = c2.number_input("ZnBr molarity (eg: 1M)*", min_value=0.0)
     teacl_molarity = c2.number_input("TEACl molarity (eg: 1M)*", min_value=0.0)
     notes = st.text_area("Notes", height=80)
-    channel_pick = c2.selectbox("Cycler Channel", range(1, 9),
-                                index=(prefill - 1) if prefill else 0)
+    channels = range(1, cycler.channel_count + 1)
+    prefilled = prefill in channels and prefill_cycler == cycler.id
+    channel_pick = c2.selectbox(
+        "Cycler Channel", channels, index=(prefill - 1) if prefilled else 0
+    )
     submitted = st.form_submit_button("Save & Start")
 
 if submitted:
@@ -36,15 +58,22 @@ if submitted:
             )
             st.stop()
 
-        # 🔍 2. Check if channel is already running
-        busy = (
-            db.query(Cell)
-            .filter(Cell.channel == channel_pick, Cell.status == "running")
-            .first()
+        # 🔍 2. Check if channel is already running, counting status changes
+        # still in the local write buffer (services/outbox.py)
+        buffered = outbox.pending_statuses()
+        on_channel = db.query(Cell).filter(
+            Cell.cycler_id == cycler.id,
+            Cell.channel == channel_pick,
+            or_(Cell.status == "running", Cell.id.in_(buffered)),
+        )
+        busy = next(
+            (c for c in on_channel if buffered.get(c.id, c.status) == "running"),
+            None,
         )
         if busy:
             st.error(
-                f"Channel {channel_pick} already has running cell ‘{busy.cell_id}’. "
+                f"{cycler.name} channel {channel_pick} already has running cell "
+                f"‘{busy.cell_id}’. "
                 "Stop it first or choose a different channel."
             )
             st.stop()
@@ -60,6 +89,7 @@ if submitted:
                 teacl_molarity=teacl_molarity,
                 assembly_date=datetime.combine(asm_date, datetime.min.time()),
                 notes=notes,
+                cycler_id=cycler.id,
                 channel=channel_pick,
                 status="running",
             )
@@ -67,6 +97,7 @@ if submitted:
         db.commit()
     # --- END OF VALIDATION ---
 
-    st.success(f"Cell {cell_id} assigned to Channel {channel_pick} ✅")
+    st.success(f"Cell {cell_id} assigned to {cycler.name} channel {channel_pick} ✅")
     st.session_state.pop("new_channel", None)
+    st.session_state.pop("new_cycler", None)
     st.switch_page("app.py")
@@ -1,32 +1,29 @@
 # pages/02_Log_Cycle.py
 from pathlib import Path
-import uuid
 from datetime import datetime
 import streamlit as st
-from sqlalchemy import func # <-- Import 'func'
 
 # Imports updated
 from database import get_db
-from models.base import Cell, Cycle
+from models.base import Cycle
+from services import media, outbox, queries, querylog, warmup
 
-# storage for any future attachments
-MEDIA_ROOT = Path("media")
-MEDIA_ROOT.mkdir(exist_ok=True, parents=True)
+querylog.begin(__file__)
+warmup.start()
+st.header("✍️ Log Cycle Data")
 
-st.header("✍️ Log Cycle Data (manual)")
-
-# Fetch all running cells in one go
-with get_db() as db:
-    running_cells = (
-        db.query(Cell).filter(Cell.status == "running").order_by(Cell.cell_id).all()
-    )
+# Fetch all running cells and their highest cycle number (from cell_stats)
+running_cells = queries.running_cells()
+last_cycle_nos = {c.id: c.last_cycle_no for c in running_cells}
 
 if not running_cells:
     st.info("No cells are currently running. Start one on the Dashboard first.")
     st.stop()
 
 # Prepare options for the selectbox
-cell_opts = {f"{c.cell_id} (Ch {c.channel})": c.id for c in running_cells}
+cell_opts = {
+    f"{c.cell_id} ({c.cycler or '—'} · Ch {c.channel})": c.id for c in running_cells
+}
 options = list(cell_opts.keys())
 
 # Determine the default selection based on session state
@@ -40,12 +37,62 @@ if prefill_id and prefill_id in cell_opts.values():
 cell_label = st.selectbox("Select running cell ▼", options, index=default_index)
 cell_db_id = cell_opts[cell_label]
 
-# --- LOGIC CORRECTED HERE ---
-# Find the highest existing cycle number and add 1. This is more robust.
-with get_db() as db:
-    last_cycle_no = db.query(func.max(Cycle.cycle_no)).filter(Cycle.cell_id == cell_db_id).scalar()
-next_cycle_no = (last_cycle_no or 0) + 1
-# --- END OF CORRECTION ---
+# Highest existing cycle number + 1 (fetched with the running cells above),
+# counting cycles still waiting in the local write buffer (services/outbox.py)
+next_cycle_no = max(
+    last_cycle_nos.get(cell_db_id) or 0, outbox.last_pending_cycle(cell_db_id) or 0
+) + 1
+outbox.status_line()
+
+mode = st.radio(
+    "Mode", ["Manual entry", "Import cycler file"], horizontal=True, key="log_mode"
+)
+
+# --- Import mode: bulk-load a cycler summary export (one row per cycle) ---
+if mode == "Import cycler file":
+    export = st.file_uploader(
+        "Cycler export (one row per cycle)", type=["csv", "xlsx"], key="import_file"
+    )
+    if export is None:
+        st.caption(
+            "Columns are matched by header, e.g. *Cycle*, *Charge Capacity (mAh)*, "
+            "*Discharge Capacity (mAh)*, *Max Charge Voltage (V)*. Re-importing a "
+            "file updates the cycles it already created."
+        )
+        st.stop()
+
+    # pandas-based; loaded only once a file is chosen (see services/warmup.py)
+    from services.importer import detect_columns, import_cycles, iter_chunks
+
+    # Show how the headers were understood before touching the database
+    header_chunk = next(iter_chunks(export, export.name, chunk_size=5), None)
+    export.seek(0)
+    mapping = detect_columns(header_chunk.columns if header_chunk is not None else [])
+    st.dataframe(
+        [{"File column": h, "Saved as": attr} for h, (attr, _) in mapping.items()],
+        hide_index=True,
+    )
+
+    if st.button("📥 Import cycles", key="import_clicked"):
+        progress = st.empty()
+        try:
+            with get_db() as db:
+                result = import_cycles(
+                    db,
+                    cell_db_id,
+                    export,
+                    export.name,
+                    progress=lambda n: progress.caption(f"{n:,} rows processed …"),
+                )
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        st.success(
+            f"Imported {result['inserted']:,} new and updated {result['updated']:,} "
+            f"existing cycles ({result['skipped']:,} rows without a cycle number "
+            "skipped)."
+        )
+    st.stop()
 
 st.markdown(f"**Next cycle number:** {next_cycle_no}")
 st.write("")  # tiny spacer
@@ -68,29 +115,61 @@ if save_clicked:
     ce_pct = (discharge_ah / charge_ah) * 100 if charge_ah > 0 else 0
     delta_v = charge_V - discharge_V
 
+    # Attachments go to the content-addressed store (streamed, deduplicated);
+    # photos are kept in photo_path, data files in csv_path
     attach_path = None
     if attachment:
-        suffix = Path(attachment.name).suffix
-        attach_path = MEDIA_ROOT / f"{uuid.uuid4()}{suffix}"
-        attach_path.write_bytes(attachment.getbuffer())
-
-    with get_db() as db:
-        db.add(
-            Cycle(
-                cell_id=cell_db_id,
-                cycle_no=next_cycle_no,
-                current_density=current_density,
-                charge_V=charge_V,
-                discharge_V=discharge_V,
-                capacity_mAh=discharge_ah * 1000,
-                csv_path=str(attach_path) if attach_path else None,
-                ce_pct=ce_pct,
-                delta_V=delta_v,
-                observation=observation,
-                created_at=datetime.utcnow(),
+        attach_path = media.save_stream(attachment, Path(attachment.name).suffix)
+    photo_path = attach_path if attach_path and media.is_image(attach_path) else None
+    csv_path = attach_path if attach_path and not photo_path else None
+
+    values = dict(
+        cell_id=cell_db_id,
+        cycle_no=next_cycle_no,
+        current_density=current_density,
+        charge_V=charge_V,
+        discharge_V=discharge_V,
+        capacity_mAh=discharge_ah * 1000,
+        charge_capacity_mAh=charge_ah * 1000,
+        csv_path=str(csv_path) if csv_path else None,
+        photo_path=str(photo_path) if photo_path else None,
+        ce_pct=ce_pct,
+        delta_V=delta_v,
+        observation=observation,
+        created_at=datetime.utcnow(),
+    )
+    if outbox.enabled():
+        # Remote database: on local disk now, synced by the background worker
+        outbox.add_cycle(values)
+    else:
+        from services import derived  # pandas-based, like the importer
+
+        with get_db() as db:
+            db.add(Cycle(**values))
+            db.flush()
+            derived.recompute(
+                db, cell_db_id, first=next_cycle_no, last=next_cycle_no,
+                metrics=derived.DERIVED_ONLY,
+            )
+            db.commit()
+
+    # Raw time/V/I exports also go into the columnar curve store for the viewer
+    if csv_path:
+        from services import curves
+
+        try:
+            n_samples, skipped = curves.ingest_curve_file(
+                cell_db_id, csv_path, next_cycle_no
+            )
+        except ValueError:
+            n_samples, skipped = 0, []
+        if n_samples:
+            st.info(f"Stored {n_samples:,} curve samples for the Cell Viewer.")
+        if skipped:
+            st.warning(
+                "Curves already stored for cycle(s) "
+                f"{', '.join(map(str, skipped))}: kept the stored ones."
             )
-        )
-        db.commit()
 
     st.success(
         f"Cycle {next_cycle_no} saved ✔ "
@@ -1,50 +1,78 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import func
 
 # Imports updated
-from database import get_db
-from models.base import Cell, Cycle
+from services import querylog, search, warmup
 
+querylog.begin(__file__)
+warmup.start()
 st.header("🔍 Select a Cell")
 
 # 1. status filter + search box
 status_choice = st.radio("Show", ["Running", "Stopped", "All"], horizontal=True)
-search_text = st.text_input("Filter by ID or channel contains…", "")
+search_text = st.text_input(
+    "Search ID, channel, notes or observations…",
+    "",
+    help="Cell ID prefix, channel number, or words from notes / cycle observations",
+)
+status = None if status_choice == "All" else status_choice.lower()
 
-# 2. Fetch data from the database
-with get_db() as db:
-    q = db.query(Cell).order_by(Cell.cell_id)
-    if status_choice != "All":
-        q = q.filter(Cell.status == status_choice.lower())
-    cells = q.all()
+# Keyset paging: the stack holds the last cell_id of every previous page and
+# starts over whenever the search or the status filter changes
+if st.session_state.get("search_key") != (search_text, status):
+    st.session_state["search_key"] = (search_text, status)
+    st.session_state["search_pages"] = []
+pages = st.session_state["search_pages"]
+
+# 2. The database does the filtering (cached until the next write)
+# Cycle counts come from the maintained cell_stats summary (no GROUP BY)
+cells, has_more = search.search_cells(
+    search_text, status, after=pages[-1] if pages else None
+)
+
+
+def _match(c) -> str:
+    """Why this cell matched (shown only while searching)."""
+    text = search_text.strip().lower()
+    words = search.query_words(text)
+    id_words = search.query_words(c.cell_id)
+    found = []
+    if c.cell_id.lower().startswith(text) or (
+        words and all(any(i.startswith(w) for i in id_words) for w in words)
+    ):
+        found.append("ID")
+    if text == str(c.channel):
+        found.append("channel")
+    if c.obs_hits:
+        found.append(f"{c.obs_hits} obs. (last #{c.last_obs_cycle})")
+    return ", ".join(found) or "notes"
 
-    # Get cycle counts with a single efficient query
-    counts = {}
-    if cells:
-        counts = dict(
-            db.query(Cycle.cell_id, func.count())
-            .filter(Cycle.cell_id.in_([c.id for c in cells]))
-            .group_by(Cycle.cell_id)
-            .all()
-        )
 
-# Filter the results in Python based on the search text
 rows = [
     {
         "Cell ID": c.cell_id,
+        "Cycler": c.cycler,
         "Channel": c.channel,
         "Status": c.status,
         "Chem": c.chemistry,
-        "Cycles": counts.get(c.id, 0),
+        "Cycles": c.cycle_count or 0,
+        **({"Match": _match(c)} if search_text.strip() else {}),
     }
     for c in cells
-    if not search_text or (search_text.lower() in c.cell_id.lower() or search_text in str(c.channel))
 ]
 
 df = pd.DataFrame(rows)
 st.dataframe(df, hide_index=True, use_container_width=True)
 
+nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+if nav_prev.button("◀ Prev", disabled=not pages):
+    pages.pop()
+    st.rerun()
+if nav_next.button("Next ▶", disabled=not has_more):
+    pages.append(cells[-1].cell_id)
+    st.rerun()
+nav_info.caption(f"Page {len(pages) + 1} · {search.PAGE_SIZE} cells per page")
+
 # --- 3. LOGIC CORRECTED HERE ---
 # Check if the DataFrame is empty *before* trying to access its columns
 if not df.empty:
@@ -1,97 +1,66 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 
 # Imports updated
-from database import get_db
-from models.base import Cell, Cycle
+from database import get_db, read_db
+from services import curves, media, plotting, queries, querylog, warmup
+from services.cycle_edits import save_cycle_edits
 
+querylog.begin(__file__)
+warmup.start()
 st.header("📂 Cell Viewer")
 
-# This function now correctly handles data types from the data editor
 def update_cycles_in_db(orig: pd.DataFrame, edited: pd.DataFrame, cell_id: int) -> bool:
-    """Save all changed cells for this cell_id; returns True if anything updated."""
-    orig_filled = orig.fillna("")
-    edited_filled = edited.fillna("")
-    diff_mask = edited_filled.ne(orig_filled)
-
-    if not diff_mask.any().any():
-        return False
-
-    # This map links the DataFrame column names to the database model attributes
-    col_map = {
-        "Current (mA/cm²)": "current_density",
-        "Charge V": "charge_V",
-        "Discharge V": "discharge_V",
-        "ΔV": "delta_V",
-        "CE %": "ce_pct",
-        "Cap. (mAh)": "capacity_mAh",
-        "Obs": "observation",
-    }
-
+    """Save edited, added and deleted rows of this cell; True if anything changed."""
     with get_db() as db:
-        for row_idx, row in diff_mask.iterrows():
-            if not row.any():
-                continue
-
-            cycle_no = int(edited.loc[row_idx, "Cycle #"])
-            cycle = (
-                db.query(Cycle)
-                .filter(Cycle.cell_id == cell_id, Cycle.cycle_no == cycle_no)
-                .first()
-            )
-            if not cycle:
-                continue
-
-            # Apply every changed column in this row
-            for col_name, changed in row.items():
-                if changed and col_name in col_map:
-                    new_val = edited.loc[row_idx, col_name]
-                    db_attr = col_map[col_name]
-
-                    # --- THIS IS THE FIX ---
-                    # Convert numpy types to standard Python types before saving
-                    if pd.api.types.is_number(new_val):
-                        setattr(cycle, db_attr, float(new_val))
-                    else:
-                        setattr(cycle, db_attr, str(new_val))
-                    # --- END OF FIX ---
-
-        db.commit()
-    return True
+        counts = save_cycle_edits(db, cell_id, orig, edited)
+    return any(counts.values())
 
 
 # --- Data Fetching Logic ---
-with get_db() as db:
-    all_cells = db.query(Cell).order_by(Cell.cell_id).all()
-
-if not all_cells:
-    st.info("No cells in the database yet. Add one from the Dashboard.")
-    st.stop()
-
-# Prepare the selectbox options
-cell_map = {f"{c.cell_id} (Ch {c.channel or '—'})": c.id for c in all_cells}
-cell_keys = list(cell_map.keys())
-
-# Determine the default selection
-prefill_id = st.session_state.get("log_cell_id")
-default_idx = 0
-if prefill_id and prefill_id in cell_map.values():
-    prefilled_key = next((k for k, v in cell_map.items() if v == prefill_id), None)
-    if prefilled_key:
-        default_idx = cell_keys.index(prefilled_key)
-
-chosen_label = st.selectbox("Select a cell ▼", cell_keys, index=default_idx)
-cell_id = cell_map[chosen_label]
-
-# Fetch details for the chosen cell
-with get_db() as db:
-    cell = db.query(Cell).get(cell_id)
-    cycles = (
-        db.query(Cycle)
-        .filter(Cycle.cell_id == cell_id)
-        .order_by(Cycle.cycle_no)
-        .all()
+# Cached reads; on a cache miss they share one connection (see database.read_db)
+with read_db():
+    all_cells = queries.all_cells()
+
+    if not all_cells:
+        st.info("No cells in the database yet. Add one from the Dashboard.")
+        st.stop()
+
+    # Prepare the selectbox options
+    cell_map = {
+        f"{c.cell_id} ({c.cycler or '—'} · Ch {c.channel or '—'})": c.id
+        for c in all_cells
+    }
+    cell_keys = list(cell_map.keys())
+
+    # Determine the default selection
+    prefill_id = st.session_state.get("log_cell_id")
+    default_idx = 0
+    if prefill_id and prefill_id in cell_map.values():
+        prefilled_key = next((k for k, v in cell_map.items() if v == prefill_id), None)
+        if prefilled_key:
+            default_idx = cell_keys.index(prefilled_key)
+
+    chosen_label = st.selectbox("Select a cell ▼", cell_keys, index=default_idx)
+    cell_id = cell_map[chosen_label]
+
+    # The chosen cell is already loaded above
+    cell = next(c for c in all_cells if c.id == cell_id)
+
+    # --- Pagination state (per cell): keyset on cycle_no, never OFFSET ---
+    if st.session_state.get("page_cell") != cell_id:
+        st.session_state["page_cell"] = cell_id
+        st.session_state["page_start"] = None
+        st.session_state["page_before"] = None
+    page_size = st.session_state.get("page_size", 100)
+
+    # Whole-history stats come from one aggregate query, not from the rows
+    summary = queries.cycle_summary(cell_id)
+    page_rows, has_prev, has_next = queries.cycle_page(
+        cell_id,
+        start=st.session_state["page_start"],
+        before=st.session_state["page_before"],
+        page_size=page_size,
     )
 
 # --- Display logic (no changes needed here) ---
@@ -105,12 +74,35 @@ meta_cols[0].write(f"**Rated Cap.:** {cell.rated_capacity} mAh")
 meta_cols[1].write(f"**Config:** {cell.configuration}")
 meta_cols[2].write(f"**Assembly Date:** {cell.assembly_date.date()}")
 meta_cols[3].write(f"**Status:** {cell.status.capitalize()}")
+meta_cols[0].write(f"**Cycler:** {cell.cycler or '—'} · Ch {cell.channel or '—'}")
 st.markdown(f"**Notes** \n{cell.notes or '—'}")
 
-if not cycles:
+if not summary.cycles:
     st.warning("No cycles logged for this cell yet.")
     st.stop()
 
+# --- Summary of the whole history ---
+retention = (
+    summary.last_capacity / summary.first_capacity * 100
+    if summary.first_capacity and summary.last_capacity is not None
+    else None
+)
+stat_cols = st.columns(5)
+stat_cols[0].metric("Cycles", f"{summary.cycles:,}",
+                    help=f"#{summary.first_cycle} – #{summary.last_cycle}")
+stat_cols[1].metric("Avg CE %", f"{summary.avg_ce:.2f}" if summary.avg_ce else "—")
+stat_cols[2].metric("Min CE %", f"{summary.min_ce:.2f}" if summary.min_ce else "—")
+stat_cols[3].metric(
+    "Avg ΔV", f"{summary.avg_delta_V:.4f}" if summary.avg_delta_V else "—"
+)
+stat_cols[4].metric("Cap. retention", f"{retention:.1f} %" if retention else "—")
+
+
+def _go_to(start=None, before=None):
+    st.session_state["page_start"] = start
+    st.session_state["page_before"] = before
+
+
 orig_df = pd.DataFrame(
     [
         {
@@ -123,30 +115,108 @@ orig_df = pd.DataFrame(
             "Cap. (mAh)": c.capacity_mAh,
             "Obs": c.observation or "",
         }
-        for c in cycles
-    ]
+        for c in page_rows
+    ],
+    columns=["Cycle #", "Current (mA/cm²)", "Charge V", "Discharge V", "ΔV", "CE %",
+             "Cap. (mAh)", "Obs"],
 )
+first_no = page_rows[0].cycle_no if page_rows else None
+last_no = page_rows[-1].cycle_no if page_rows else None
 
 st.subheader("📊 Cycle table (click to edit)")
+nav = st.columns([1, 1, 2, 2, 1])
+nav[0].button("◀ Prev", disabled=not has_prev, on_click=_go_to,
+              kwargs={"before": first_no})
+nav[1].button("Next ▶", disabled=not has_next, on_click=_go_to,
+              kwargs={"start": (last_no or 0) + 1})
+nav[2].selectbox("Rows per page", [50, 100, 250, 500], index=1, key="page_size")
+jump = nav[3].number_input("Jump to cycle #", min_value=1, step=1, value=first_no or 1)
+nav[4].button("Go", on_click=_go_to, kwargs={"start": int(jump)})
+if page_rows:
+    st.caption(f"Showing cycles #{first_no} – #{last_no} of {summary.cycles:,}")
+
+# Edits (including added/deleted rows) are scoped to the visible page. Cycle
+# numbers are read-only: renumbering a saved row would delete it and insert a
+# bare copy (losing its photo, curve file and timestamps); added rows are
+# numbered on save, continuing the cell's sequence.
 edited_df = st.data_editor(
     orig_df,
     use_container_width=True,
     num_rows="dynamic",
-    key="cycle_editor",
+    disabled=["Cycle #"],
+    key=f"cycle_editor_{cell_id}_{first_no}_{page_size}",
 )
 
 if st.button("💾 Save changes", disabled=edited_df.equals(orig_df)):
-    if update_cycles_in_db(orig_df, edited_df, cell.id):
+    try:
+        saved = update_cycles_in_db(orig_df, edited_df, cell.id)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    if saved:
         st.success("Changes saved to database.")
         st.rerun()
     else:
         st.info("No changes detected.")
 
+# --- Photos of the visible page (cached thumbnails, never the originals) ---
+# Older uploads kept photos in csv_path, so look there too
+page_photos = [
+    (c.cycle_no, path)
+    for c in page_rows
+    for path in (c.photo_path, c.csv_path)
+    if path and media.is_image(path) and media.exists(path)
+]
+if page_photos:
+    with st.expander(f"📷 Photos on this page ({len(page_photos)})"):
+        photo_cols = st.columns(4)
+        for i, (cycle_no, path) in enumerate(page_photos):
+            try:
+                photo_cols[i % 4].image(
+                    str(media.thumbnail(path)), caption=f"Cycle {cycle_no}"
+                )
+            except OSError:
+                photo_cols[i % 4].caption(f"Cycle {cycle_no}: unreadable photo")
+
 st.subheader("🔎 Plot a metric")
 metric = st.selectbox(
     "Y-axis metric",
-    ["Charge V", "Discharge V", "ΔV", "CE %", "Cap. (mAh)"],
+    list(plotting.METRIC_COLUMNS),
     index=3,
 )
-fig = px.line(edited_df, x="Cycle #", y=metric, markers=True)
+if edited_df.equals(orig_df) or metric not in edited_df.columns:
+    # Saved data: figure is cached per (cell, metric, cycles version)
+    fig = plotting.metric_figure(cell.id, metric)
+    if not edited_df.equals(orig_df):
+        st.caption(f"{metric} is derived on save: showing the saved values.")
+else:
+    # Unsaved edits: plot what's in the editor (still downsampled)
+    fig = plotting.line_figure(
+        [(metric, edited_df["Cycle #"], edited_df[metric])], "Cycle #", metric,
+        markers=True,
+    )
 st.plotly_chart(fig, use_container_width=True)
+
+# --- Raw charge/discharge curves (memory-mapped, see services/curves.py) ---
+curve_cycles = curves.stored_cycles(cell.id)
+if curve_cycles:
+    st.subheader("⚡ Charge/discharge curves")
+    first, last = st.select_slider(
+        "Cycles to overlay",
+        options=curve_cycles,
+        value=(curve_cycles[0], curve_cycles[min(4, len(curve_cycles) - 1)]),
+    )
+    # LTTB keeps each curve's shape in ≤2k points; WebGL kicks in for big overlays
+    curve_fig = plotting.line_figure(
+        [
+            (f"Cycle {no}", (curve["t"] - curve["t"][0]) / 3600, curve["V"])
+            for no, curve in curves.load_cycles(cell.id, first, last).items()
+        ],
+        "Time in cycle (h)",
+        "Voltage (V)",
+    )
+    st.plotly_chart(curve_fig, use_container_width=True)
+
+    ee = curves.energy_efficiency(cell.id, first, last)
+    if not ee.empty:
+        st.dataframe(ee.round(4), hide_index=True, use_container_width=True)
@@ -0,0 +1,82 @@
+import os
+from datetime import date, datetime
+
+import streamlit as st
+
+from database import get_setting, read_db
+from services import querylog, warmup
+from services.batch_export import BatchExport, select_cells
+
+querylog.begin(__file__)
+warmup.start()
+st.header("📦 Batch Export")
+
+# 1. Filter
+col_status, col_chem = st.columns(2)
+status_choice = col_status.radio(
+    "Status", ["All", "Running", "Stopped"], horizontal=True
+)
+chemistry = col_chem.text_input("Chemistry (exact, blank = any)", "").strip()
+use_dates = st.checkbox("Filter by assembly date")
+start = end = None
+if use_dates:
+    picked = st.date_input(
+        "Assembled between", (date(date.today().year, 1, 1), date.today())
+    )
+    # mid-selection the widget returns just the start date
+    start, end = (tuple(picked) + (None,))[:2]
+formats = st.multiselect(
+    "Formats", ["xlsx", "pdf"], default=["xlsx"],
+    format_func={"xlsx": "Excel", "pdf": "PDF"}.get,
+)
+
+with read_db() as db:
+    cells = select_cells(
+        db,
+        status=None if status_choice == "All" else status_choice.lower(),
+        start=start,
+        end=end,
+        chemistry=chemistry or None,
+    )
+st.caption(f"{len(cells)} cell(s) match")
+
+job = st.session_state.get("batch_export")
+running = job is not None and not job.progress()["finished"]
+
+# 2. Start the job (it runs in the background; this rerun ends right away)
+if st.button("🚀 Export", disabled=running or not cells or not formats):
+    os.makedirs(os.path.join("media", "exports"), exist_ok=True)
+    zip_path = os.path.join(
+        "media", "exports", f"cells_{datetime.now():%Y%m%d_%H%M%S}.zip"
+    )
+    job = BatchExport(get_setting("DATABASE_URL"), cells, formats, zip_path)
+    st.session_state["batch_export"] = job.start()
+    running = True
+
+
+# 3. Progress: only this fragment reruns every second while the job is running
+@st.fragment(run_every=1)
+def show_progress():
+    querylog.begin_fragment("show_progress")
+    p = job.progress()
+    st.progress(p["done"] / max(p["total"], 1), f"{p['done']} / {p['total']} cells")
+    if p["finished"]:
+        st.rerun()  # full rerun shows the result and stops the polling
+
+
+if running:
+    show_progress()
+elif job is not None:
+    p = job.progress()
+    if p["error"]:
+        st.error(f"Export failed: {p['error']}")
+    else:
+        ok = p["total"] - len(p["failed"])
+        st.success(f"Exported {ok} of {p['total']} cells.")
+        for cell_id, msg in p["failed"]:
+            st.warning(f"{cell_id}: {msg}")
+        with open(job.zip_path, "rb") as f:
+            st.download_button(
+                "⬇️ Download ZIP", f, file_name=os.path.basename(job.zip_path),
+                mime="application/zip",
+            )
@@ -0,0 +1,99 @@
+import streamlit as st
+import pandas as pd
+
+from database import read_db
+from services import analytics, plotting, queries, querylog, warmup
+
+querylog.begin(__file__)
+warmup.start()
+st.header("📈 Degradation Analytics")
+
+# 1. Every cell's metrics in one pass over all cycles (services/analytics.py),
+# cached until cycles change
+col_status, col_window = st.columns([3, 2])
+status_choice = col_status.radio("Show", ["All", "Running", "Stopped"], horizontal=True)
+window = col_window.select_slider(
+    "Rolling CE window (cycles)", [5, 10, 20, 50, 100], value=analytics.DEFAULT_WINDOW
+)
+
+with read_db():
+    cells = queries.all_cells(None if status_choice == "All" else status_choice.lower())
+    metrics = analytics.degradation_table(window)
+
+if not cells:
+    st.info("No cells in the database yet. Add one from the Dashboard.")
+    st.stop()
+
+info = pd.DataFrame(
+    {
+        "id": [c.id for c in cells],
+        "Cell": [c.cell_id for c in cells],
+        "Chemistry": [c.chemistry for c in cells],
+        "Cycler": [c.cycler or "—" for c in cells],
+        "Status": [c.status.capitalize() for c in cells],
+    }
+)
+ranking = info.merge(metrics, left_on="id", right_index=True, how="inner")
+if ranking.empty:
+    st.info("None of these cells has cycles yet.")
+    st.stop()
+
+# 2. Ranking: worst fade first; click a header to sort by anything else
+ranking = ranking.sort_values("fade_rate", ascending=False, na_position="last")
+st.caption(
+    f"{len(ranking)} cells · retention is discharge capacity vs the first cycle, "
+    f"end of life at {analytics.EOL_RETENTION:.0f} %"
+)
+shown = st.dataframe(
+    ranking.drop(columns="id"),
+    hide_index=True,
+    use_container_width=True,
+    on_select="rerun",
+    selection_mode="multi-row",
+    column_config={
+        "cycles": st.column_config.NumberColumn("Cycles", format="%d"),
+        "last_cycle": st.column_config.NumberColumn("Last #", format="%d"),
+        "first_capacity": st.column_config.NumberColumn("Cap. #1", format="%.3f"),
+        "last_capacity": st.column_config.NumberColumn("Cap. last", format="%.3f"),
+        "retention_pct": st.column_config.NumberColumn("Retention %", format="%.1f"),
+        "cycles_to_80": st.column_config.NumberColumn(
+            "Cycles to 80 %", format="%d", help="Blank: still above 80 %"
+        ),
+        "avg_ce": st.column_config.NumberColumn("Avg CE %", format="%.2f"),
+        "ce_rolling": st.column_config.NumberColumn(
+            f"CE % (last {window})", format="%.2f"
+        ),
+        "dv_drift": st.column_config.NumberColumn(
+            "ΔV drift", format="%.2f", help="mV per 100 cycles (least squares)"
+        ),
+        "fade_rate": st.column_config.NumberColumn(
+            "Fade", format="%.2f", help="% retention lost per 100 cycles"
+        ),
+    },
+)
+
+# 3. Curves of the selected rows (or the five worst)
+picked = shown.selection.rows if shown else []
+chosen = ranking.iloc[picked] if picked else ranking.head(5)
+curves = analytics.cell_curves(tuple(int(i) for i in chosen["id"]), window)
+names = dict(zip(chosen["id"], chosen["Cell"]))
+by_cell = [(names[cid], rows) for cid, rows in curves.groupby("cell_id", sort=False)]
+
+st.subheader("Selected cells" if picked else "Five fastest-fading cells")
+col_ret, col_ce = st.columns(2)
+col_ret.plotly_chart(
+    plotting.line_figure(
+        [(name, r["cycle_no"], r["retention_pct"]) for name, r in by_cell],
+        "Cycle #",
+        "Retention %",
+    ),
+    use_container_width=True,
+)
+col_ce.plotly_chart(
+    plotting.line_figure(
+        [(name, r["cycle_no"], r["ce_rolling"]) for name, r in by_cell],
+        "Cycle #",
+        f"CE % (rolling {window})",
+    ),
+    use_container_width=True,
+)
@@ -0,0 +1,54 @@
+import streamlit as st
+
+from services import analytics, plotting, queries, querylog, warmup
+
+querylog.begin(__file__)
+warmup.start()
+st.header("🆚 Compare Cells")
+
+# 1. Pick cells (cell list is cached; no per-cell lookups)
+all_cells = queries.all_cells()
+if not all_cells:
+    st.info("No cells in the database yet. Add one from the Dashboard.")
+    st.stop()
+
+names = {c.id: c.cell_id for c in all_cells}
+labels = {
+    c.id: f"{c.cell_id} ({c.cycler or '—'} · Ch {c.channel or '—'})"
+    for c in all_cells
+}
+running = [c.id for c in all_cells if c.status == "running"]
+chosen = st.multiselect(
+    "Cells", list(labels), default=running[:4], format_func=labels.get
+)
+if not chosen:
+    st.info("Pick at least one cell.")
+    st.stop()
+
+col_metric, col_align, col_layout = st.columns([2, 2, 2])
+metric = col_metric.selectbox("Metric", list(plotting.METRIC_COLUMNS), index=3)
+align = col_align.radio("Align by", ["Cycle #", "Elapsed time (h)"], horizontal=True)
+layout = col_layout.radio("Layout", ["Overlay", "Small multiples"], horizontal=True)
+
+# 2. ONE query for every chosen cell, only the columns the plot needs
+# (cached until cycles change, see services/analytics.compare_frame)
+data = analytics.compare_frame(tuple(chosen), plotting.METRIC_COLUMNS[metric])
+x_col = "cycle_no" if align == "Cycle #" else "hours"
+by_cell = dict(tuple(data.groupby("cell_id", sort=False)))
+series = [
+    (names[cid], by_cell[cid][x_col], by_cell[cid]["value"])
+    for cid in chosen
+    if cid in by_cell
+]
+missing = [names[cid] for cid in chosen if cid not in by_cell]
+if missing:
+    st.caption("No cycles yet: " + ", ".join(missing))
+if not series:
+    st.stop()
+
+# 3. Plot
+if layout == "Overlay":
+    fig = plotting.line_figure(series, align, metric)
+else:
+    fig = plotting.small_multiples(series, align, metric)
+st.plotly_chart(fig, use_container_width=True)
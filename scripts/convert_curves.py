@@ -0,0 +1,63 @@
+"""Convert existing cycle attachments into the columnar curve store.
+
+Usage:
+    python scripts/convert_curves.py                  # DATABASE_URL from secrets
+    python scripts/convert_curves.py --url sqlite:///local.db
+
+Every Cycle.csv_path pointing at a CSV/XLSX with time/voltage/current columns is
+appended to media/curves/ (see services/curves.py). Files without those columns
+are skipped, and so are cycles already in the store, so it is safe to run
+again. Run from the project root so media/ paths resolve.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import get_setting, make_engine  # noqa: E402
+from models.base import Cycle  # noqa: E402
+from services import media  # noqa: E402
+from services.curves import ingest_curve_file  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    db_url = args.url or get_setting("DATABASE_URL")
+    if not db_url:
+        sys.exit("DATABASE_URL not found in .streamlit/secrets.toml (or pass --url)")
+
+    with Session(make_engine(db_url)) as db:
+        attachments = db.execute(
+            select(Cycle.cell_id, Cycle.cycle_no, Cycle.csv_path)
+            .where(Cycle.csv_path.isnot(None))
+            .order_by(Cycle.cell_id, Cycle.cycle_no)
+        ).all()
+
+    converted = 0
+    for cell_pk, cycle_no, csv_path in attachments:
+        path = Path(csv_path)
+        if path.suffix.lower() not in (".csv", ".xlsx") or not media.exists(path):
+            continue
+        try:
+            n, _ = ingest_curve_file(cell_pk, path, cycle_no)
+        except ValueError as e:
+            print(f"skip {path}: {e}")
+            continue
+        if n:
+            converted += 1
+            print(f"cell {cell_pk} cycle {cycle_no}: {n:,} samples")
+    print(f"Converted {converted} of {len(attachments)} attachments.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Watch a folder of cycler exports and import new/changed files continuously.
+
+Usage:
+    python scripts/ingest_daemon.py --dir /srv/cycler-exports
+    python scripts/ingest_daemon.py --once               # one pass, then exit
+    python scripts/ingest_daemon.py --url sqlite:///local.db --interval 5
+
+The folder defaults to INGEST_DIR (secrets or environment). Files are matched
+to running cells by cell ID or channel in the file name (see services/ingest.py);
+put each cycler's files in a sub-folder named after it when several cyclers
+share channel numbers. Processed files are tracked in --manifest, so restarts
+pick up where the last run stopped. Run from the project root.
+"""
+import argparse
+import os
+import sys
+import time
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import get_setting, make_engine, note_external_write  # noqa: E402
+from services.ingest import IngestWorker  # noqa: E402
+
+
+def report(results: list) -> None:
+    for r in results:
+        name = os.path.basename(r["path"])
+        if r["status"] == "imported":
+            print(f"{name}: cell {r['cell_id']} +{r['inserted']} new, "
+                  f"{r['updated']} updated", flush=True)
+        elif r["status"] == "error":
+            print(f"{name}: error: {r['error']}", flush=True)
+        else:
+            print(f"{name}: no running cell matches this file", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--dir", help="folder to watch (default: INGEST_DIR)")
+    parser.add_argument("--manifest", default=os.path.join("media", "ingest.json"))
+    parser.add_argument("--interval", type=float, default=2.0,
+                        help="seconds between scans")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads reading and parsing files")
+    parser.add_argument("--once", action="store_true", help="scan once and exit")
+    args = parser.parse_args()
+
+    db_url = args.url or get_setting("DATABASE_URL")
+    if not db_url:
+        sys.exit("DATABASE_URL not found in .streamlit/secrets.toml (or pass --url)")
+    folder = args.dir or get_setting("INGEST_DIR")
+    if not folder or not os.path.isdir(folder):
+        sys.exit("Pass --dir or set INGEST_DIR to an existing folder")
+
+    worker = IngestWorker(make_engine(db_url), folder, args.manifest, args.workers)
+    print(f"Watching {worker.folder} (manifest: {args.manifest})", flush=True)
+    try:
+        while True:
+            started = time.monotonic()
+            results = worker.run_once()
+            if any(r["status"] == "imported" for r in results):
+                note_external_write()  # app processes drop their cached reads
+            report(results)
+            if args.once:
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+
+
+if __name__ == "__main__":
+    main()
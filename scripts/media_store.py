@@ -0,0 +1,53 @@
+"""Maintain the content-addressed media store (media/store/).
+
+Usage:
+    python scripts/media_store.py gc --dry-run        # what would be deleted
+    python scripts/media_store.py gc                  # delete unreferenced files
+    python scripts/media_store.py adopt               # move old uploads into it
+    python scripts/media_store.py gc --url sqlite:///local.db
+
+gc deletes stored files that no Cycle.csv_path / photo_path refers to, except
+files younger than --grace seconds (their cycle may still be being saved).
+Run from the project root so media/ paths resolve.
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import get_setting, make_engine  # noqa: E402
+from services import media  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["gc", "adopt"])
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="gc: only report what would be deleted")
+    parser.add_argument("--grace", type=int, default=media.GC_GRACE_SECONDS,
+                        help="gc: keep files younger than this many seconds")
+    args = parser.parse_args()
+
+    db_url = args.url or get_setting("DATABASE_URL")
+    if not db_url:
+        sys.exit("DATABASE_URL not found in .streamlit/secrets.toml (or pass --url)")
+
+    with Session(make_engine(db_url)) as db:
+        if args.command == "adopt":
+            n = media.adopt_legacy(db)
+            db.commit()
+            print(f"Moved {n} attachment(s) into {media.STORE_DIR}.")
+            return
+        n, size = media.gc(db, dry_run=args.dry_run, grace_seconds=args.grace)
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"{verb} {n} unreferenced file(s), {size / 1e6:.1f} MB.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Rebuild the cell_stats summary table from the cycles table.
+
+Usage:
+    python scripts/rebuild_cell_stats.py              # DATABASE_URL from secrets
+    python scripts/rebuild_cell_stats.py --url sqlite:///local.db
+
+Safe to run at any time: every row is recomputed in one transaction.
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import get_setting, make_engine  # noqa: E402
+from services.cell_stats import rebuild_all_cell_stats  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    db_url = args.url or get_setting("DATABASE_URL")
+    if not db_url:
+        sys.exit("DATABASE_URL not found in .streamlit/secrets.toml (or pass --url)")
+
+    with Session(make_engine(db_url)) as db:
+        n_cells = rebuild_all_cell_stats(db)
+        db.commit()
+    print(f"Rebuilt cell_stats for {n_cells} cells.")
+
+
+if __name__ == "__main__":
+    main()
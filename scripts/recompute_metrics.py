@@ -0,0 +1,64 @@
+"""Recompute derived cycle metrics (CE %, ΔV, efficiencies, normalized capacity).
+
+Usage:
+    python scripts/recompute_metrics.py                     # every cycle
+    python scripts/recompute_metrics.py --cell ZB-042       # one cell
+    python scripts/recompute_metrics.py --metric normalized_capacity
+    python scripts/recompute_metrics.py --url sqlite:///local.db
+
+Works through the cycles table in chunks and commits each one, so it can be
+stopped and rerun at any time: rows already up to date aren't written again.
+"""
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# --- Get the project root directory (same trick as alembic/env.py) ---
+project_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from database import get_setting, make_engine, note_external_write  # noqa: E402
+from models.base import Cell  # noqa: E402
+from services import derived  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--cell", help="only this cell (its cell ID)")
+    parser.add_argument("--metric", action="append", choices=list(derived.METRICS),
+                        help="only this metric (repeatable; default: all)")
+    parser.add_argument("--chunk-size", type=int, default=derived.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db_url = args.url or get_setting("DATABASE_URL")
+    if not db_url:
+        sys.exit("DATABASE_URL not found in .streamlit/secrets.toml (or pass --url)")
+
+    started = time.perf_counter()
+    with Session(make_engine(db_url)) as db:
+        cell_pk = None
+        if args.cell:
+            cell_pk = db.scalar(select(Cell.id).where(Cell.cell_id == args.cell))
+            if cell_pk is None:
+                sys.exit(f"No cell with ID {args.cell}")
+        counts = derived.recompute(
+            db,
+            cell_id=cell_pk,
+            metrics=args.metric,
+            chunk_size=args.chunk_size,
+            commit=True,
+            progress=lambda n: print(f"\r{n:,} cycles checked", end="", flush=True),
+        )
+    if counts["updated"]:
+        note_external_write()  # app processes drop their cached reads
+    print(f"\nUpdated {counts['updated']:,} of {counts['rows']:,} cycles "
+          f"in {time.perf_counter() - started:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
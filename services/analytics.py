@@ -0,0 +1,138 @@
+# services/analytics.py
+"""Degradation analytics for every cell at once.
+
+load_frame() loads the few Cycle columns the metrics need for all cells in one
+query, as one DataFrame sorted by (cell, cycle). Everything else is pandas/NumPy
+group operations over that frame (no Python loop per cell):
+
+- retention_pct: discharge capacity vs the cell's first cycle with a capacity
+- cycles_to_80: first cycle number where retention fell below 80 %
+- ce_rolling: rolling mean of CE % over `window` cycles
+- dv_drift: least-squares slope of ΔV vs cycle number, in mV per 100 cycles
+- fade_rate: least-squares slope of retention, in % lost per 100 cycles
+
+degradation_table(), cell_curves() and compare_frame() (the Compare page) are
+cached per cycles version, like the other queries.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from database import read_db
+from models.base import Cycle
+from services.queries import versioned
+
+EOL_RETENTION = 80.0  # % of the first capacity that counts as end of life
+DEFAULT_WINDOW = 10
+FRAME_COLUMNS = ["cell_id", "cycle_no", "ce_pct", "delta_V", "capacity_mAh"]
+NUMERIC_COLUMNS = [
+    "ce_pct",
+    "delta_V",
+    "capacity_mAh",
+    "charge_V",
+    "discharge_V",
+    "voltage_efficiency_pct",
+    "energy_efficiency_pct",
+    "normalized_capacity",
+]
+
+
+def load_frame(cell_ids=None, columns=FRAME_COLUMNS) -> pd.DataFrame:
+    """Cycle `columns` of all cycles (or of `cell_ids`), by cell and cycle.
+
+    One query for any number of cells. Runs on the Core connection: plain
+    tuples, no ORM row processing, which matters at a million rows.
+    """
+    q = (
+        select(*(getattr(Cycle, c) for c in columns))
+        .where(Cycle.cycle_no.isnot(None))
+        .order_by(Cycle.cell_id, Cycle.cycle_no)
+    )
+    if cell_ids is not None:
+        q = q.where(Cycle.cell_id.in_(list(cell_ids)))
+    with read_db() as db:
+        rows = db.connection().execute(q).fetchall()
+    frame = pd.DataFrame.from_records(rows, columns=list(columns))
+    for col in frame.columns.intersection(NUMERIC_COLUMNS):
+        frame[col] = pd.to_numeric(frame[col], errors="coerce")  # None → NaN
+    return frame
+
+
+def add_derived(frame: pd.DataFrame, window: int = DEFAULT_WINDOW) -> pd.DataFrame:
+    """`frame` plus per-cycle retention_pct and ce_rolling columns."""
+    g = frame.groupby("cell_id", sort=False)
+    first_capacity = g["capacity_mAh"].transform("first")  # first non-null
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retention = frame["capacity_mAh"] / first_capacity.where(first_capacity > 0)
+    ce_rolling = g["ce_pct"].rolling(window, min_periods=1).mean()
+    ce_rolling = ce_rolling.reset_index(level=0, drop=True)  # back to frame's index
+    return frame.assign(retention_pct=retention * 100, ce_rolling=ce_rolling)
+
+
+def _slopes(x: pd.Series, y: pd.Series, by: pd.Series) -> pd.Series:
+    """Least-squares slope of y vs x per group, from grouped sums."""
+    ok = x.notna() & y.notna()
+    x, y, by = x[ok], y[ok], by[ok]
+    sums = pd.DataFrame({"n": 1, "x": x, "y": y, "xy": x * y, "xx": x * x})
+    s = sums.groupby(by.to_numpy()).sum()
+    denom = s["n"] * s["xx"] - s["x"] ** 2
+    return (s["n"] * s["xy"] - s["x"] * s["y"]) / denom.where(denom > 0)
+
+
+def summarize(derived: pd.DataFrame) -> pd.DataFrame:
+    """One row per cell (indexed by Cell.id) of the degradation metrics."""
+    g = derived.groupby("cell_id", sort=False)
+    x = derived["cycle_no"].astype(float)
+    dv_slope = _slopes(x, derived["delta_V"], derived["cell_id"])  # V / cycle
+    retention_slope = _slopes(x, derived["retention_pct"], derived["cell_id"])
+    below = derived[derived["retention_pct"] < EOL_RETENTION]
+    out = pd.DataFrame(
+        {
+            "cycles": g["cycle_no"].size(),
+            "last_cycle": g["cycle_no"].last(),
+            "first_capacity": g["capacity_mAh"].first(),
+            "last_capacity": g["capacity_mAh"].last(),
+            "retention_pct": g["retention_pct"].last(),
+            "cycles_to_80": below.groupby("cell_id")["cycle_no"].first(),
+            "avg_ce": g["ce_pct"].mean(),
+            "ce_rolling": g["ce_rolling"].last(),
+            "dv_drift": dv_slope * 1e5,  # mV per 100 cycles
+            "fade_rate": -retention_slope * 100,
+        }
+    )
+    out.index.name = "cell_id"
+    return out
+
+
+@versioned("cycles")
+def degradation_table(version, window: int = DEFAULT_WINDOW) -> pd.DataFrame:
+    """summarize() of every cell with cycles, cached until cycles change.
+
+    Only the per-cell summary is cached, not the cycle frame behind it.
+    """
+    return summarize(add_derived(load_frame(), window))
+
+
+@versioned("cycles")
+def cell_curves(version, cell_ids: tuple, window: int = DEFAULT_WINDOW):
+    """add_derived() rows of a few cells, for plotting."""
+    return add_derived(load_frame(cell_ids), window)
+
+
+@versioned("cycles")
+def compare_frame(version, cell_ids: tuple, column: str) -> pd.DataFrame:
+    """One metric of several cells, with hours since each cell's first cycle.
+
+    Columns: cell_id, cycle_no, hours, value. One query for all the cells.
+    """
+    frame = load_frame(cell_ids, ["cell_id", "cycle_no", "created_at", column])
+    created = pd.to_datetime(frame["created_at"])
+    start = created.groupby(frame["cell_id"]).transform("min")
+    return pd.DataFrame(
+        {
+            "cell_id": frame["cell_id"],
+            "cycle_no": frame["cycle_no"],
+            "hours": (created - start).dt.total_seconds() / 3600,
+            "value": frame[column],
+        }
+    )
@@ -0,0 +1,155 @@
+# services/batch_export.py
+"""Batch export: Excel and/or PDF reports for many cells in one ZIP.
+
+BatchExport.start() returns immediately. A background thread fans the cells
+out over a process pool, one task per cell, so report building uses every
+core and never runs on the Streamlit script thread. Each finished report is
+written into the ZIP on disk and its temp file deleted, so the archive is
+built incrementally. A cell that fails is recorded in errors.txt inside the
+archive and the rest of the batch carries on.
+
+Pages poll job.progress() (e.g. from an st.fragment with run_every) to show
+progress without blocking reruns.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.base import Cell
+
+FORMATS = ("xlsx", "pdf")
+
+# One engine per worker process, created on its first task
+_worker_engine = None
+
+
+def select_cells(
+    db: Session,
+    status: str = None,
+    start: date = None,
+    end: date = None,
+    chemistry: str = None,
+) -> list:
+    """(Cell.id, cell_id) of the cells matching the filter, by cell_id.
+
+    start/end bound the assembly date (both inclusive); None means no bound.
+    """
+    q = select(Cell.id, Cell.cell_id).order_by(Cell.cell_id)
+    if status:
+        q = q.where(Cell.status == status)
+    if chemistry:
+        q = q.where(Cell.chemistry == chemistry)
+    if start:
+        q = q.where(Cell.assembly_date >= datetime.combine(start, time.min))
+    if end:
+        q = q.where(Cell.assembly_date <= datetime.combine(end, time.max))
+    return [tuple(row) for row in db.execute(q).all()]
+
+
+def export_cell(db_url: str, cell_pk: int, formats, out_dir: str) -> list:
+    """Build the requested reports of one cell in `out_dir` (runs in a worker).
+
+    Returns the written file paths.
+    """
+    global _worker_engine
+    from database import make_engine
+    from services.excel import build_excel
+    from services.pdf import build_pdf
+
+    if _worker_engine is None:
+        _worker_engine = make_engine(db_url)
+    builders = {"xlsx": build_excel, "pdf": build_pdf}
+    with Session(_worker_engine) as db:
+        return [builders[fmt](db, cell_pk, output_path=out_dir) for fmt in formats]
+
+
+class BatchExport:
+    """One batch export job; safe to read from any thread while it runs."""
+
+    def __init__(
+        self, db_url: str, cells: list, formats, zip_path: str, workers: int = None
+    ):
+        unknown = sorted(set(formats) - set(FORMATS))
+        if unknown:
+            raise ValueError(f"Unknown export format(s): {', '.join(unknown)}")
+        self.db_url = db_url
+        self.cells = list(cells)
+        self.formats = tuple(formats)
+        self.zip_path = zip_path
+        self.workers = workers or os.cpu_count() or 1
+        self.done = 0
+        self.failed = []  # [(cell_id, error message)]
+        self.finished = False
+        self.error = None  # set if the whole job died (e.g. disk full)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> "BatchExport":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def progress(self) -> dict:
+        with self._lock:
+            return {
+                "total": len(self.cells),
+                "done": self.done,
+                "failed": list(self.failed),
+                "finished": self.finished,
+                "error": self.error,
+            }
+
+    def _run(self) -> None:
+        tmp = tempfile.mkdtemp(prefix="batch_export_")
+        try:
+            # "spawn": forking the multi-threaded Streamlit server is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(self.workers, mp_context=ctx)
+            with pool, zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_STORED) as zf:
+                futures = {}
+                for cell_pk, cell_id in self.cells:
+                    out_dir = os.path.join(tmp, str(cell_pk))
+                    os.makedirs(out_dir)
+                    future = pool.submit(
+                        export_cell, self.db_url, cell_pk, self.formats, out_dir
+                    )
+                    futures[future] = cell_id
+
+                for future in as_completed(futures):
+                    cell_id = futures[future]
+                    try:
+                        paths = future.result()
+                    except Exception as e:
+                        msg = "".join(traceback.format_exception_only(type(e), e))
+                        with self._lock:
+                            self.failed.append((cell_id, msg.strip()))
+                            self.done += 1
+                        continue
+                    # xlsx/pdf are compressed already, so store them as is
+                    for path in paths:
+                        zf.write(path, os.path.basename(path))
+                        os.remove(path)
+                    with self._lock:
+                        self.done += 1
+
+                if self.failed:
+                    zf.writestr(
+                        "errors.txt",
+                        "".join(f"{cid}: {msg}\n" for cid, msg in self.failed),
+                    )
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+            with self._lock:
+                self.finished = True
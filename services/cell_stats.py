@@ -0,0 +1,112 @@
+# services/cell_stats.py
+"""Keeps the per-cell summary table (cell_stats) in step with the cycles table.
+
+Any ORM flush that inserts, edits or deletes a Cycle refreshes the stats of the
+touched cells inside the same transaction. Code that writes cycles with Core
+bulk statements (which skip ORM events) must call refresh_cell_stats itself.
+"""
+from sqlalchemy import delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from models.base import Cell, CellStats, Cycle
+
+# Keep IN (...) lists well below driver parameter limits
+_CHUNK = 500
+
+# Core table: these statements also run inside flush events, where ORM-enabled
+# bulk DML would try to synchronise the session mid-flush.
+_stats = CellStats.__table__
+
+
+def refresh_cell_stats(db: Session, cell_ids) -> None:
+    """Recompute the cell_stats rows of the given cells from their cycles."""
+    ids = sorted({int(i) for i in cell_ids if i is not None})
+    for start in range(0, len(ids), _CHUNK):
+        _refresh_chunk(db, ids[start:start + _CHUNK])
+
+
+def _refresh_chunk(db: Session, ids: list) -> None:
+    # 1. count / last cycle_no / last update per cell (index range scans)
+    agg = {
+        row.cell_id: row
+        for row in db.execute(
+            select(
+                Cycle.cell_id,
+                func.count(Cycle.id).label("cycle_count"),
+                func.max(Cycle.cycle_no).label("last_cycle_no"),
+                func.max(Cycle.created_at).label("last_update"),
+            )
+            .where(Cycle.cell_id.in_(ids))
+            .group_by(Cycle.cell_id)
+        )
+    }
+
+    # 2. metrics of the latest cycle (highest cycle_no) of each cell
+    last_no = (
+        select(Cycle.cell_id, func.max(Cycle.cycle_no).label("cycle_no"))
+        .where(Cycle.cell_id.in_(ids))
+        .group_by(Cycle.cell_id)
+        .subquery()
+    )
+    latest = {}
+    for row in db.execute(
+        select(Cycle.cell_id, Cycle.ce_pct, Cycle.delta_V, Cycle.capacity_mAh)
+        .join(
+            last_no,
+            (Cycle.cell_id == last_no.c.cell_id)
+            & (Cycle.cycle_no == last_no.c.cycle_no),
+        )
+        .order_by(Cycle.id)
+    ):
+        latest[row.cell_id] = row  # duplicates of a cycle_no: newest row wins
+
+    # 3. replace the summary rows (only for cells that still exist)
+    existing = db.execute(select(Cell.id).where(Cell.id.in_(ids))).scalars().all()
+    db.execute(delete(_stats).where(_stats.c.cell_id.in_(ids)))
+    if not existing:
+        return
+    rows = []
+    for cell_pk in existing:
+        a = agg.get(cell_pk)
+        last = latest.get(cell_pk)
+        rows.append(
+            {
+                "cell_id": cell_pk,
+                "cycle_count": a.cycle_count if a else 0,
+                "last_cycle_no": a.last_cycle_no if a else None,
+                "last_update": a.last_update if a else None,
+                "last_ce_pct": last.ce_pct if last else None,
+                "last_delta_V": last.delta_V if last else None,
+                "last_capacity_mAh": last.capacity_mAh if last else None,
+            }
+        )
+    db.execute(insert(_stats), rows)
+
+
+def rebuild_all_cell_stats(db: Session) -> int:
+    """Backfill: recompute cell_stats for every cell. Returns the cell count."""
+    ids = db.execute(select(Cell.id)).scalars().all()
+    db.execute(delete(_stats))
+    refresh_cell_stats(db, ids)
+    return len(ids)
+
+
+# ── ORM hook: refresh stats for every cell whose cycles were flushed ──────────
+def _touched_cell_ids(session: Session) -> set:
+    touched = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, Cycle):
+            continue
+        touched.add(obj.cell_id)
+        # a cycle moved to another cell also changes the old cell's stats
+        hist = inspect(obj).attrs.cell_id.history
+        touched.update(hist.deleted or ())
+    touched.discard(None)
+    return touched
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session: Session, flush_context) -> None:
+    touched = _touched_cell_ids(session)
+    if touched:
+        refresh_cell_stats(session, touched)
@@ -0,0 +1,291 @@
+# services/curves.py
+"""Columnar store for raw per-cycle curves (time, voltage, current).
+
+Uploaded curve files are converted once into append-only float64 column files
+per cell, plus a small offset index (cycle_no → start/stop sample):
+
+    media/curves/cell_<id>/t.f8   V.f8   I.f8   index.npy
+
+Readers open the columns with np.memmap and slice out just the cycles they
+need, so overlaying a few cycles of a multi-million-sample history never loads
+the whole file. Current sign convention: charge > 0, discharge < 0.
+
+The index is the source of truth: it is written last, and samples past its
+highest stop (left by an interrupted write) are cut off before the next
+append, so the three columns always stay the same length. Writers take a
+per-cell lock: a thread lock plus, on POSIX, flock() on cell_<id>/lock, so the
+app and scripts/convert_curves.py can ingest into the same cell at once. On
+Windows only the thread lock applies; don't run the script while the app logs
+curves there.
+"""
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process lock only
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+CURVE_ROOT = Path("media") / "curves"
+COLUMNS = ("t", "V", "I")
+_DTYPE = np.float64
+_INDEX_DTYPE = np.dtype([("cycle_no", "i8"), ("start", "i8"), ("stop", "i8")])
+
+# Normalised header → (column, multiplier)
+CURVE_ALIASES = {
+    "time": ("t", 1),
+    "time (s)": ("t", 1),
+    "time(s)": ("t", 1),
+    "test time (s)": ("t", 1),
+    "test_time(s)": ("t", 1),
+    "time (h)": ("t", 3600),
+    "voltage": ("V", 1),
+    "voltage (v)": ("V", 1),
+    "voltage(v)": ("V", 1),
+    "v": ("V", 1),
+    "current": ("I", 1),
+    "current (a)": ("I", 1),
+    "current(a)": ("I", 1),
+    "i": ("I", 1),
+    "current (ma)": ("I", 0.001),
+    "current(ma)": ("I", 0.001),
+    "cycle": ("cycle_no", 1),
+    "cycle index": ("cycle_no", 1),
+    "cycle_index": ("cycle_no", 1),
+    "cycle no": ("cycle_no", 1),
+}
+
+_write_lock = threading.Lock()
+
+
+def _cell_dir(cell_pk: int) -> Path:
+    return CURVE_ROOT / f"cell_{int(cell_pk)}"
+
+
+def _normalise(name) -> str:
+    return re.sub(r"\s+", " ", str(name).strip().lower())
+
+
+def detect_curve_columns(headers) -> dict:
+    """{header: (column, multiplier)} for the recognised curve columns."""
+    mapping, taken = {}, set()
+    for header in headers:
+        target = CURVE_ALIASES.get(_normalise(header))
+        if target and target[0] not in taken:
+            mapping[header] = target
+            taken.add(target[0])
+    return mapping
+
+
+def read_index(cell_pk: int) -> np.ndarray:
+    """Offset index of a cell's curves (empty if nothing stored yet)."""
+    path = _cell_dir(cell_pk) / "index.npy"
+    if not path.exists():
+        return np.empty(0, dtype=_INDEX_DTYPE)
+    return np.load(path)
+
+
+def stored_cycles(cell_pk: int) -> list:
+    """Cycle numbers that have raw curves, ascending."""
+    return sorted(int(n) for n in read_index(cell_pk)["cycle_no"])
+
+
+def _write_index(cell_dir: Path, index: np.ndarray) -> None:
+    tmp = cell_dir / "index.tmp.npy"
+    np.save(tmp, np.sort(index, order="cycle_no"))
+    os.replace(tmp, cell_dir / "index.npy")  # atomic: readers never see half an index
+
+
+@contextmanager
+def _locked(cell_dir: Path):
+    """Hold the write lock of a cell's store (see the module docstring)."""
+    with _write_lock, open(cell_dir / "lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when f is closed
+        yield
+
+
+def _stored_end(cell_dir: Path, index: dict) -> int:
+    """Samples covered by the index; longer columns are truncated to it."""
+    end = max((stop for _, stop in index.values()), default=0)
+    for c in COLUMNS:
+        path = cell_dir / f"{c}.f8"
+        if path.exists() and path.stat().st_size != end * 8:
+            if path.stat().st_size < end * 8:
+                raise ValueError(f"{path} is shorter than its index")
+            os.truncate(path, end * 8)  # samples of an unfinished write
+    return end
+
+
+def _segments(cycle_nos: np.ndarray):
+    """(cycle_no, start, stop) runs of equal cycle numbers within one chunk."""
+    if not len(cycle_nos):
+        return []
+    breaks = np.flatnonzero(np.diff(cycle_nos)) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(cycle_nos)]))
+    return [(int(cycle_nos[a]), int(a), int(b)) for a, b in zip(starts, stops)]
+
+
+def ingest_curve_file(
+    cell_pk: int, path, cycle_no: int = None, chunk_size: int = 200_000
+) -> tuple:
+    """Append the curves of a CSV/XLSX file to a cell's store.
+
+    Files with a cycle column may hold many cycles; otherwise the whole file is
+    stored as `cycle_no`. Cycles already in the store are skipped, not
+    replaced, so running a backfill again adds nothing. Returns (samples
+    stored, cycle numbers skipped); (0, []) if the file has no
+    time/voltage/current columns.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        chunks = pd.read_csv(path, chunksize=chunk_size)
+    elif path.suffix.lower() in (".xlsx", ".xlsm"):
+        # No streaming reader for curves in XLSX; these files are small in practice
+        chunks = [pd.read_excel(path)]
+    else:
+        return 0, []
+
+    cell_dir = _cell_dir(cell_pk)
+    cell_dir.mkdir(parents=True, exist_ok=True)
+    n_samples, skipped = 0, set()
+    with _locked(cell_dir):
+        index = {
+            int(r["cycle_no"]): (int(r["start"]), int(r["stop"]))
+            for r in read_index(cell_pk)
+        }
+        offset = _stored_end(cell_dir, index)
+        segments = {}  # cycle_no → [(start, stop)] written by this call
+        files = {c: open(cell_dir / f"{c}.f8", "ab") for c in COLUMNS}
+        try:
+            for chunk in chunks:
+                mapping = detect_curve_columns(chunk.columns)
+                found = {col for col, _ in mapping.values()}
+                if not set(COLUMNS) <= found:
+                    return 0, []
+                if "cycle_no" not in found and cycle_no is None:
+                    raise ValueError("File has no cycle column; pass cycle_no")
+
+                cols = {}
+                for header, (col, factor) in mapping.items():
+                    values = pd.to_numeric(chunk[header], errors="coerce")
+                    cols[col] = values.to_numpy(_DTYPE) * factor
+                stacked = np.column_stack([cols[c] for c in COLUMNS])
+                keep = ~np.isnan(stacked).any(axis=1)
+                if "cycle_no" in cols:
+                    keep &= ~np.isnan(cols["cycle_no"])
+                    all_cyc = np.nan_to_num(cols["cycle_no"]).astype(np.int64)
+                else:
+                    all_cyc = np.full(len(keep), int(cycle_no), dtype=np.int64)
+                stored = np.isin(all_cyc, list(index))
+                skipped.update(np.unique(all_cyc[keep & stored]).tolist())
+                keep &= ~stored
+                cyc = all_cyc[keep]
+
+                for c in COLUMNS:
+                    files[c].write(np.ascontiguousarray(cols[c][keep]).tobytes())
+                for no, a, b in _segments(cyc):
+                    runs = segments.setdefault(no, [])
+                    if runs and runs[-1][1] == offset + a:
+                        runs[-1] = (runs[-1][0], offset + b)  # continues across chunks
+                    else:
+                        runs.append((offset + a, offset + b))
+                offset += len(cyc)
+                n_samples += len(cyc)
+
+            # A cycle whose samples are split across the file: append one
+            # contiguous copy (the index holds a single range per cycle)
+            split = {no: runs for no, runs in segments.items() if len(runs) > 1}
+            if split:
+                for f in files.values():
+                    f.flush()
+                written = _open_columns(cell_pk)
+                for no, runs in split.items():
+                    n = sum(b - a for a, b in runs)
+                    for c in COLUMNS:
+                        parts = [written[c][a:b] for a, b in runs]
+                        files[c].write(np.concatenate(parts).tobytes())
+                    segments[no] = [(offset, offset + n)]
+                    offset += n
+                del written
+        finally:
+            for f in files.values():
+                f.close()
+
+        index.update({no: runs[0] for no, runs in segments.items()})
+        _write_index(
+            cell_dir,
+            np.array([(no, a, b) for no, (a, b) in index.items()], dtype=_INDEX_DTYPE),
+        )
+    return n_samples, sorted(skipped)
+
+
+def _open_columns(cell_pk: int) -> dict:
+    cell_dir = _cell_dir(cell_pk)
+    cols = {}
+    for c in COLUMNS:
+        path = cell_dir / f"{c}.f8"
+        size = path.stat().st_size // 8 if path.exists() else 0
+        if size:
+            cols[c] = np.memmap(path, dtype=_DTYPE, mode="r")
+        else:
+            cols[c] = np.empty(0, _DTYPE)
+    return cols
+
+
+def load_cycles(cell_pk: int, first: int, last: int = None) -> dict:
+    """Curves of cycles first..last (inclusive) as {cycle_no: {"t","V","I"}}.
+
+    Arrays are read-only memmap slices: nothing is read from disk until used.
+    """
+    last = first if last is None else last
+    index = read_index(cell_pk)
+    wanted = index[(index["cycle_no"] >= first) & (index["cycle_no"] <= last)]
+    if not len(wanted):
+        return {}
+    cols = _open_columns(cell_pk)
+    return {
+        int(r["cycle_no"]): {c: cols[c][r["start"]:r["stop"]] for c in COLUMNS}
+        for r in wanted
+    }
+
+
+def load_cycle(cell_pk: int, cycle_no: int):
+    """Curves of one cycle ({"t","V","I"}) or None if it has none stored."""
+    return load_cycles(cell_pk, cycle_no).get(int(cycle_no))
+
+
+def energies(curve: dict) -> tuple:
+    """(charge Wh, discharge Wh) of one cycle by trapezoidal V·I integration."""
+    t = np.asarray(curve["t"], dtype=_DTYPE)
+    p = np.asarray(curve["V"], dtype=_DTYPE) * np.asarray(curve["I"], dtype=_DTYPE)
+    if len(t) < 2:
+        return 0.0, 0.0
+    dt = np.diff(t)
+    segment = (p[1:] + p[:-1]) / 2 * dt  # W·s per step
+    charge = segment[segment > 0].sum() / 3600
+    discharge = -segment[segment < 0].sum() / 3600
+    return float(charge), float(discharge)
+
+
+def energy_efficiency(cell_pk: int, first: int, last: int) -> pd.DataFrame:
+    """Energy efficiency (%) per cycle for cycles first..last with stored curves."""
+    rows = []
+    for no, curve in load_cycles(cell_pk, first, last).items():
+        e_chg, e_dis = energies(curve)
+        rows.append(
+            {
+                "Cycle #": no,
+                "E charge (Wh)": e_chg,
+                "E discharge (Wh)": e_dis,
+                "EE %": e_dis / e_chg * 100 if e_chg > 0 else None,
+            }
+        )
+    return pd.DataFrame(rows)
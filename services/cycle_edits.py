@@ -0,0 +1,171 @@
+# services/cycle_edits.py
+"""Batch save for the Cell Viewer's cycle editor.
+
+The original and edited tables are compared vectorized, keyed on "Cycle #":
+cycle numbers only in the edit are inserted, ones only in the original are
+deleted, and rows whose values differ are updated. Everything is written with
+one SELECT, one executemany UPDATE, one multi-row INSERT and one DELETE in a
+single transaction, so saving hundreds of edited rows costs a constant number
+of round trips.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.base import Cycle
+from services.cell_stats import refresh_cell_stats
+from services.derived import DERIVED_ONLY, recompute
+from services.importer import to_records
+
+KEY = "Cycle #"
+
+# Editor column → Cycle attribute
+EDITOR_COLUMNS = {
+    "Current (mA/cm²)": "current_density",
+    "Charge V": "charge_V",
+    "Discharge V": "discharge_V",
+    "ΔV": "delta_V",
+    "CE %": "ce_pct",
+    "Cap. (mAh)": "capacity_mAh",
+    "Obs": "observation",
+}
+TEXT_COLUMNS = {"observation"}
+
+
+def _to_model(df: pd.DataFrame) -> pd.DataFrame:
+    """Editor frame → Cycle attribute columns indexed by cycle_no."""
+    out = df.rename(columns={KEY: "cycle_no", **EDITOR_COLUMNS})
+    cols = ["cycle_no", *EDITOR_COLUMNS.values()]
+    out = out[[c for c in cols if c in out.columns]].copy()
+    for col in out.columns:
+        if col in TEXT_COLUMNS:
+            out[col] = out[col].where(out[col].notna(), "").astype(str)
+        else:
+            out[col] = pd.to_numeric(out[col], errors="coerce")
+    return out
+
+
+def _derive(df: pd.DataFrame, changed: pd.DataFrame) -> pd.DataFrame:
+    """Recompute ΔV / CE % where their inputs changed but they weren't edited."""
+    df = df.copy()
+    volts = changed[["charge_V", "discharge_V"]].any(axis=1) & ~changed["delta_V"]
+    df.loc[volts, "delta_V"] = df.loc[volts, "charge_V"] - df.loc[volts, "discharge_V"]
+
+    if "charge_capacity_mAh" in df.columns:
+        cap = changed["capacity_mAh"] & ~changed["ce_pct"]
+        charge = df["charge_capacity_mAh"].to_numpy(dtype=float)
+        discharge = df["capacity_mAh"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ce = np.where(charge > 0, discharge / charge * 100, np.nan)
+        has_charge = cap & ~np.isnan(ce)
+        df.loc[has_charge, "ce_pct"] = ce[has_charge.to_numpy()]
+    return df
+
+
+def save_cycle_edits(
+    db: Session, cell_id: int, orig: pd.DataFrame, edited: pd.DataFrame
+) -> dict:
+    """Apply the editor's changeset for one cell in one transaction.
+
+    `orig` may be just one page of the cell's cycles: only rows in it can be
+    updated or deleted. Returns {"updated": n, "inserted": n, "deleted": n}.
+    Raises ValueError if the edit repeats a cycle number or adds one the cell
+    already has.
+    """
+    before = _to_model(orig).dropna(subset=["cycle_no"])
+    after = _to_model(edited)
+
+    # New rows added without a cycle number continue the cell's sequence
+    missing = after["cycle_no"].isna()
+    if missing.any():
+        db_max = db.execute(
+            select(func.max(Cycle.cycle_no)).where(Cycle.cell_id == cell_id)
+        ).scalar()
+        known = pd.concat([before["cycle_no"], after["cycle_no"]]).dropna()
+        start = int(max(known.max() if len(known) else 0, db_max or 0))
+        after.loc[missing, "cycle_no"] = np.arange(start + 1, start + 1 + missing.sum())
+    after["cycle_no"] = after["cycle_no"].astype("int64")
+    before["cycle_no"] = before["cycle_no"].astype("int64")
+
+    dupes = after["cycle_no"][after["cycle_no"].duplicated()].unique()
+    if len(dupes):
+        raise ValueError(f"Duplicate cycle numbers: {', '.join(map(str, dupes))}")
+
+    before = before.set_index("cycle_no")
+    after = after.set_index("cycle_no")
+    value_cols = list(before.columns)
+
+    # --- 1. Vectorized changeset ---
+    common = before.index.intersection(after.index)
+    b, a = before.loc[common, value_cols], after.loc[common, value_cols]
+    changed = ~((b == a) | (b.isna() & a.isna()))
+    updated_nos = common[changed.any(axis=1).to_numpy()]
+    inserted_nos = after.index.difference(before.index)
+    deleted_nos = before.index.difference(after.index)
+
+    counts = {
+        "updated": len(updated_nos),
+        "inserted": len(inserted_nos),
+        "deleted": len(deleted_nos),
+    }
+    if not any(counts.values()):
+        return counts
+
+    try:
+        # --- 2. One query loads every affected row's id and hidden inputs ---
+        affected = list(map(int, updated_nos.union(deleted_nos).union(inserted_nos)))
+        existing = pd.DataFrame(
+            db.execute(
+                select(Cycle.cycle_no, Cycle.id, Cycle.charge_capacity_mAh).where(
+                    Cycle.cell_id == cell_id, Cycle.cycle_no.in_(affected)
+                )
+            ).all(),
+            columns=["cycle_no", "id", "charge_capacity_mAh"],
+        ).drop_duplicates("cycle_no", keep="last").set_index("cycle_no")
+
+        # An "added" row may reuse a cycle number stored outside the edited page
+        clash = existing.index.intersection(inserted_nos)
+        if len(clash):
+            raise ValueError(
+                f"Cycle numbers already exist: {', '.join(map(str, clash))}"
+            )
+
+        # --- 3. Updates (executemany by primary key) ---
+        upd = after.loc[updated_nos].join(existing, how="inner")
+        if not upd.empty:
+            upd = _derive(upd, changed.loc[upd.index])
+            rows = upd[["id", *value_cols]].reset_index()
+            db.execute(update(Cycle), to_records(rows))
+
+        # --- 4. Inserts (one multi-row INSERT) ---
+        if len(inserted_nos):
+            new = after.loc[inserted_nos].copy()
+            all_changed = pd.DataFrame(True, index=new.index, columns=value_cols)
+            all_changed["delta_V"] = new["delta_V"].notna()
+            new = _derive(new, all_changed).reset_index()
+            new = new.assign(cell_id=cell_id, created_at=datetime.utcnow())
+            db.execute(insert(Cycle), to_records(new))
+
+        # --- 5. Deletes ---
+        doomed = existing.loc[existing.index.intersection(deleted_nos), "id"]
+        if len(doomed):
+            db.execute(delete(Cycle).where(Cycle.id.in_(list(map(int, doomed)))))
+
+        # --- 6. Metrics derived from the written rows (ΔV / CE % done above) ---
+        written = updated_nos.union(inserted_nos)
+        if len(written):
+            recompute(
+                db, cell_id, first=int(written.min()), last=int(written.max()),
+                metrics=DERIVED_ONLY,
+            )
+
+        # Bulk statements skip the ORM flush hook, so refresh the summary here
+        refresh_cell_stats(db, [cell_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return counts
@@ -0,0 +1,164 @@
+# services/derived.py
+"""Derived cycle metrics, recomputed in bulk from their stored inputs.
+
+METRICS maps each derived Cycle column to a vectorized formula over a chunk of
+cycles (their capacities and voltages plus the cell's rated capacity).
+recompute() walks the cycles table in primary-key chunks, evaluates the
+formulas with NumPy and writes back only the rows whose values changed, as one
+executemany UPDATE per chunk. Adding a metric = a column, a migration and an
+entry here, then `python scripts/recompute_metrics.py --metric <name>`.
+
+A formula that can't be evaluated (missing input) clears the stored value, so
+nothing is left over from inputs that were removed. Only ce_pct and delta_V,
+which can be typed in by hand without their inputs, keep theirs.
+The energy efficiency is estimated from the summary columns (CE x the ratio of
+the end voltages); services/curves.py integrates the real one from raw curves.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models.base import Cell, Cycle
+from services.cell_stats import refresh_cell_stats
+from services.importer import to_records
+
+DEFAULT_CHUNK_SIZE = 20000
+INPUTS = ["capacity_mAh", "charge_capacity_mAh", "charge_V", "discharge_V"]
+
+
+def _ratio(a: pd.Series, b: pd.Series) -> np.ndarray:
+    a = a.to_numpy(dtype=float)
+    b = b.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b > 0, a / b, np.nan)
+
+
+def _ce_pct(d):
+    return _ratio(d["capacity_mAh"], d["charge_capacity_mAh"]) * 100
+
+
+def _delta_v(d):
+    return (d["charge_V"] - d["discharge_V"]).to_numpy(dtype=float)
+
+
+def _voltage_efficiency(d):
+    return _ratio(d["discharge_V"], d["charge_V"]) * 100
+
+
+def _energy_efficiency(d):
+    # (Q_dis · V_dis) / (Q_chg · V_chg) = CE × VE
+    return _ratio(
+        d["capacity_mAh"] * d["discharge_V"], d["charge_capacity_mAh"] * d["charge_V"]
+    ) * 100
+
+
+def _normalized_capacity(d):
+    return _ratio(d["capacity_mAh"], d["rated_capacity"])
+
+
+# Cycle column → formula over a chunk with INPUTS + rated_capacity
+METRICS = {
+    "ce_pct": _ce_pct,
+    "delta_V": _delta_v,
+    "voltage_efficiency_pct": _voltage_efficiency,
+    "energy_efficiency_pct": _energy_efficiency,
+    "normalized_capacity": _normalized_capacity,
+}
+# ce_pct / delta_V can also be entered by hand (Log Cycle, the Cell Viewer
+# editor), which derives them itself; these ones only ever come from here
+DERIVED_ONLY = [
+    "voltage_efficiency_pct",
+    "energy_efficiency_pct",
+    "normalized_capacity",
+]
+# Metrics shown in cell_stats (refresh it when they change)
+_STATS_METRICS = {"ce_pct", "delta_V"}
+
+
+def derive(chunk: pd.DataFrame, metrics) -> pd.DataFrame:
+    """New values of `metrics` for a chunk of cycles (NaN where not computable)."""
+    return pd.DataFrame(
+        {name: METRICS[name](chunk) for name in metrics}, index=chunk.index
+    )
+
+
+def recompute(
+    db: Session,
+    cell_id: int = None,
+    first: int = None,
+    last: int = None,
+    metrics=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    commit: bool = False,
+    progress=None,
+) -> dict:
+    """Recompute `metrics` (default: all) for cycles and write the changes back.
+
+    Scope: every cycle, or one cell's, optionally only cycle numbers
+    first..last. With commit=True each chunk is committed as it's written (CLI
+    runs over the whole table); otherwise the caller's transaction gets it.
+    `progress(rows_done)` is called after every chunk.
+    Returns {"rows": scanned, "updated": rows written}.
+    """
+    metrics = list(metrics or METRICS)
+    unknown = sorted(set(metrics) - set(METRICS))
+    if unknown:
+        raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+    metric_cols = [getattr(Cycle, name) for name in metrics]
+
+    q = (
+        select(
+            Cycle.id,
+            Cycle.cell_id,
+            *(getattr(Cycle, c) for c in INPUTS),
+            Cell.rated_capacity,
+            *metric_cols,
+        )
+        .join(Cell, Cell.id == Cycle.cell_id)
+        .order_by(Cycle.id)
+        .limit(chunk_size)
+    )
+    if cell_id is not None:
+        q = q.where(Cycle.cell_id == cell_id)
+    if first is not None:
+        q = q.where(Cycle.cycle_no >= first)
+    if last is not None:
+        q = q.where(Cycle.cycle_no <= last)
+    columns = ["id", "cell_id", *INPUTS, "rated_capacity", *metrics]
+
+    counts = {"rows": 0, "updated": 0}
+    after = 0
+    while True:
+        # Keyset over the primary key: every chunk is an index range scan
+        rows = db.execute(q.where(Cycle.id > after)).all()
+        if not rows:
+            break
+        after = rows[-1].id
+        chunk = pd.DataFrame(rows, columns=columns)
+        for col in columns[2:]:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+
+        old = chunk[metrics]
+        new = derive(chunk, metrics)
+        # Hand-entered values without their inputs stay; the rest go to NULL
+        manual = [m for m in metrics if m not in DERIVED_ONLY]
+        new[manual] = new[manual].where(new[manual].notna(), old[manual])
+        same = np.isclose(
+            new.to_numpy(dtype=float), old.to_numpy(dtype=float), equal_nan=True
+        )
+        changed = ~same.all(axis=1)
+        if changed.any():
+            out = new[changed].assign(id=chunk.loc[changed, "id"])
+            db.execute(update(Cycle), to_records(out))
+            if _STATS_METRICS & set(metrics):
+                refresh_cell_stats(db, chunk.loc[changed, "cell_id"].unique())
+            counts["updated"] += int(changed.sum())
+        counts["rows"] += len(chunk)
+        if commit:
+            db.commit()
+        if progress:
+            progress(counts["rows"])
+        if len(rows) < chunk_size:
+            break
+    return counts
@@ -1,39 +1,148 @@
-import pandas as pd
+# services/excel.py
+"""Excel export of one cell: cycle data, cell info and native Excel charts.
+
+Cycles are streamed from the database in chunks (yield_per) and written row by
+row with xlsxwriter in constant_memory mode, which flushes each row to a temp
+file as soon as the next one starts. Memory therefore stays flat and the time
+grows linearly with the number of cycles.
+"""
 import os
 
+import xlsxwriter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.base import Cell, Cycle
+
+DEFAULT_CHUNK_SIZE = 5000
+DATA_SHEET = "Cycle Data"
+
+# Sheet header → Cycle column, in sheet order
+CYCLE_COLUMNS = {
+    "Cycle No": Cycle.cycle_no,
+    "Current Density (mA/cm²)": Cycle.current_density,
+    "Charge Voltage (V)": Cycle.charge_V,
+    "Discharge Voltage (V)": Cycle.discharge_V,
+    "ΔV": Cycle.delta_V,
+    "CE (%)": Cycle.ce_pct,
+    "Discharge Capacity (mAh)": Cycle.capacity_mAh,
+    "Charge Capacity (mAh)": Cycle.charge_capacity_mAh,
+    "pH": Cycle.pH,
+    "Observations": Cycle.observation,
+    "Logged At": Cycle.created_at,
+}
+LOGGED_AT = len(CYCLE_COLUMNS) - 1  # the only datetime column, written last
+
+# Cell attribute → label on the "Cell Info" sheet
+CELL_INFO = {
+    "cell_id": "Cell ID",
+    "chemistry": "Chemistry",
+    "configuration": "Configuration",
+    "rated_capacity": "Rated Capacity (mAh)",
+    "znbr_molarity": "ZnBr₂ (M)",
+    "teacl_molarity": "TEACl (M)",
+    "channel": "Channel",
+    "status": "Status",
+    "assembly_date": "Assembly Date",
+    "notes": "Notes",
+}
+
+# Native charts on the "Charts" sheet: (title, sheet header)
+CHARTS = [
+    ("Coulombic efficiency", "CE (%)"),
+    ("Voltage gap", "ΔV"),
+    ("Discharge capacity", "Discharge Capacity (mAh)"),
+]
+
+
+def _write_cell_info(wb, cell: Cell, fmt) -> None:
+    ws = wb.add_worksheet("Cell Info")
+    ws.set_column(0, 0, 22)
+    ws.set_column(1, 1, 40)
+    for row, (attr, label) in enumerate(CELL_INFO.items()):
+        ws.write_string(row, 0, label, fmt["bold"])
+        value = getattr(cell, attr)
+        if value is None:
+            continue
+        if attr == "assembly_date":
+            ws.write_datetime(row, 1, value, fmt["date"])
+        else:
+            ws.write(row, 1, value)
+
+
+def _write_charts(wb, n_rows: int) -> None:
+    ws = wb.add_worksheet("Charts")
+    headers = list(CYCLE_COLUMNS)
+    for i, (title, header) in enumerate(CHARTS):
+        col = headers.index(header)
+        chart = wb.add_chart({"type": "scatter", "subtype": "straight"})
+        chart.add_series(
+            {
+                "name": header,
+                "categories": [DATA_SHEET, 1, 0, n_rows, 0],
+                "values": [DATA_SHEET, 1, col, n_rows, col],
+            }
+        )
+        chart.set_title({"name": title})
+        chart.set_x_axis({"name": "Cycle #"})
+        chart.set_y_axis({"name": header})
+        chart.set_legend({"none": True})
+        chart.set_size({"width": 900, "height": 320})
+        ws.insert_chart(i * 17, 0, chart)
+
+
+def build_excel(
+    db: Session,
+    cell_pk: int,
+    output_path: str = "",
+    file=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """Write the workbook for cell `cell_pk` (Cell.id).
+
+    Goes to `file` (path or binary file object) if given, otherwise to
+    <output_path or media>/<cell_id>.xlsx. Returns where it was written.
+    """
+    cell = db.get(Cell, cell_pk)
+    if cell is None:
+        raise ValueError(f"No cell with id {cell_pk}")
+    if file is None:
+        file = os.path.join(output_path or "media", f"{cell.cell_id}.xlsx")
+
+    wb = xlsxwriter.Workbook(
+        file, {"constant_memory": True, "nan_inf_to_errors": True}
+    )
+    fmt = {
+        "bold": wb.add_format({"bold": True}),
+        "date": wb.add_format({"num_format": "yyyy-mm-dd"}),
+        "datetime": wb.add_format({"num_format": "yyyy-mm-dd hh:mm"}),
+    }
+    try:
+        # --- 1. Cycle data, streamed (constant_memory: strictly row by row) ---
+        ws = wb.add_worksheet(DATA_SHEET)
+        ws.freeze_panes(1, 1)
+        ws.set_column(0, LOGGED_AT - 2, 14)
+        ws.set_column(LOGGED_AT - 1, LOGGED_AT - 1, 40)
+        ws.set_column(LOGGED_AT, LOGGED_AT, 17)
+        ws.write_row(0, 0, list(CYCLE_COLUMNS), fmt["bold"])
+
+        result = db.execute(
+            select(*CYCLE_COLUMNS.values())
+            .where(Cycle.cell_id == cell_pk)
+            .order_by(Cycle.cycle_no)
+            .execution_options(yield_per=chunk_size)
+        )
+        n_rows = 0
+        for row in result:
+            n_rows += 1
+            ws.write_row(n_rows, 0, row[:LOGGED_AT])
+            if row[LOGGED_AT] is not None:
+                ws.write_datetime(n_rows, LOGGED_AT, row[LOGGED_AT], fmt["datetime"])
 
-def build_excel(cell_id, cell_data, cycle_data, output_path=""):
-    filename = os.path.join(output_path or "media", f"{cell_id}.xlsx")
-
-    # Prepare the cycle data
-    data = [
-        {
-            "Cycle No": c.cycle_no,
-            "Current Density (mA/cm²)": c.current_density,
-            "Charge Voltage (V)": c.charge_V,
-            "Discharge Voltage (V)": c.discharge_V,
-            "ΔV": c.delta_V,
-            "CE (%)": c.ce_pct,
-            "Capacity (mAh)": c.capacity_mAh,
-            "pH": c.pH,
-            "Observations": c.observation,
-        }
-        for c in cycle_data
-    ]
-
-    df = pd.DataFrame(data)
-
-    with pd.ExcelWriter(filename, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Cycle Data")
-
-        # Add cell metadata on a separate sheet
-        metadata = {
-            "Cell ID": [cell_data.cell_id],
-            "Felt Type": [cell_data.felt_type],
-            "Sealing Type": [cell_data.sealing_type],
-            "Notes": [cell_data.notes],
-        }
-        meta_df = pd.DataFrame(metadata)
-        meta_df.to_excel(writer, index=False, sheet_name="Cell Info")
-
-    return filename
+        # --- 2. Cell metadata and charts ---
+        _write_cell_info(wb, cell, fmt)
+        if n_rows:
+            _write_charts(wb, n_rows)
+    finally:
+        wb.close()
+    return file
@@ -0,0 +1,230 @@
+# services/importer.py
+"""Bulk import of cycler summary exports (one row per cycle) into cycles.
+
+Files are read in chunks (CSV via pandas, XLSX via openpyxl read-only mode), so
+memory stays flat whatever the file size. Each chunk is mapped onto Cycle
+columns, CE % / ΔV are derived vectorized, and rows are written with batched
+multi-row INSERTs (new cycle numbers) and executemany UPDATEs (cycle numbers the
+cell already has). Re-importing the same file therefore updates in place.
+"""
+import re
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from models.base import Cycle
+from services.cell_stats import refresh_cell_stats
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Normalised header → (Cycle attribute, unit multiplier). Headers are matched
+# after normalise_header(), so case, spacing and "²"/"2" don't matter.
+COLUMN_ALIASES = {
+    "cycle": ("cycle_no", 1),
+    "cycle no": ("cycle_no", 1),
+    "cycle_no": ("cycle_no", 1),
+    "cycle #": ("cycle_no", 1),
+    "cycle index": ("cycle_no", 1),
+    "cycle number": ("cycle_no", 1),
+    "charge capacity (mah)": ("charge_capacity_mAh", 1),
+    "charge capacity (ah)": ("charge_capacity_mAh", 1000),
+    "chg. cap.(mah)": ("charge_capacity_mAh", 1),
+    "chg cap (mah)": ("charge_capacity_mAh", 1),
+    "discharge capacity (mah)": ("capacity_mAh", 1),
+    "discharge capacity (ah)": ("capacity_mAh", 1000),
+    "dchg. cap.(mah)": ("capacity_mAh", 1),
+    "dchg cap (mah)": ("capacity_mAh", 1),
+    "capacity (mah)": ("capacity_mAh", 1),
+    "max charge voltage (v)": ("charge_V", 1),
+    "charge voltage (v)": ("charge_V", 1),
+    "end charge voltage (v)": ("charge_V", 1),
+    "min discharge voltage (v)": ("discharge_V", 1),
+    "discharge voltage (v)": ("discharge_V", 1),
+    "end discharge voltage (v)": ("discharge_V", 1),
+    "current density (ma/cm2)": ("current_density", 1),
+    "current (ma/cm2)": ("current_density", 1),
+    "ph": ("pH", 1),
+    "observation": ("observation", 1),
+    "observations": ("observation", 1),
+    "obs": ("observation", 1),
+}
+
+NUMERIC_FIELDS = [
+    "cycle_no",
+    "current_density",
+    "charge_V",
+    "discharge_V",
+    "capacity_mAh",
+    "charge_capacity_mAh",
+    "pH",
+]
+
+
+def normalise_header(name) -> str:
+    text = str(name).strip().lower().replace("²", "2")
+    return re.sub(r"\s+", " ", text)
+
+
+def detect_columns(headers) -> dict:
+    """Map file headers to Cycle attributes: {header: (attribute, multiplier)}."""
+    mapping = {}
+    taken = set()
+    for header in headers:
+        target = COLUMN_ALIASES.get(normalise_header(header))
+        if target and target[0] not in taken:
+            mapping[header] = target
+            taken.add(target[0])
+    return mapping
+
+
+def iter_chunks(file, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield DataFrame chunks of a CSV or XLSX file without loading it whole."""
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(file, chunksize=chunk_size)
+    elif suffix in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            headers = next(rows, None)
+            if headers is None:
+                return
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=headers)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=headers)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"Unsupported file type '{suffix}' (use .csv or .xlsx)")
+
+
+def map_chunk(chunk: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    """Rename/scale mapped columns and derive ce_pct / delta_V (vectorized)."""
+    out = pd.DataFrame(index=chunk.index)
+    for header, (attr, factor) in mapping.items():
+        col = chunk[header]
+        if attr in NUMERIC_FIELDS:
+            col = pd.to_numeric(col, errors="coerce") * factor
+        out[attr] = col
+
+    out = out.dropna(subset=["cycle_no"])
+    out["cycle_no"] = out["cycle_no"].astype("int64")
+    out = out.drop_duplicates("cycle_no", keep="last")
+
+    if {"charge_capacity_mAh", "capacity_mAh"} <= set(out.columns):
+        charge = out["charge_capacity_mAh"].to_numpy(dtype=float)
+        discharge = out["capacity_mAh"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["ce_pct"] = np.where(charge > 0, discharge / charge * 100, np.nan)
+    if {"charge_V", "discharge_V"} <= set(out.columns):
+        out["delta_V"] = out["charge_V"] - out["discharge_V"]
+    return out
+
+
+def to_records(df: pd.DataFrame) -> list:
+    """Rows as dicts for executemany: NaN → None, numpy → Python scalars."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def iter_mapped(file, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield (mapped rows, rows skipped) per chunk of a cycler export.
+
+    Raises ValueError if the file has no cycle number column.
+    """
+    mapping = None
+    for chunk in iter_chunks(file, filename, chunk_size):
+        if mapping is None:
+            mapping = detect_columns(chunk.columns)
+            if "cycle_no" not in {attr for attr, _ in mapping.values()}:
+                raise ValueError(
+                    "No cycle number column found. Expected one of: "
+                    "Cycle, Cycle No, Cycle Index, Cycle Number."
+                )
+        rows = map_chunk(chunk, mapping)
+        yield rows, len(chunk) - len(rows)
+
+
+def write_rows(db: Session, cell_id: int, rows: pd.DataFrame, now: datetime):
+    """Insert/update one chunk of mapped rows; returns (inserted, updated).
+
+    Doesn't commit or refresh cell_stats (callers do, once per file).
+    """
+    if rows.empty:
+        return 0, 0
+    # One indexed range scan finds the cycle numbers this cell already has
+    existing = dict(
+        db.execute(
+            select(Cycle.cycle_no, Cycle.id).where(
+                Cycle.cell_id == cell_id,
+                Cycle.cycle_no.between(
+                    int(rows["cycle_no"].min()), int(rows["cycle_no"].max())
+                ),
+            )
+        ).all()
+    )
+    is_update = rows["cycle_no"].isin(list(existing))
+
+    new_rows = rows[~is_update].assign(cell_id=cell_id, created_at=now)
+    if not new_rows.empty:
+        db.execute(insert(Cycle), to_records(new_rows))
+
+    upd_rows = rows[is_update]
+    if not upd_rows.empty:
+        upd_rows = upd_rows.assign(id=upd_rows["cycle_no"].map(existing))
+        db.execute(update(Cycle), to_records(upd_rows))
+    return len(new_rows), len(upd_rows)
+
+
+def import_cycles(
+    db: Session,
+    cell_id: int,
+    file,
+    filename: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress=None,
+) -> dict:
+    """Import a cycler export into cell `cell_id` in one transaction.
+
+    Idempotent on (cell_id, cycle_no): existing cycles are updated, new ones
+    inserted. `progress(rows_done)` is called after every chunk.
+    Returns {"inserted": n, "updated": n, "skipped": n}.
+    """
+    from services.derived import recompute  # derived imports to_records from here
+
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    now = datetime.utcnow()
+    first = last = None
+    try:
+        for rows, skipped in iter_mapped(file, filename, chunk_size):
+            inserted, updated = write_rows(db, cell_id, rows, now)
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+            counts["skipped"] += skipped
+            if not rows.empty:
+                lo, hi = int(rows["cycle_no"].min()), int(rows["cycle_no"].max())
+                first = lo if first is None else min(first, lo)
+                last = hi if last is None else max(last, hi)
+            if progress:
+                progress(counts["inserted"] + counts["updated"] + counts["skipped"])
+
+        # Efficiencies / normalized capacity of the imported cycle range
+        if first is not None:
+            recompute(db, cell_id=cell_id, first=first, last=last)
+        # Bulk statements skip the ORM flush hook, so refresh the summary here
+        refresh_cell_stats(db, [cell_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return counts
@@ -0,0 +1,275 @@
+# services/ingest.py
+"""Watched-folder ingest of cycler summary exports.
+
+The cyclers write one export per channel into a shared folder and keep
+rewriting it as cycles finish. IngestWorker.run_once() scans that folder and
+handles every .csv/.xlsx file that changed since the last run:
+
+1. Match it to a cell. A running cell whose cell_id is a word of the file name
+   wins ("S-1_ch3.csv" is S-1's, "S-10_ch3.csv" isn't).
+   Otherwise a "ch3" / "channel_3" in the name is used, narrowed to a cycler
+   when the file sits in a sub-folder named after one. A file keeps the cell
+   it was first matched to.
+2. Parse it on a thread pool (file reads and pandas release the GIL). A CSV
+   that only grew is read from where the last run stopped, not from the top.
+3. Write its cycles on the calling thread with importer.write_rows(): batched
+   multi-row INSERTs/UPDATEs, one transaction per file. Writing from a single
+   thread keeps SQLite free of lock contention.
+4. Record it in the manifest (a JSON file) by size and mtime. After a restart,
+   files that haven't changed are skipped. Writes are idempotent on
+   (cell, cycle_no), so a crash between commit and manifest only means a file
+   is imported again. A file that failed (no matching cell, or an error) keeps
+   the size and mtime of its last good import and is retried with backoff
+   (RETRY_BASE_S doubling up to MAX_BACKOFF_S).
+
+scripts/ingest_daemon.py runs this in a loop in its own process, so the
+Streamlit server never parses anything.
+"""
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.base import Cell, Cycler
+from services.cell_stats import refresh_cell_stats
+from services.derived import recompute
+from services.importer import DEFAULT_CHUNK_SIZE, iter_mapped, write_rows
+
+SUFFIXES = (".csv", ".xlsx")
+SETTLE_SECONDS = 2.0  # a file modified more recently may still be being written
+RETRY_BASE_S = 30.0  # first retry of a failed or unmatched file
+MAX_BACKOFF_S = 3600.0
+CHANNEL_PATTERN = re.compile(r"(?:^|[^a-z])(?:ch|channel)[ _-]?(\d+)", re.IGNORECASE)
+
+
+# --- Manifest ---
+def load_manifest(path) -> dict:
+    """{absolute file path: entry} from the manifest file ({} if none yet)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest: dict) -> None:
+    tmp = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)  # atomic: a crash never leaves half a manifest
+
+
+# --- Matching ---
+def _names(name: str, cell_id: str) -> bool:
+    """Whether `cell_id` is a whole word of the file name ("S-1" ≠ "S-10_…")."""
+    word = re.escape(cell_id.lower())
+    return re.search(rf"(?<![a-z0-9]){word}(?![a-z0-9])", name) is not None
+
+
+def match_cell(path: Path, folder: Path, cells: list):
+    """Cell.id the export at `path` belongs to, or None.
+
+    `cells` are (id, cell_id, channel, cycler name) of the running cells.
+    """
+    name = path.stem.lower()
+    by_name = [c for c in cells if c.cell_id and _names(name, c.cell_id)]
+    if by_name:
+        return max(by_name, key=lambda c: len(c.cell_id)).id
+
+    m = CHANNEL_PATTERN.search(path.stem)
+    if not m:
+        return None
+    channel = int(m.group(1))
+    candidates = [c for c in cells if c.channel == channel]
+    subdir = path.relative_to(folder).parts[:-1]
+    if subdir:
+        cycler = subdir[0].lower()
+        in_cycler = [c for c in candidates if (c.cycler or "").lower() == cycler]
+        candidates = in_cycler or candidates
+    return candidates[0].id if len(candidates) == 1 else None
+
+
+# --- Parsing (runs on the thread pool) ---
+def _read_tail(path: Path, entry: dict):
+    """CSV bytes to parse + (header, offset) to remember for next time.
+
+    If the file still starts with the header seen last time and hasn't shrunk,
+    only the lines from the remembered offset on are read, behind that header.
+    The last complete line is read again next time (a cycler may rewrite it);
+    an unfinished last line is left for the next run.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        offset = entry.get("offset", 0)
+        resume = (
+            offset
+            and entry.get("header") == header.decode("latin-1")
+            and os.fstat(f.fileno()).st_size >= entry.get("size", 0)
+        )
+        if resume:
+            f.seek(offset)
+            body = f.read()
+        else:
+            offset = len(header)
+            body = f.read()
+    end = body.rfind(b"\n")
+    body = body[: end + 1] if end >= 0 else b""
+    last_line = body.rfind(b"\n", 0, len(body) - 1) + 1
+    return header + body, header.decode("latin-1"), offset + last_line
+
+
+def parse_file(path: Path, entry: dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Mapped row chunks of one export plus what the manifest should remember."""
+    result = {"chunks": [], "skipped": 0}
+    if path.suffix.lower() == ".csv":
+        data, result["header"], result["offset"] = _read_tail(path, entry)
+        source = io.BytesIO(data)
+    else:
+        source = path  # xlsx is a zip archive: always read whole
+    for rows, skipped in iter_mapped(source, path.name, chunk_size):
+        result["chunks"].append(rows)
+        result["skipped"] += skipped
+    return result
+
+
+class IngestWorker:
+    """Ingests changed exports from `folder`; see the module docstring."""
+
+    def __init__(
+        self,
+        engine,
+        folder,
+        manifest_path,
+        workers: int = 4,
+        settle_seconds: float = SETTLE_SECONDS,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.engine = engine
+        self.folder = Path(folder).resolve()
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+        self.settle_seconds = settle_seconds
+        self.chunk_size = chunk_size
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="ingest")
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+    def changed_files(self) -> list:
+        """(path, stat) of exports that differ from their manifest entry."""
+        cutoff = time.time() - self.settle_seconds
+        changed = []
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if not name.lower().endswith(SUFFIXES) or name.startswith((".", "~$")):
+                    continue
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue  # removed while we were scanning
+                entry = self.manifest.get(str(path), {})
+                if (entry.get("size"), entry.get("mtime_ns")) == (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    continue
+                if entry.get("retry_at", 0) > time.time():
+                    continue  # failed last time: backing off
+                if stat.st_mtime > cutoff:
+                    continue  # still being written: next run
+                changed.append((path, stat))
+        return changed
+
+    def _running_cells(self, db: Session) -> list:
+        return db.execute(
+            select(Cell.id, Cell.cell_id, Cell.channel, Cycler.name.label("cycler"))
+            .outerjoin(Cycler, Cell.cycler_id == Cycler.id)
+            .where(Cell.status == "running")
+        ).all()
+
+    def run_once(self) -> list:
+        """Ingest everything that changed; returns one result dict per file."""
+        changed = self.changed_files()
+        if not changed:
+            return []
+
+        with Session(self.engine) as db:
+            cells = self._running_cells(db)
+            known = set(db.scalars(select(Cell.id)))
+        results = []
+        jobs = []
+        for path, stat in changed:
+            entry = self.manifest.get(str(path), {})
+            cell_pk = entry.get("cell_id")
+            if cell_pk not in known:
+                cell_pk = match_cell(path, self.folder, cells)
+            if cell_pk is None:
+                results.append(self._record(path, stat, {"status": "unmatched"}))
+                continue
+            future = self.pool.submit(parse_file, path, entry, self.chunk_size)
+            jobs.append((future, path, stat, cell_pk))
+
+        try:
+            # Parsing overlaps with writing: each file is written once it's parsed
+            for future, path, stat, cell_pk in jobs:
+                entry = {"cell_id": cell_pk}
+                try:
+                    parsed = future.result()
+                    entry.update(self._write(cell_pk, parsed), status="imported")
+                except Exception as e:
+                    entry.update(status="error", error=str(e))
+                results.append(self._record(path, stat, entry))
+        finally:
+            save_manifest(self.manifest_path, self.manifest)
+        return results
+
+    def _write(self, cell_pk: int, parsed: dict) -> dict:
+        """All chunks of one parsed file in one transaction."""
+        counts = {"inserted": 0, "updated": 0, "skipped": parsed["skipped"]}
+        now = datetime.utcnow()
+        bounds = [
+            (int(rows["cycle_no"].min()), int(rows["cycle_no"].max()))
+            for rows in parsed["chunks"]
+            if not rows.empty
+        ]
+        with Session(self.engine) as db:
+            for rows in parsed["chunks"]:
+                inserted, updated = write_rows(db, cell_pk, rows, now)
+                counts["inserted"] += inserted
+                counts["updated"] += updated
+            if bounds:
+                # efficiencies / normalized capacity of the written cycle range
+                first, last = min(b[0] for b in bounds), max(b[1] for b in bounds)
+                recompute(db, cell_pk, first=first, last=last)
+            refresh_cell_stats(db, [cell_pk])
+            db.commit()
+        counts["header"], counts["offset"] = parsed.get("header"), parsed.get("offset")
+        return counts
+
+    def _record(self, path: Path, stat, entry: dict) -> dict:
+        """Update the file's manifest entry (saved at the end of the run)."""
+        entry["at"] = datetime.utcnow().isoformat(timespec="seconds")
+        if entry["status"] == "imported":
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        else:
+            # Keep the last good import's size, mtime and resume point, so the
+            # file still counts as changed, and retry it after a backoff
+            old = self.manifest.get(str(path), {})
+            attempts = old.get("attempts", 0) + 1
+            entry.update(
+                {k: old.get(k) for k in ("size", "mtime_ns", "header", "offset")},
+                attempts=attempts,
+                retry_at=time.time()
+                + min(MAX_BACKOFF_S, RETRY_BASE_S * 2 ** (attempts - 1)),
+            )
+        self.manifest[str(path)] = {k: v for k, v in entry.items() if v is not None}
+        return {"path": str(path), **entry}
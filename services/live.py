@@ -0,0 +1,64 @@
+# services/live.py
+"""Incremental refresh for the live dashboard.
+
+LiveBoard starts from a queries.board_snapshot() (channel rows + the highest
+Cycle.id at that moment) and then only asks for cycles above that watermark:
+one primary-key range scan that returns nothing most of the time. New cycles
+are merged into the in-memory rows, so a lab screen polling every few seconds
+costs the database next to nothing.
+
+A cycle only counts if its cycle_no is past the cell's last_cycle_no. That skips
+cycles the snapshot already counted. Backfilled older cycle numbers (and edits
+and deletes) show up at the next full snapshot, which is taken whenever this
+process writes cells, cycles or cyclers.
+"""
+from sqlalchemy import select
+
+from database import read_db
+from models.base import Cycle
+
+
+class LiveBoard:
+    def __init__(self, key, watermark: int, rows):
+        self.key = key  # what the snapshot was taken for; a new key → new board
+        self.watermark = watermark
+        self.rows = [row._asdict() for row in rows]
+        self._by_cell = {r["id"]: r for r in self.rows if r["id"] is not None}
+
+    def refresh(self) -> int:
+        """Merge cycles logged since the last refresh; returns how many counted."""
+        with read_db() as db:
+            new = db.execute(
+                select(
+                    Cycle.id,
+                    Cycle.cell_id,
+                    Cycle.cycle_no,
+                    Cycle.created_at,
+                    Cycle.ce_pct,
+                    Cycle.delta_V,
+                    Cycle.capacity_mAh,
+                )
+                .where(Cycle.id > self.watermark)
+                .order_by(Cycle.id)
+            ).all()
+        if not new:
+            return 0
+        self.watermark = new[-1].id
+
+        counted = 0
+        for c in new:
+            row = self._by_cell.get(c.cell_id)
+            if row is None or c.cycle_no is None:
+                continue  # not a running cell on the board
+            if row["last_cycle_no"] is not None and c.cycle_no <= row["last_cycle_no"]:
+                continue
+            row["cycle_count"] = (row["cycle_count"] or 0) + 1
+            row["last_cycle_no"] = c.cycle_no
+            row["last_update"] = max(
+                filter(None, [row["last_update"], c.created_at]), default=None
+            )
+            row["last_ce_pct"] = c.ce_pct
+            row["last_delta_V"] = c.delta_V
+            row["last_capacity_mAh"] = c.capacity_mAh
+            counted += 1
+        return counted
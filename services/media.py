@@ -0,0 +1,211 @@
+# services/media.py
+"""Content-addressed storage for cycle attachments (photos, plots, exports).
+
+Files live at media/store/<first 2 hex>/<sha256><suffix>. Uploads are streamed
+to a temp file in chunks while being hashed, then renamed into place, so the
+same file uploaded twice is stored once. Cycle.csv_path / Cycle.photo_path hold
+the store path like any other path, and a stored file's reference count is
+simply how many of those columns point at it. gc() removes files nobody
+references (scripts/media_store.py runs it).
+
+Stored files never change, so once a path has been seen on disk exists() can
+answer from memory; thumbnail() keys its cache on the content hash, which for
+store files is already in the name.
+"""
+import functools
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.orm import Session
+
+from models.base import Cycle
+
+MEDIA_ROOT = Path("media")
+STORE_DIR = MEDIA_ROOT / "store"
+THUMB_DIR = MEDIA_ROOT / "thumbnails"
+CHUNK_SIZE = 1 << 20
+GC_GRACE_SECONDS = 3600  # leave fresh files alone: their cycle may not be saved yet
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+THUMB_PX = 480  # longest side of a cached thumbnail
+THUMB_QUALITY = 70
+
+_seen = set()  # store paths known to exist (content never changes)
+
+
+def _store_path(digest: str, suffix: str) -> Path:
+    return STORE_DIR / digest[:2] / f"{digest}{suffix.lower()}"
+
+
+def save_stream(file, suffix: str, chunk_size: int = CHUNK_SIZE) -> Path:
+    """Store a binary file object by content; returns its store path.
+
+    Reads `file` in chunks (never whole), hashing as it writes to a temp file.
+    """
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=STORE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                h.update(chunk)
+                out.write(chunk)
+        path = _store_path(h.hexdigest(), suffix)
+        if path.exists():
+            os.remove(tmp)  # already stored: deduplicated
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _seen.add(str(path))
+    return path
+
+
+def save_file(path, suffix: str = None) -> Path:
+    """Store a file already on disk (e.g. a legacy media/<uuid>.png)."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        return save_stream(f, suffix if suffix is not None else path.suffix)
+
+
+def is_image(path) -> bool:
+    return Path(path).suffix.lower() in IMAGE_SUFFIXES
+
+
+def exists(path) -> bool:
+    """os.path.exists, answered from memory for store files seen before."""
+    if not path:
+        return False
+    path = str(path)
+    if path in _seen:
+        return True
+    if os.path.exists(path):
+        if in_store(path):
+            _seen.add(path)
+        return True
+    return False
+
+
+def in_store(path) -> bool:
+    p = Path(path)
+    if p.is_absolute():  # e.g. written by benchmarks/synthetic.py
+        p = Path(os.path.relpath(p))
+    return p.parent.parent == STORE_DIR and p.parent.name == p.stem[:2]
+
+
+def content_hash(path) -> str:
+    """sha256 of a file; free for store files (it's the name)."""
+    if in_store(path):
+        return Path(path).stem
+    stat = os.stat(path)
+    return _file_hash(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4096)
+def _file_hash(path: str, size: int, mtime_ns: int) -> str:
+    # size/mtime are only cache keys: a changed file gets hashed again
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def thumbnail(path, thumb_dir=None) -> Path:
+    """Cached downscaled JPEG of the image at `path` (created on first use)."""
+    thumb = Path(thumb_dir or THUMB_DIR) / f"{content_hash(path)}.jpg"
+    if not thumb.exists():
+        from PIL import Image as PILImage  # only needed for new thumbnails
+
+        thumb.parent.mkdir(parents=True, exist_ok=True)
+        with PILImage.open(path) as img:
+            img.draft("RGB", (THUMB_PX, THUMB_PX))  # cheap JPEG pre-scaling
+            img = img.convert("RGB")
+            img.thumbnail((THUMB_PX, THUMB_PX))
+            tmp = thumb.with_suffix(f".{os.getpid()}.tmp")
+            img.save(tmp, "JPEG", quality=THUMB_QUALITY, optimize=True)
+        os.replace(tmp, thumb)  # atomic: parallel exports never see half a file
+    return thumb
+
+
+# --- Reference counting and garbage collection ---
+def refcounts(db: Session) -> dict:
+    """{path: number of Cycle.csv_path / photo_path values pointing at it}."""
+    refs = union_all(
+        select(Cycle.csv_path.label("path")).where(Cycle.csv_path.isnot(None)),
+        select(Cycle.photo_path.label("path")).where(Cycle.photo_path.isnot(None)),
+    ).subquery()
+    rows = db.execute(select(refs.c.path, func.count()).group_by(refs.c.path))
+    return {os.path.normpath(path): n for path, n in rows}
+
+
+def gc(db: Session, dry_run: bool = False, grace_seconds: int = GC_GRACE_SECONDS):
+    """Delete store files no cycle references. Returns (files, bytes) removed.
+
+    Files younger than `grace_seconds` are kept, as are leftover ".part" files
+    of uploads still in progress (same rule). Attachments of cycles still
+    waiting in the local write buffer (services/outbox.py) count as
+    referenced, however old. Paths are compared as absolute paths, so stored
+    relative and absolute paths both count.
+    """
+    from services import outbox  # streamlit-side module; only gc needs it
+
+    if not STORE_DIR.exists():
+        return 0, 0
+    referenced = {
+        os.path.realpath(path)
+        for path in (*refcounts(db), *outbox.pending_paths())
+    }
+    cutoff = time.time() - grace_seconds
+    removed = freed = 0
+    for path in STORE_DIR.rglob("*"):
+        if not path.is_file() or os.path.realpath(path) in referenced:
+            continue
+        stat = path.stat()
+        if stat.st_mtime > cutoff:
+            continue
+        removed += 1
+        freed += stat.st_size
+        if not dry_run:
+            path.unlink()
+            _seen.discard(str(path))
+    return removed, freed
+
+
+def adopt_legacy(db: Session) -> int:
+    """Move attachments saved before the store (media/<uuid>.<ext>) into it.
+
+    Rewrites the cycles' paths (photos that landed in csv_path move to
+    photo_path, unless the cycle already has a photo) and returns how many
+    files were adopted. The originals are left in place; delete them once the
+    new paths are committed.
+    """
+    adopted = set()
+    for col in (Cycle.csv_path, Cycle.photo_path):
+        old_paths = db.scalars(select(col).where(col.isnot(None)).distinct()).all()
+        for old in old_paths:
+            if in_store(old) or not os.path.exists(old):
+                continue
+            new = str(save_file(old))
+            options = {"synchronize_session": False}
+            if is_image(new) and col is Cycle.csv_path:
+                db.execute(
+                    update(Cycle)
+                    .where(col == old, Cycle.photo_path.is_(None))
+                    .values(csv_path=None, photo_path=new),
+                    execution_options=options,
+                )
+            # (cycles that already had a photo keep this one in csv_path)
+            db.execute(
+                update(Cycle).where(col == old).values({col: new}),
+                execution_options=options,
+            )
+            adopted.add(old)
+    return len(adopted)
@@ -0,0 +1,395 @@
+# services/outbox.py
+"""Local write-ahead buffer for cycle inserts and cell status changes.
+
+With a remote primary database, Log Cycle and the Stop buttons don't wait for
+the network: add_cycle() / set_status() append the write to a local SQLite
+file (WAL mode, synchronous=FULL, so a write is on disk when they return) and
+wake a background Flusher, which applies the buffered writes to the primary
+in batches of BATCH_SIZE, one transaction per batch.
+
+Every write carries an idempotency key. The key is inserted into
+applied_writes (models/base.AppliedWrite) in the same transaction as the
+write, so a batch whose commit succeeded but whose reply was lost is only
+marked synced on the retry, never applied twice. Keys older than
+KEEP_APPLIED_S are deleted as batches apply: far beyond any retry delay, and a
+write replayed even later still can't duplicate a cycle (its number is taken,
+so it becomes a conflict). A failed batch is retried
+with exponential backoff (RETRY_BASE_S doubling up to MAX_BACKOFF_S). A write
+that can never apply (its cycle number was taken meanwhile, its cell is gone)
+is set aside as a conflict for the user to look at.
+
+The WRITE_BUFFER setting turns it on ("1") or off ("0"); the default "auto"
+buffers whenever the database URL has a host, i.e. isn't a local file.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+
+import streamlit as st
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from models.base import AppliedWrite, Cell, Cycle
+
+OUTBOX_PATH = os.path.join("media", "outbox.db")
+BATCH_SIZE = 200
+FLUSH_INTERVAL_S = 5.0  # idle poll; add_cycle()/set_status() wake it at once
+RETRY_BASE_S = 2.0
+MAX_BACKOFF_S = 300.0
+KEEP_SYNCED_S = 24 * 3600  # synced rows stay this long for the status line
+KEEP_APPLIED_S = 30 * 24 * 3600  # idempotency keys on the primary
+
+logger = logging.getLogger("znbr.outbox")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,              -- 'cycle' | 'status'
+    cell_id INTEGER NOT NULL,
+    cycle_no INTEGER,                -- cycles only
+    payload TEXT NOT NULL,           -- JSON
+    state TEXT NOT NULL DEFAULT 'pending',  -- pending | synced | conflict
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_try REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    synced_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_writes_state_next_try ON writes (state, next_try);
+CREATE INDEX IF NOT EXISTS ix_writes_cell_id ON writes (cell_id, state);
+"""
+
+
+def enabled() -> bool:
+    """Whether writes go through the buffer (WRITE_BUFFER setting)."""
+    from database import get_setting  # database imports services that import this
+
+    value = str(get_setting("WRITE_BUFFER", "auto")).strip().lower()
+    if value == "auto":
+        url = get_setting("DATABASE_URL")
+        return bool(url) and bool(make_url(url).host)
+    return value in ("1", "true", "yes", "on")
+
+
+def _connect(path: str = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or OUTBOX_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")  # durable once enqueue returns
+    return conn
+
+
+_ready = set()  # paths whose schema exists
+
+
+@contextmanager
+def _open(path: str = None):
+    """A connection to the buffer file (created on first use), closed after."""
+    path = path or OUTBOX_PATH
+    if path not in _ready:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with closing(_connect(path)) as conn:
+        if path not in _ready:
+            conn.executescript(_SCHEMA)
+            _ready.add(path)
+        yield conn
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't buffer a {type(value).__name__}")
+
+
+# --- Enqueue (page side) ---
+
+
+def _enqueue(kind: str, cell_id: int, payload: dict, cycle_no: int = None) -> str:
+    key = uuid.uuid4().hex
+    with _open() as conn:
+        conn.execute(
+            "INSERT INTO writes (key, kind, cell_id, cycle_no, payload, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                kind,
+                int(cell_id),
+                cycle_no,
+                json.dumps(payload, default=_json_default),
+                time.time(),
+            ),
+        )
+    worker().wake()
+    return key
+
+
+def add_cycle(values: dict) -> str:
+    """Buffer a Cycle insert (`values`: Cycle column → value); returns its key."""
+    return _enqueue("cycle", values["cell_id"], values, int(values["cycle_no"]))
+
+
+def set_status(cell_id: int, status: str) -> str:
+    """Buffer a cell status change; returns its key."""
+    return _enqueue("status", cell_id, {"status": status})
+
+
+# --- State for the UI ---
+
+
+def _read(sql: str, params=()) -> list:
+    if not os.path.exists(OUTBOX_PATH):
+        return []
+    with _open() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def last_pending_cycle(cell_id: int):
+    """Highest buffered, not yet synced cycle number of a cell (or None)."""
+    rows = _read(
+        "SELECT max(cycle_no) FROM writes "
+        "WHERE kind = 'cycle' AND cell_id = ? AND state = 'pending'",
+        (int(cell_id),),
+    )
+    return rows[0][0] if rows else None
+
+
+def pending_statuses() -> dict:
+    """cell_id → buffered status not yet synced (the latest one per cell)."""
+    rows = _read(
+        "SELECT cell_id, payload FROM writes "
+        "WHERE kind = 'status' AND state = 'pending' ORDER BY id"
+    )
+    return {r["cell_id"]: json.loads(r["payload"])["status"] for r in rows}
+
+
+def summary() -> dict:
+    """Counts per state plus the newest retry error."""
+    counts = dict(_read("SELECT state, count(*) FROM writes GROUP BY state"))
+    error = _read(
+        "SELECT error FROM writes WHERE state = 'pending' AND error IS NOT NULL "
+        "ORDER BY id DESC LIMIT 1"
+    )
+    return {
+        "pending": counts.get("pending", 0),
+        "conflict": counts.get("conflict", 0),
+        "synced": counts.get("synced", 0),
+        "error": error[0][0] if error else None,
+    }
+
+
+def pending_paths() -> set:
+    """Attachment paths of buffered cycles not synced yet (media.gc keeps them)."""
+    rows = _read(
+        "SELECT payload FROM writes WHERE kind = 'cycle' AND state != 'synced'"
+    )
+    paths = set()
+    for r in rows:
+        payload = json.loads(r["payload"])
+        paths.update(filter(None, (payload.get("photo_path"), payload.get("csv_path"))))
+    return paths
+
+
+def conflicts() -> list:
+    return _read(
+        "SELECT key, kind, cell_id, cycle_no, error, created_at FROM writes "
+        "WHERE state = 'conflict' ORDER BY id"
+    )
+
+
+def discard(key: str) -> None:
+    """Drop a conflicting write for good."""
+    with _open() as conn:
+        conn.execute("DELETE FROM writes WHERE key = ? AND state = 'conflict'", (key,))
+
+
+# --- Flush (worker side) ---
+
+
+def _apply(db: Session, items: list) -> dict:
+    """Apply a batch in `db`'s transaction; returns {key: conflict message}."""
+    problems = {}
+    cell_ids = {r["cell_id"] for r in items}
+    known = set(db.scalars(select(Cell.id).where(Cell.id.in_(cell_ids))))
+    cycles = [r for r in items if r["kind"] == "cycle"]
+    taken = set()
+    if cycles:
+        taken = set(
+            tuple(row)
+            for row in db.execute(
+                select(Cycle.cell_id, Cycle.cycle_no).where(
+                    Cycle.cell_id.in_({r["cell_id"] for r in cycles}),
+                    Cycle.cycle_no.in_({r["cycle_no"] for r in cycles}),
+                )
+            )
+        )
+
+    rows, ranges, statuses = [], {}, {}
+    for r in items:
+        if r["cell_id"] not in known:
+            problems[r["key"]] = f"cell {r['cell_id']} no longer exists"
+            continue
+        payload = json.loads(r["payload"])
+        if r["kind"] == "cycle":
+            if (r["cell_id"], r["cycle_no"]) in taken:
+                problems[r["key"]] = f"cycle #{r['cycle_no']} already exists"
+                continue
+            if payload.get("created_at"):
+                payload["created_at"] = datetime.fromisoformat(payload["created_at"])
+            rows.append(payload)
+            lo, hi = ranges.get(r["cell_id"], (r["cycle_no"], r["cycle_no"]))
+            ranges[r["cell_id"]] = (min(lo, r["cycle_no"]), max(hi, r["cycle_no"]))
+        else:
+            statuses[r["cell_id"]] = payload["status"]  # the latest one wins
+
+    if rows:
+        from services.cell_stats import refresh_cell_stats
+        from services.derived import DERIVED_ONLY, recompute
+
+        db.execute(insert(Cycle), rows)
+        for cell_id, (first, last) in ranges.items():
+            recompute(db, cell_id, first=first, last=last, metrics=DERIVED_ONLY)
+        # Bulk statements skip the ORM flush hook, so refresh the summary here
+        refresh_cell_stats(db, ranges)
+    for cell_id, status in statuses.items():
+        db.execute(update(Cell).where(Cell.id == cell_id).values(status=status))
+
+    applied = [r["key"] for r in items if r["key"] not in problems]
+    if applied:
+        now = datetime.utcnow()
+        db.execute(
+            insert(AppliedWrite), [{"key": k, "applied_at": now} for k in applied]
+        )
+        db.execute(
+            delete(AppliedWrite).where(
+                AppliedWrite.applied_at < now - timedelta(seconds=KEEP_APPLIED_S)
+            )
+        )
+    return problems
+
+
+def flush(engine, batch_size: int = BATCH_SIZE) -> dict:
+    """Apply every due buffered write to the primary, batch by batch.
+
+    Stops at the first failed batch (it's rescheduled with backoff).
+    Returns {"synced": n, "conflict": n, "failed": n}.
+    """
+    counts = {"synced": 0, "conflict": 0, "failed": 0}
+    if not os.path.exists(OUTBOX_PATH):
+        return counts
+    with _open() as conn:
+        while True:
+            now = time.time()
+            items = conn.execute(
+                "SELECT * FROM writes WHERE state = 'pending' AND next_try <= ? "
+                "ORDER BY id LIMIT ?",
+                (now, batch_size),
+            ).fetchall()
+            if not items:
+                break
+            keys = [r["key"] for r in items]
+            try:
+                with Session(engine) as db:
+                    done = set(
+                        db.scalars(
+                            select(AppliedWrite.key).where(AppliedWrite.key.in_(keys))
+                        )
+                    )
+                    # Already applied by an earlier attempt: just mark them
+                    problems = _apply(db, [r for r in items if r["key"] not in done])
+                    db.commit()
+            except Exception as e:  # network, timeout, lock, another flusher…
+                message = str(e).splitlines()[0] if str(e) else ""
+                error = f"{type(e).__name__}: {message}"[:300]
+                retries = []
+                for r in items:
+                    delay = min(MAX_BACKOFF_S, RETRY_BASE_S * 2 ** r["attempts"])
+                    retries.append((error, now + delay, r["key"]))
+                conn.executemany(
+                    "UPDATE writes SET attempts = attempts + 1, error = ?, "
+                    "next_try = ? WHERE key = ?",
+                    retries,
+                )
+                counts["failed"] += len(items)
+                logger.warning("flush of %d writes failed: %s", len(items), error)
+                break
+
+            conn.execute("BEGIN")
+            conn.executemany(
+                "UPDATE writes SET state = 'conflict', error = ? WHERE key = ?",
+                [(msg, key) for key, msg in problems.items()],
+            )
+            conn.executemany(
+                "UPDATE writes SET state = 'synced', synced_at = ?, error = NULL "
+                "WHERE key = ?",
+                [(now, key) for key in keys if key not in problems],
+            )
+            conn.execute("COMMIT")
+            counts["conflict"] += len(problems)
+            counts["synced"] += len(keys) - len(problems)
+        conn.execute(
+            "DELETE FROM writes WHERE state = 'synced' AND synced_at < ?",
+            (time.time() - KEEP_SYNCED_S,),
+        )
+    return counts
+
+
+class Flusher:
+    """Background thread that flushes the buffer when woken or every interval."""
+
+    def __init__(self, engine, interval: float = FLUSH_INTERVAL_S):
+        self.engine = engine
+        self.interval = interval
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                flush(self.engine)
+            except Exception:  # keep the thread alive whatever happens
+                logger.exception("outbox flush crashed")
+
+
+@st.cache_resource
+def worker() -> Flusher:
+    """The process-wide Flusher (started on first use)."""
+    from database import get_engine
+
+    return Flusher(get_engine())
+
+
+# --- UI ---
+
+
+def status_line() -> None:
+    """Pending / synced state of the buffer, with the conflicts to resolve."""
+    state = summary()
+    if state["pending"]:
+        worker().wake()  # e.g. left over from before a restart
+        msg = f"⏳ {state['pending']} change(s) saved locally, waiting to sync"
+        if state["error"]:
+            msg += f" · retrying after: {state['error']}"
+        st.caption(msg)
+    elif state["synced"]:
+        st.caption("✅ All changes synced to the database")
+    for c in conflicts():
+        what = f"cycle #{c['cycle_no']}" if c["kind"] == "cycle" else "status change"
+        col_msg, col_btn = st.columns([5, 1])
+        col_msg.warning(f"Not synced: {what} of cell {c['cell_id']} ({c['error']})")
+        if col_btn.button("Discard", key=f"discard_{c['key']}"):
+            discard(c["key"])
+            st.rerun()
@@ -1,89 +1,233 @@
+# services/pdf.py
+"""PDF report of one cell: cell info, summary plots, cycle tables, photos.
+
+Photos are never embedded at camera resolution. media.thumbnail() downsizes
+each one once into media/thumbnails/<sha256 of the file>.jpg, and later reports
+reuse that file, so identical photos share one thumbnail. reportlab stores an image
+drawn several times as a single XObject, so a shared thumbnail is embedded
+only once per document.
+
+Cycle data is laid out as fixed-size tables (one per page), and the plots are
+native vector charts of the LTTB-downsampled series.
+"""
+import os
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from PIL import Image as PILImage
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import cm
-import os
+from reportlab.platypus import (
+    Image,
+    PageBreak,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.base import Cell, Cycle
+from services import media
+from services.plotting import downsample
+
+ROWS_PER_TABLE = 40  # one table per A4 page
+PLOT_POINTS = 400  # per summary plot after downsampling
+PHOTO_COLUMNS = 3
+DEFAULT_CHUNK_SIZE = 5000
+
+# Table header → Cycle column (standard PDF fonts have no Δ)
+TABLE_COLUMNS = {
+    "Cycle": Cycle.cycle_no,
+    "mA/cm²": Cycle.current_density,
+    "Charge V": Cycle.charge_V,
+    "Disch. V": Cycle.discharge_V,
+    "dV": Cycle.delta_V,
+    "CE %": Cycle.ce_pct,
+    "Cap. mAh": Cycle.capacity_mAh,
+    "pH": Cycle.pH,
+}
+# Summary plots: (title, TABLE_COLUMNS header)
+PLOTS = [
+    ("Coulombic efficiency (%)", "CE %"),
+    ("Voltage gap (V)", "dV"),
+    ("Discharge capacity (mAh)", "Cap. mAh"),
+]
+# Cell attribute → label in the info table
+CELL_INFO = {
+    "chemistry": "Chemistry",
+    "configuration": "Configuration",
+    "rated_capacity": "Rated capacity (mAh)",
+    "znbr_molarity": "ZnBr2 (M)",
+    "teacl_molarity": "TEACl (M)",
+    "channel": "Channel",
+    "status": "Status",
+    "assembly_date": "Assembly date",
+}
+
+_STYLES = getSampleStyleSheet()
+_STRIPES = [colors.white, colors.HexColor("#f5f7fa")]
+_TABLE_STYLE = TableStyle(
+    [
+        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold", 8),
+        ("FONT", (0, 1), (-1, -1), "Helvetica", 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#dde4ee")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), _STRIPES),
+        ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#b0b8c4")),
+        ("TOPPADDING", (0, 0), (-1, -1), 1.5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1.5),
+    ]
+)
+
+
+# --- Flowables ---
+def _fmt(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
 
 
-def build_pdf(cell_id, cell_data, cycle_data, output_path=""):
-    filename = os.path.join(output_path or "media", f"{cell_id}.pdf")
-    c = canvas.Canvas(filename, pagesize=A4)
-    width, height = A4
+def _plot(title: str, x: list, y: list):
+    """Line chart of y over x, or a note when y has no values (LinePlot can't
+    draw an empty series)."""
+    xs, ys = downsample(x, y, PLOT_POINTS)
+    if not len(xs):
+        return Paragraph(f"<b>{title}:</b> no data", _STYLES["Normal"])
+    d = Drawing(17 * cm, 5 * cm)
+    lp = LinePlot()
+    lp.x, lp.y = 1.2 * cm, 0.7 * cm
+    lp.width, lp.height = 15.3 * cm, 3.6 * cm
+    lp.data = [list(zip(xs.tolist(), ys.tolist()))]
+    lp.lines[0].strokeColor = colors.HexColor("#1f77b4")
+    lp.lines[0].strokeWidth = 1
+    lp.xValueAxis.labels.fontSize = 7
+    lp.yValueAxis.labels.fontSize = 7
+    d.add(lp)
+    d.add(String(1.2 * cm, 4.6 * cm, title, fontName="Helvetica-Bold", fontSize=9))
+    return d
 
-    y = height - 50
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, y, f"Zn–Br Battery Report: {cell_id}")
-    y -= 40
 
-    # Draw start photo if exists
-    if cell_data.start_photo and os.path.exists(cell_data.start_photo):
+def _photo_grid(photos: list, width: float):
+    """Thumbnails `PHOTO_COLUMNS` per row, each captioned with its cycle."""
+    cell_w = width / PHOTO_COLUMNS
+    cells = []
+    for cycle_no, path in photos:
         try:
-            img_width = 6 * cm
-            img_height = 4.5 * cm
-            c.drawImage(
-                cell_data.start_photo,
-                50,
-                y - img_height,
-                width=img_width,
-                height=img_height,
-            )
-            y -= img_height + 20
-        except Exception as e:
-            c.setFont("Helvetica", 10)
-            c.drawString(50, y, f"⚠️ Error loading start image: {str(e)}")
-            y -= 20
-    else:
-        c.setFont("Helvetica", 10)
-        c.drawString(50, y, "⚠️ No start photo available.")
-        y -= 20
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, y, f"Felt Type: {cell_data.felt_type}")
-    y -= 20
-    c.drawString(50, y, f"Sealing Type: {cell_data.sealing_type}")
-    y -= 20
-    c.drawString(50, y, f"Notes: {cell_data.notes}")
-    y -= 40
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Cycle Data")
-    y -= 25
-    c.setFont("Helvetica", 10)
-
-    for cycle in cycle_data:
-        line = f"Cycle {cycle.cycle_no} | CE%: {cycle.ce_pct} | ΔV: {cycle.delta_V} "
-        c.drawString(60, y, line)
-        y -= 15
-
-        # Draw cycle photo if exists
-        if cycle.photo_path and os.path.exists(cycle.photo_path):
-            try:
-                img_width = 6 * cm
-                img_height = 4.5 * cm
-
-                # If space is tight, go to next page
-                if y < img_height + 60:
-                    c.showPage()
-                    y = height - 50
-
-                c.drawImage(
-                    cycle.photo_path,
-                    60,
-                    y - img_height,
-                    width=img_width,
-                    height=img_height,
-                )
-                y -= img_height + 10
-            except Exception as e:
-                c.drawString(60, y, f"⚠️ Error loading cycle image: {str(e)}")
-                y -= 15
-
-        # Add spacing between cycles
-        y -= 10
-
-        # Page break if needed
-        if y < 100:
-            c.showPage()
-            y = height - 50
-
-    c.save()
-    return filename
+            thumb = media.thumbnail(path)
+            with PILImage.open(thumb) as img:
+                w, h = img.size
+            scale = min((cell_w - 0.4 * cm) / w, 4.5 * cm / h)
+            img = Image(str(thumb), width=w * scale, height=h * scale)
+        except (OSError, ValueError) as e:
+            name = Path(path).name
+            img = Paragraph(escape(f"Could not read {name}: {e}"), _STYLES["Normal"])
+        cells.append([img, Paragraph(f"Cycle {cycle_no}", _STYLES["Normal"])])
+    rows = [cells[i:i + PHOTO_COLUMNS] for i in range(0, len(cells), PHOTO_COLUMNS)]
+    rows[-1] += [""] * (PHOTO_COLUMNS - len(rows[-1]))
+    return Table(
+        rows,
+        colWidths=[cell_w] * PHOTO_COLUMNS,
+        style=[
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ],
+    )
+
+
+def build_pdf(
+    db: Session,
+    cell_pk: int,
+    output_path: str = "",
+    file=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """Write the report for cell `cell_pk` (Cell.id).
+
+    Goes to `file` (path or binary file object) if given, otherwise to
+    <output_path or media>/<cell_id>.pdf. Returns where it was written.
+    """
+    cell = db.get(Cell, cell_pk)
+    if cell is None:
+        raise ValueError(f"No cell with id {cell_pk}")
+    if file is None:
+        file = os.path.join(output_path or "media", f"{cell.cell_id}.pdf")
+
+    doc = SimpleDocTemplate(
+        file,
+        pagesize=A4,
+        title=f"Zn–Br battery report: {cell.cell_id}",
+        leftMargin=1.5 * cm,
+        rightMargin=1.5 * cm,
+        topMargin=1.5 * cm,
+        bottomMargin=1.5 * cm,
+    )
+
+    # --- 1. Stream cycles: table chunks, plot series, photo list ---
+    headers = list(TABLE_COLUMNS)
+    plot_cols = [headers.index(h) for _, h in PLOTS]
+    cycle_nos, series = [], [[] for _ in PLOTS]
+    tables, chunk, photos = [], [], []
+    result = db.execute(
+        select(*TABLE_COLUMNS.values(), Cycle.photo_path, Cycle.csv_path)
+        .where(Cycle.cell_id == cell_pk)
+        .order_by(Cycle.cycle_no)
+        .execution_options(yield_per=chunk_size)
+    )
+    for *values, photo_path, csv_path in result:
+        chunk.append([_fmt(v) for v in values])
+        if len(chunk) == ROWS_PER_TABLE:
+            tables.append(chunk)
+            chunk = []
+        cycle_nos.append(values[0])
+        for s, col in zip(series, plot_cols):
+            s.append(values[col] if values[col] is not None else float("nan"))
+        # Older uploads kept photos in csv_path, so look there too
+        for path in (photo_path, csv_path):
+            if path and media.is_image(path) and media.exists(path):
+                photos.append((values[0], path))
+    if chunk:
+        tables.append(chunk)
+
+    # --- 2. Story ---
+    story = [
+        # Paragraphs parse markup: free text is escaped
+        Paragraph(f"Zn–Br Battery Report: {escape(cell.cell_id)}", _STYLES["Title"]),
+        Table(
+            [[label, _fmt(getattr(cell, attr))] for attr, label in CELL_INFO.items()]
+            + [["Cycles", f"{len(cycle_nos):,}"]],
+            colWidths=[5 * cm, 11 * cm],
+            hAlign="LEFT",
+            style=[("FONT", (0, 0), (0, -1), "Helvetica-Bold")],
+        ),
+        Paragraph(f"<b>Notes:</b> {escape(cell.notes or '—')}", _STYLES["Normal"]),
+        Spacer(0, 0.5 * cm),
+    ]
+    if cycle_nos:
+        story += [_plot(title, cycle_nos, s) for (title, _), s in zip(PLOTS, series)]
+
+    for rows in tables:
+        story.append(PageBreak())
+        story.append(Table([headers] + rows, repeatRows=1, style=_TABLE_STYLE))
+
+    if photos:
+        story.append(PageBreak())
+        story.append(Paragraph("Cycle photos", _STYLES["Heading2"]))
+        story.append(_photo_grid(photos, doc.width))
+
+    def footer(canvas, doc):
+        canvas.setFont("Helvetica", 8)
+        canvas.drawRightString(
+            A4[0] - 1.5 * cm, 1 * cm, f"{cell.cell_id} · page {doc.page}"
+        )
+
+    doc.build(story, onFirstPage=footer, onLaterPages=footer)
+    return file
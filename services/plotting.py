@@ -0,0 +1,141 @@
+# services/plotting.py
+"""Plot helpers: shape-preserving downsampling, WebGL switch, cached figures.
+
+Large series are reduced with LTTB (Largest-Triangle-Three-Buckets) before they
+reach plotly, and figures with many points use WebGL (Scattergl) traces so the
+browser doesn't choke. metric_figure() caches the built figure per
+(cell, metric, cycles version), so unrelated widget changes reuse it.
+
+plotly is imported by the functions that build figures, so pages and export
+workers that only need METRIC_COLUMNS or downsample() don't load it.
+"""
+import math
+
+import numpy as np
+from sqlalchemy import select
+
+from database import read_db
+from models.base import Cycle
+from services.queries import versioned
+
+MAX_POINTS = 2000  # per trace after downsampling
+WEBGL_THRESHOLD = 5000  # total points in a figure above which Scattergl is used
+
+# Cell Viewer metric label → Cycle column
+METRIC_COLUMNS = {
+    "Charge V": "charge_V",
+    "Discharge V": "discharge_V",
+    "ΔV": "delta_V",
+    "CE %": "ce_pct",
+    "Cap. (mAh)": "capacity_mAh",
+    "VE %": "voltage_efficiency_pct",
+    "EE %": "energy_efficiency_pct",
+    "Cap. / rated": "normalized_capacity",
+}
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Indices of the points LTTB keeps when reducing (x, y) to n_out points."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the points between the fixed first and last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:nxt_hi].mean()
+        avg_y = y[hi:nxt_hi].mean()
+        # area of the triangle (selected point, candidate, next bucket's mean)
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(x, y, n_out: int = MAX_POINTS):
+    """(x, y) reduced to at most n_out points with LTTB; NaNs are dropped."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    idx = lttb_indices(x, y, n_out)
+    return x[idx], y[idx]
+
+
+def line_figure(series, x_title: str, y_title: str, markers: bool = False):
+    """Figure with one line per (name, x, y) in `series`, downsampled as needed.
+
+    Switches every trace to WebGL when the figure would carry more than
+    WEBGL_THRESHOLD points in total.
+    """
+    import plotly.graph_objects as go
+
+    reduced = [(name, *downsample(x, y)) for name, x, y in series]
+    total = sum(len(x) for _, x, _ in reduced)
+    trace = go.Scattergl if total > WEBGL_THRESHOLD else go.Scatter
+    mode = "lines+markers" if markers and total <= WEBGL_THRESHOLD else "lines"
+
+    fig = go.Figure()
+    for name, x, y in reduced:
+        fig.add_trace(trace(x=x, y=y, name=name, mode=mode))
+    fig.update_layout(
+        xaxis_title=x_title, yaxis_title=y_title, showlegend=len(reduced) > 1
+    )
+    return fig
+
+
+def small_multiples(series, x_title: str, y_title: str, columns: int = 3):
+    """One small panel per (name, x, y) in `series`, sharing both axes."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    reduced = [(name, *downsample(x, y)) for name, x, y in series]
+    total = sum(len(x) for _, x, _ in reduced)
+    trace = go.Scattergl if total > WEBGL_THRESHOLD else go.Scatter
+    columns = max(1, min(columns, len(reduced)))
+    rows = math.ceil(len(reduced) / columns)
+
+    fig = make_subplots(
+        rows=rows,
+        cols=columns,
+        shared_xaxes="all",
+        shared_yaxes="all",
+        subplot_titles=[name for name, _, _ in reduced],
+        vertical_spacing=0.3 / rows,
+        horizontal_spacing=0.04,
+    )
+    for i, (name, x, y) in enumerate(reduced):
+        fig.add_trace(
+            trace(x=x, y=y, name=name, mode="lines"),
+            row=i // columns + 1,
+            col=i % columns + 1,
+        )
+    fig.update_xaxes(title_text=x_title, row=rows)
+    fig.update_yaxes(title_text=y_title, col=1)
+    fig.update_layout(height=220 * rows + 60, showlegend=False)
+    return fig
+
+
+@versioned("cycles")
+def metric_figure(version, cell_id: int, metric: str):
+    """Cached cycle-number plot of one metric for one cell (saved data only)."""
+    column = getattr(Cycle, METRIC_COLUMNS[metric])
+    with read_db() as db:
+        rows = db.execute(
+            select(Cycle.cycle_no, column)
+            .where(Cycle.cell_id == cell_id)
+            .order_by(Cycle.cycle_no)
+        ).all()
+    x = np.array([r[0] for r in rows], dtype=float)
+    y = np.array([r[1] if r[1] is not None else np.nan for r in rows], dtype=float)
+    return line_figure([(metric, x, y)], "Cycle #", metric, markers=True)
@@ -0,0 +1,221 @@
+# services/queries.py
+"""Cached read layer shared by all pages.
+
+Each query is memoized with st.cache_data and keyed by the version counters of
+the tables it reads (database.table_version). Committed writes bump those
+counters, so a rerun that didn't change any data is served from memory and a
+rerun after a write always re-queries.
+
+Results are SQLAlchemy Row objects: attribute access works like the ORM
+objects (row.cell_id, row.channel …) but they are plain, picklable values.
+"""
+import functools
+
+import streamlit as st
+from sqlalchemy import and_, func, literal, select
+
+from database import read_db, table_version
+from models.base import Cell, CellStats, Cycle, Cycler
+
+# Old versions of a query fall out of the cache once this many are stored
+_MAX_ENTRIES = 32
+
+CELL_COLUMNS = list(Cell.__table__.c)
+STATS_COLUMNS = [
+    CellStats.cycle_count,
+    CellStats.last_cycle_no,
+    CellStats.last_update,
+    CellStats.last_ce_pct,
+    CellStats.last_delta_V,
+    CellStats.last_capacity_mAh,
+]
+
+
+def versioned(*tables):
+    """Memoize a query until one of `tables` is written.
+
+    The decorated function takes the version tuple as its first argument;
+    callers leave it out and the wrapper fills it in.
+    """
+
+    def decorator(fn):
+        cached = st.cache_data(show_spinner=False, max_entries=_MAX_ENTRIES)(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return cached(table_version(*tables), *args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorator
+
+
+def cells_select():
+    """Cell columns + cell_stats summary + cycler name, one row per cell."""
+    return (
+        select(*CELL_COLUMNS, *STATS_COLUMNS, Cycler.name.label("cycler"))
+        .outerjoin(CellStats, Cell.id == CellStats.cell_id)
+        .outerjoin(Cycler, Cell.cycler_id == Cycler.id)
+    )
+
+
+@versioned("cells", "cell_stats", "cyclers")
+def running_cells(version):
+    """Running cells with their cell_stats summary, ordered by cell ID."""
+    with read_db() as db:
+        return db.execute(
+            cells_select().where(Cell.status == "running").order_by(Cell.cell_id)
+        ).all()
+
+
+@versioned("cells", "cell_stats", "cyclers")
+def all_cells(version, status: str = None):
+    """Every cell (optionally only one status) with its cell_stats summary."""
+    with read_db() as db:
+        q = cells_select().order_by(Cell.cell_id)
+        if status:
+            q = q.where(Cell.status == status)
+        return db.execute(q).all()
+
+
+@versioned("cyclers")
+def cyclers(version):
+    """All cyclers (id, name, channel_count) by name."""
+    with read_db() as db:
+        return db.execute(
+            select(Cycler.id, Cycler.name, Cycler.channel_count).order_by(Cycler.name)
+        ).all()
+
+
+def _channel_board_select(cycler_ids=None):
+    max_channels = select(func.max(Cycler.channel_count)).scalar_subquery()
+    channels = select(literal(1).label("n")).cte("channels", recursive=True)
+    channels = channels.union_all(
+        select(channels.c.n + 1).where(channels.c.n < max_channels)
+    )
+    running = select(Cell).where(Cell.status == "running").subquery("running")
+    q = (
+        select(
+            Cycler.id.label("cycler_pk"),
+            Cycler.name.label("cycler"),
+            Cycler.channel_count,
+            channels.c.n.label("channel"),
+            running.c.id,
+            running.c.cell_id,
+            running.c.chemistry,
+            running.c.rated_capacity,
+            running.c.assembly_date,
+            *STATS_COLUMNS,
+        )
+        .select_from(Cycler)
+        .join(channels, channels.c.n <= Cycler.channel_count)
+        .outerjoin(
+            running,
+            and_(running.c.cycler_id == Cycler.id, running.c.channel == channels.c.n),
+        )
+        .outerjoin(CellStats, CellStats.cell_id == running.c.id)
+        .order_by(Cycler.name, channels.c.n)
+    )
+    if cycler_ids:
+        q = q.where(Cycler.id.in_(list(cycler_ids)))
+    return q
+
+
+@versioned("cyclers", "cells", "cell_stats")
+def channel_board(version, cycler_ids=None):
+    """One row per cycler channel with its running cell (if any), in one query.
+
+    Channel numbers come from a recursive CTE up to the largest channel_count,
+    so empty channels are rows too. Columns: cycler_pk, cycler, channel_count,
+    channel, then the running cell's columns (None when the channel is free)
+    and its cell_stats summary.
+    """
+    with read_db() as db:
+        return db.execute(_channel_board_select(cycler_ids)).all()
+
+
+@versioned("cyclers", "cells", "cell_stats")
+def board_snapshot(version, cycler_ids=None):
+    """(highest Cycle.id, channel_board rows) for the live dashboard.
+
+    The watermark is read first, so every cycle above it is either missing
+    from the rows or caught by services/live.py's cycle_no check.
+    """
+    with read_db() as db:
+        watermark = db.execute(select(func.max(Cycle.id))).scalar() or 0
+        return watermark, db.execute(_channel_board_select(cycler_ids)).all()
+
+
+@versioned("cycles")
+def cycle_page(
+    version, cell_id: int, start: int = None, before: int = None, page_size: int = 100
+):
+    """One page of a cell's cycles by keyset pagination on (cell_id, cycle_no).
+
+    `start`: first page at or after this cycle number (also used to jump);
+    `before`: the page that ends just before this cycle number.
+    Returns (rows ascending by cycle_no, has_prev, has_next).
+    """
+    with read_db() as db:
+        q = select(*Cycle.__table__.c).where(Cycle.cell_id == cell_id)
+        rows = None
+        if before is not None:
+            rows = db.execute(
+                q.where(Cycle.cycle_no < before)
+                .order_by(Cycle.cycle_no.desc())
+                .limit(page_size + 1)
+            ).all()
+            has_prev = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next = True
+            if not has_prev:
+                # Near the start: show a full first page rather than a short one
+                rows, start = None, None
+        if rows is None:
+            if start is not None:
+                q = q.where(Cycle.cycle_no >= start)
+            rows = db.execute(
+                q.order_by(Cycle.cycle_no).limit(page_size + 1)
+            ).all()
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            has_prev = bool(rows) and db.execute(
+                select(Cycle.id)
+                .where(Cycle.cell_id == cell_id, Cycle.cycle_no < rows[0].cycle_no)
+                .limit(1)
+            ).first() is not None
+    return rows, has_prev, has_next
+
+
+@versioned("cycles")
+def cycle_summary(version, cell_id: int):
+    """Whole-history statistics of one cell from a single aggregate query."""
+    first_cap = (
+        select(Cycle.capacity_mAh)
+        .where(Cycle.cell_id == cell_id, Cycle.capacity_mAh.isnot(None))
+        .order_by(Cycle.cycle_no)
+        .limit(1)
+        .scalar_subquery()
+    )
+    last_cap = (
+        select(Cycle.capacity_mAh)
+        .where(Cycle.cell_id == cell_id, Cycle.capacity_mAh.isnot(None))
+        .order_by(Cycle.cycle_no.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    with read_db() as db:
+        return db.execute(
+            select(
+                func.count(Cycle.id).label("cycles"),
+                func.min(Cycle.cycle_no).label("first_cycle"),
+                func.max(Cycle.cycle_no).label("last_cycle"),
+                func.avg(Cycle.ce_pct).label("avg_ce"),
+                func.min(Cycle.ce_pct).label("min_ce"),
+                func.avg(Cycle.delta_V).label("avg_delta_V"),
+                func.max(Cycle.capacity_mAh).label("max_capacity"),
+                first_cap.label("first_capacity"),
+                last_cap.label("last_capacity"),
+            ).where(Cycle.cell_id == cell_id)
+        ).one()
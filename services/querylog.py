@@ -0,0 +1,248 @@
+# services/querylog.py
+"""Per-rerun SQL instrumentation, with an N+1 detector.
+
+instrument(engine) (done by database.make_engine) times every statement the
+engine sends. Statements run from a Streamlit script thread are added to that
+session's RerunLog, opened by begin() at the top of each page; other threads
+(scripts, the ingest daemon) aren't recorded. A fragment rerunning on its own
+(st.fragment's run_every timer or one of its widgets) gets a RerunLog of its
+own, tagged with the fragment's name, from begin_fragment().
+
+A RerunLog keeps aggregates per statement pattern (the SQL with its IN lists
+collapsed), not every statement, so a big export doesn't grow it. When the
+next rerun begins, the previous one is finished:
+
+- one structured log line (JSON) per rerun on the "znbr.queries" logger, at
+  INFO; shown when the QUERY_LOG setting is on
+- a WARNING for each N+1 pattern: the same statement run N_PLUS_ONE_MIN or
+  more times in one rerun (one query per row instead of one for all rows)
+- with the QUERY_DEBUG setting on (or ?debug=1 in the URL), a sidebar panel
+  of the last finished rerun's numbers
+
+Rows are the driver's rowcount: rows returned on PostgreSQL, but only rows
+written on SQLite, whose driver doesn't count SELECT results.
+"""
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+import streamlit as st
+from sqlalchemy import event
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+N_PLUS_ONE_MIN = 5  # runs of one pattern in a rerun that count as N+1
+SLOW_MS = 100.0  # statements slower than this are named in the log line
+_KEY = "_query_log"
+_SQL_WIDTH = 160
+
+logger = logging.getLogger("znbr.queries")
+
+# IN (?, ?, ?) / VALUES (?, ?), (?, ?) lists → one placeholder group
+_PARAM = r"(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})+\s*\)")
+_REPEATED_GROUPS = re.compile(r"(\(…\))(?:\s*,\s*\(…\))+")
+_SELECT_LIST = re.compile(r"^SELECT (.+?) FROM ")
+
+
+def pattern(statement: str) -> str:
+    """SQL text with whitespace and parameter lists normalized."""
+    sql = " ".join(statement.split())
+    sql = _PARAM_LIST.sub("(…)", sql)
+    return _REPEATED_GROUPS.sub(r"\1", sql)
+
+
+def short(sql: str) -> str:
+    """A pattern for display: select list elided, cut to _SQL_WIDTH."""
+    return _SELECT_LIST.sub("SELECT … FROM ", sql, count=1)[:_SQL_WIDTH]
+
+
+class RerunLog:
+    """Statement counts and timings of one rerun of one page (or fragment)."""
+
+    def __init__(self, page: str, fragment: str = None):
+        self.page = page
+        self.fragment = fragment
+        self.started = datetime.now()
+        self.statements = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        # pattern → [runs, total ms, slowest ms, rows]
+        self.patterns = {}
+        self.finished = False
+
+    def record(self, statement: str, ms: float, rows: int) -> None:
+        stats = self.patterns.setdefault(pattern(statement), [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += ms
+        stats[2] = max(stats[2], ms)
+        stats[3] += rows
+        self.statements += 1
+        self.total_ms += ms
+        self.rows += rows
+
+    def slowest(self):
+        """(pattern, ms) of the slowest single statement, or (None, 0)."""
+        if not self.patterns:
+            return None, 0.0
+        sql, stats = max(self.patterns.items(), key=lambda kv: kv[1][2])
+        return sql, stats[2]
+
+    def repeated(self) -> dict:
+        """Patterns run more than once → runs, most first."""
+        runs = {sql: s[0] for sql, s in self.patterns.items() if s[0] > 1}
+        return dict(sorted(runs.items(), key=lambda kv: -kv[1]))
+
+    def n_plus_one(self) -> dict:
+        return {sql: n for sql, n in self.repeated().items() if n >= N_PLUS_ONE_MIN}
+
+    def summary(self) -> dict:
+        slowest_sql, slowest_ms = self.slowest()
+        return {
+            "event": "rerun_queries",
+            "page": self.page,
+            "fragment": self.fragment,
+            "started": self.started.isoformat(timespec="seconds"),
+            "statements": self.statements,
+            "total_ms": round(self.total_ms, 2),
+            "slowest_ms": round(slowest_ms, 2),
+            "slowest_sql": (
+                short(slowest_sql) if slowest_ms >= SLOW_MS else None
+            ),
+            "rows": self.rows,
+            "repeated": len(self.repeated()),
+            "n_plus_one": [
+                {"sql": short(sql), "runs": n}
+                for sql, n in self.n_plus_one().items()
+            ],
+        }
+
+    def finish(self) -> None:
+        """Write the log lines (once)."""
+        if self.finished:
+            return
+        self.finished = True
+        summary = self.summary()
+        logger.info(json.dumps(summary, ensure_ascii=False))
+        for item in summary["n_plus_one"]:
+            logger.warning(
+                json.dumps(
+                    {
+                        "event": "n_plus_one",
+                        "page": self.page,
+                        "fragment": self.fragment,
+                        **item,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+
+
+# ── Engine hooks ─────────────────────────────────────────────────────────────
+
+
+def _current_log():
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None  # not a script thread
+    return st.session_state.get(_KEY)
+
+
+def _before_cursor_execute(conn, cursor, statement, params, context, many):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, params, context, many):
+    ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    log = _current_log()
+    if log is not None:
+        log.record(statement, ms, max(cursor.rowcount, 0))
+
+
+def instrument(engine) -> None:
+    """Time this engine's statements into the current rerun's log."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ── Page side ────────────────────────────────────────────────────────────────
+
+
+def _setting_on(name: str) -> bool:
+    from database import get_setting  # database imports this module
+
+    value = str(get_setting(name, "")).strip().lower()
+    return value in ("1", "true", "yes", "on")
+
+
+def _configure_logging() -> None:
+    if _setting_on("QUERY_LOG") and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def begin(page: str) -> None:
+    """Start recording this rerun of `page` (pass __file__).
+
+    Call at the top of every page. Finishes the session's previous rerun (log
+    lines) and, in debug mode, shows its numbers in the sidebar.
+    """
+    previous = st.session_state.get(_KEY)
+    if previous is not None:
+        previous.finish()
+    else:
+        _configure_logging()
+    st.session_state[_KEY] = RerunLog(os.path.splitext(os.path.basename(page))[0])
+
+    if previous is not None and (
+        st.query_params.get("debug") == "1" or _setting_on("QUERY_DEBUG")
+    ):
+        panel(previous)
+
+
+def begin_fragment(name: str) -> None:
+    """Start recording a fragment's own rerun (call at the top of its body).
+
+    Only fragment reruns get a new log: when the fragment runs as part of a
+    full rerun of the page, its queries stay in that rerun's log.
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or not ctx.fragment_ids_this_run:
+        return
+    previous = st.session_state.get(_KEY)
+    if previous is None:
+        return  # begin() hasn't run in this session
+    previous.finish()
+    st.session_state[_KEY] = RerunLog(previous.page, fragment=name)
+
+
+def panel(log: RerunLog) -> None:
+    """Sidebar debug panel for a finished rerun."""
+    with st.sidebar.expander("🐞 Queries (last rerun)", expanded=True):
+        where = f"{log.page} · fragment {log.fragment}" if log.fragment else log.page
+        st.caption(f"{where} · {log.started:%H:%M:%S}")
+        c1, c2 = st.columns(2)
+        c1.metric("Statements", log.statements)
+        c2.metric("Total", f"{log.total_ms:.1f} ms")
+        c1.metric("Slowest", f"{log.slowest()[1]:.1f} ms")
+        c2.metric("Rows", log.rows)
+        for sql, runs in log.n_plus_one().items():
+            st.warning(f"N+1: {runs}× `{short(sql)}`")
+        if log.patterns:
+            st.dataframe(
+                [
+                    {
+                        "SQL": short(sql),
+                        "Runs": s[0],
+                        "Total ms": round(s[1], 2),
+                        "Max ms": round(s[2], 2),
+                        "Rows": s[3],
+                    }
+                    for sql, s in sorted(log.patterns.items(), key=lambda kv: -kv[1][1])
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
@@ -0,0 +1,309 @@
+# services/replica.py
+"""Optional local SQLite read replica of the primary database.
+
+With READ_REPLICA on, database.read_db() sessions (the cached queries, search,
+analytics, the live board) read from a local file, REPLICA_PATH, instead of
+going over the network. get_db() sessions, i.e. every write, still go to the
+primary.
+
+A background Syncer pulls from the primary every REPLICA_MAX_LAG_S / 2 (and
+right after this process commits anything):
+
+- cells and cycles: rows above the highest id the replica holds, then rows
+  whose updated_at change marker is at most OVERLAP_S older than the newest
+  marker it holds (edits, and inserts committed out of id order). Only the
+  (id, updated_at) pairs of that window are compared over the network; full
+  rows are fetched just for the ids whose marker differs. A row count
+  that still differs after that means deletes or a missed row, and the two id
+  lists are compared to fix it.
+- cyclers and cell_stats (at most one row per cell): read whole and compared.
+
+Tables that changed get their cache version bumped (database.bump_version), so
+cached reads pick the new rows up.
+
+Freshness bound: reads use the replica only while its last successful sync
+started less than REPLICA_MAX_LAG_S seconds ago and no Session of this process
+has committed since then, so a page always sees its own writes. Otherwise they
+go to the primary and the Syncer is woken. A failing sync just leaves reads on
+the primary.
+
+READ_REPLICA is off ("0") by default; "auto" turns it on whenever the database
+URL has a host, as WRITE_BUFFER does. The file is rebuilt from scratch when
+the models' columns change.
+"""
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import streamlit as st
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.base import Base, Cell, CellStats, Cycle, Cycler
+
+REPLICA_PATH = os.path.join("media", "replica.db")
+MAX_LAG_S = 30.0  # default of the REPLICA_MAX_LAG_S setting
+OVERLAP_S = 300.0  # change markers re-checked this far back (slow commits, skew)
+CHUNK = 2000  # rows per pull and per upsert
+
+# Synced by id + updated_at; the others are small enough to compare whole
+MARKED = (Cell.__table__, Cycle.__table__)
+TABLES = (Cycler.__table__, Cell.__table__, Cycle.__table__, CellStats.__table__)
+
+logger = logging.getLogger("znbr.replica")
+
+
+def enabled() -> bool:
+    """Whether reads may use the replica (READ_REPLICA setting)."""
+    from database import get_setting  # database imports this module
+
+    value = str(get_setting("READ_REPLICA", "0")).strip().lower()
+    if value == "auto":
+        url = get_setting("DATABASE_URL")
+        return bool(url) and bool(make_url(url).host)
+    return value in ("1", "true", "yes", "on")
+
+
+def max_lag() -> float:
+    """The freshness bound in seconds (REPLICA_MAX_LAG_S setting)."""
+    from database import get_setting
+
+    return float(get_setting("REPLICA_MAX_LAG_S", MAX_LAG_S))
+
+
+# ── Replica file ─────────────────────────────────────────────────────────────
+
+
+def _fingerprint() -> int:
+    """Changes whenever a replicated table's columns do."""
+    columns = sorted(f"{t.name}.{c.name} {c.type}" for t in TABLES for c in t.c)
+    return zlib.crc32("\n".join(columns).encode()) & 0x7FFFFFFF
+
+
+def _pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # pages read while a sync writes
+    cursor.execute("PRAGMA synchronous=NORMAL")  # it can always be rebuilt
+    cursor.close()
+
+
+def _prepare(engine, rebuild: bool = False) -> None:
+    """Create the schema (FTS tables included) unless it's current."""
+    with engine.begin() as conn:
+        current = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if rebuild or current != _fingerprint():
+            Base.metadata.drop_all(conn, tables=TABLES)
+            Base.metadata.create_all(conn, tables=TABLES)
+            conn.exec_driver_sql(f"PRAGMA user_version = {_fingerprint()}")
+
+
+def open_replica(path: str = None):
+    """Engine on the replica file, created (or rebuilt) as needed."""
+    from database import make_engine
+
+    path = path or REPLICA_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    engine = make_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", _pragmas)
+    _prepare(engine)
+    return engine
+
+
+# ── Sync ─────────────────────────────────────────────────────────────────────
+
+
+def _rows(conn, query) -> list:
+    return [dict(r._mapping) for r in conn.execute(query)]
+
+
+def _chunks(items: list):
+    for i in range(0, len(items), CHUNK):
+        yield items[i : i + CHUNK]
+
+
+def _upsert(dst, table, rows: list) -> None:
+    # An UPDATE on conflict, not INSERT OR REPLACE, so the FTS triggers fire
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key],
+        set_={c.name: stmt.excluded[c.name] for c in table.c if not c.primary_key},
+    )
+    for chunk in _chunks(rows):
+        dst.execute(stmt, chunk)
+
+
+def _pull_marked(src, dst, table) -> bool:
+    """Bring a table with id + updated_at up to date; returns whether it changed."""
+    id_, marker = table.c.id, table.c.updated_at
+    top, newest = dst.execute(select(func.max(id_), func.max(marker))).one()
+    changed = False
+
+    # New rows by primary key (all of them on the first sync)
+    last = top or 0
+    while True:
+        rows = _rows(src, select(table).where(id_ > last).order_by(id_).limit(CHUNK))
+        if not rows:
+            break
+        _upsert(dst, table, rows)
+        last = rows[-1]["id"]
+        changed = True
+
+    # Edited rows, and rows committed after a higher id was pulled: compare
+    # just the markers in the window, then fetch the rows whose marker differs
+    if top is not None:
+        since = newest - timedelta(seconds=OVERLAP_S) if newest else datetime.min
+        window = select(id_, marker).where(marker >= since)
+        held = dict(dst.execute(window).all())
+        stale = [
+            row_id
+            for row_id, seen in src.execute(window.where(id_ <= top))
+            if held.get(row_id) != seen
+        ]
+        for chunk in _chunks(stale):
+            _upsert(dst, table, _rows(src, select(table).where(id_.in_(chunk))))
+            changed = True
+
+    # Deletes (or a row the markers missed): compare the id lists
+    count = select(func.count()).select_from(table)
+    if src.execute(count).scalar() != dst.execute(count).scalar():
+        theirs = set(src.execute(select(id_)).scalars())
+        ours = set(dst.execute(select(id_)).scalars())
+        for chunk in _chunks(sorted(ours - theirs)):
+            dst.execute(delete(table).where(id_.in_(chunk)))
+        for chunk in _chunks(sorted(theirs - ours)):
+            _upsert(dst, table, _rows(src, select(table).where(id_.in_(chunk))))
+        changed = changed or ours != theirs
+    return changed
+
+
+def _mirror(src, dst, table) -> bool:
+    """Copy a small table whole; returns whether anything differed."""
+    (pk,) = table.primary_key
+    theirs = {r[pk.name]: r for r in _rows(src, select(table))}
+    ours = {r[pk.name]: r for r in _rows(dst, select(table))}
+    gone = sorted(ours.keys() - theirs.keys())
+    stale = [r for key, r in theirs.items() if ours.get(key) != r]
+    for chunk in _chunks(gone):
+        dst.execute(delete(table).where(pk.in_(chunk)))
+    _upsert(dst, table, stale)
+    return bool(gone or stale)
+
+
+def sync(primary, replica) -> list:
+    """One pull from the primary into the replica; returns the tables changed."""
+    changed = []
+    with primary.connect() as src, replica.begin() as dst:
+        for table in TABLES:
+            pull = _pull_marked if table in MARKED else _mirror
+            if pull(src, dst, table):
+                changed.append(table.name)
+    return changed
+
+
+class Syncer:
+    """Background thread keeping a replica in step with the primary."""
+
+    def __init__(self, primary, engine, max_lag: float = MAX_LAG_S):
+        self.primary = primary
+        self.engine = engine
+        self.max_lag = max_lag
+        self.synced_at = None  # start of the last successful sync
+        self.error = None
+        self._lock = threading.Lock()
+        self._writes = 0  # Session commits seen in this process
+        self._synced_writes = -1  # …the last successful sync started after
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="replica", daemon=True)
+        self._thread.start()
+        _syncers.append(self)
+
+    def fresh(self) -> bool:
+        """Whether reads may use the replica right now."""
+        with self._lock:
+            caught_up = self._synced_writes == self._writes
+        return (
+            caught_up
+            and self.synced_at is not None
+            and time.time() - self.synced_at < self.max_lag
+        )
+
+    def note_write(self) -> None:
+        with self._lock:
+            self._writes += 1
+        self._wake.set()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def sync_once(self) -> list:
+        from database import bump_version
+
+        with self._lock:
+            writes = self._writes
+        started = time.time()
+        try:
+            changed = sync(self.primary, self.engine)
+        except IntegrityError:
+            # e.g. two cells swapped IDs between pulls: start over from scratch
+            logger.warning("replica out of step, rebuilding it")
+            self.synced_at = None
+            _prepare(self.engine, rebuild=True)
+            raise
+        if changed:
+            bump_version(*changed)
+        with self._lock:
+            self._synced_writes = writes
+        self.synced_at, self.error = started, None
+        logger.info(
+            "replica synced in %.0f ms: %s",
+            (time.time() - started) * 1000,
+            ", ".join(changed) or "no changes",
+        )
+        return changed
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sync_once()
+            except Exception as e:  # keep the thread alive; reads use the primary
+                message = str(e).splitlines()[0] if str(e) else ""
+                self.error = f"{type(e).__name__}: {message}"[:300]
+                logger.warning("replica sync failed: %s", self.error)
+            self._wake.wait(self.max_lag / 2)
+            self._wake.clear()
+
+
+_syncers = []  # started Syncers, told about every commit in this process
+
+
+@event.listens_for(Session, "after_commit")
+def _note_commit(session):
+    # Syncs write through Core connections, so a Session commit is a write to
+    # the primary: the replica can't serve reads until it has pulled it
+    for syncer in _syncers:
+        syncer.note_write()
+
+
+@st.cache_resource
+def syncer() -> Syncer:
+    """The process-wide Syncer (started on first use)."""
+    from database import get_engine
+
+    return Syncer(get_engine(), open_replica(), max_lag())
+
+
+def read_engine():
+    """The replica's engine if reads may use it now, else None (the primary)."""
+    if not enabled():
+        return None
+    current = syncer()
+    if current.fresh():
+        return current.engine
+    current.wake()
+    return None
@@ -0,0 +1,135 @@
+# services/search.py
+"""Database-side search for the cell selector.
+
+A query matches a cell when
+  * its cell_id starts with the text (B-tree index, case-insensitive), or
+  * every query word starts a word of its cell_id / notes, or
+  * every query word starts a word of one of its cycles' observations
+    (“leak” finds “leaking seal”).
+
+The word matching uses the full-text indexes created in models/base.py: FTS5
+tables on SQLite, GIN tsvector indexes on PostgreSQL. Results come back one
+page at a time, keyset-paginated on cell_id, so nothing is filtered in Python.
+"""
+import re
+
+from sqlalchemy import and_, column, func, literal_column, null, or_, select, table
+
+from database import read_db
+from models.base import Cell, Cycle
+from services.queries import cells_select, versioned
+
+PAGE_SIZE = 50
+
+# FTS5 content tables, as far as a query needs to know them
+_cells_fts = table("cells_fts", column("rowid"), column("cells_fts"))
+_cycles_fts = table("cycles_fts", column("rowid"), column("cycles_fts"))
+
+
+def query_words(text: str) -> list:
+    """Query text → lower-case words (punctuation can't break the FTS syntax)."""
+    return re.findall(r"\w+", text.lower())
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_")
+
+
+def _tsvector(config: str, col):
+    # Must match the indexed expression exactly for PostgreSQL to use the index
+    return func.to_tsvector(
+        literal_column(f"'{config}'::regconfig"),
+        func.coalesce(col, literal_column("''::text")),
+    )
+
+
+def _word_filters(dialect: str, words: list):
+    """(cell ids matching in cell_id/notes, cycle ids matching in observation)."""
+    if dialect == "sqlite":
+        match = " ".join(f'"{w}"*' for w in words)
+        cells = select(_cells_fts.c.rowid).where(
+            _cells_fts.c.cells_fts.op("MATCH")(match)
+        )
+        cycles = select(_cycles_fts.c.rowid).where(
+            _cycles_fts.c.cycles_fts.op("MATCH")(match)
+        )
+        return Cell.id.in_(cells), Cycle.id.in_(cycles)
+
+    if dialect == "postgresql":
+        prefix = " & ".join(f"{w}:*" for w in words)
+        id_query = func.to_tsquery(literal_column("'simple'::regconfig"), prefix)
+        text_query = func.to_tsquery(literal_column("'english'::regconfig"), prefix)
+        cells = or_(
+            _tsvector("simple", Cell.cell_id).op("@@")(id_query),
+            _tsvector("english", Cell.notes).op("@@")(text_query),
+        )
+        return cells, _tsvector("english", Cycle.observation).op("@@")(text_query)
+
+    # Other backends: unindexed substring match (a little looser, still correct)
+    cells = and_(
+        *[or_(Cell.cell_id.ilike(f"%{w}%"), Cell.notes.ilike(f"%{w}%")) for w in words]
+    )
+    return cells, and_(*[Cycle.observation.ilike(f"%{w}%") for w in words])
+
+
+@versioned("cells", "cycles", "cell_stats", "cyclers")
+def search_cells(
+    version,
+    text: str = "",
+    status: str = None,
+    after: str = None,
+    page_size: int = PAGE_SIZE,
+):
+    """One page of cells matching `text` (all cells when it's empty).
+
+    Rows carry the all_cells() columns plus `obs_hits` (matching observations)
+    and `last_obs_cycle`. `after` is the last cell_id of the previous page.
+    Returns (rows ordered by cell_id, has_more).
+    """
+    text = text.strip()
+    words = query_words(text)
+    with read_db() as db:
+        dialect = db.get_bind().dialect.name
+        q = cells_select()
+
+        if text:
+            if dialect == "postgresql":
+                id_prefix = func.lower(Cell.cell_id).like(
+                    _escape_like(text.lower()) + "%", escape="\\"
+                )
+            else:
+                id_prefix = Cell.cell_id.like(_escape_like(text) + "%", escape="\\")
+            conditions = [id_prefix]
+            if text.isdigit():
+                conditions.append(Cell.channel == int(text))
+
+            if words:
+                cell_words, cycle_words = _word_filters(dialect, words)
+                conditions.append(cell_words)
+                hits = (
+                    select(
+                        Cycle.cell_id,
+                        func.count().label("obs_hits"),
+                        func.max(Cycle.cycle_no).label("last_obs_cycle"),
+                    )
+                    .where(cycle_words)
+                    .group_by(Cycle.cell_id)
+                    .subquery("hits")
+                )
+                q = q.add_columns(hits.c.obs_hits, hits.c.last_obs_cycle).outerjoin(
+                    hits, hits.c.cell_id == Cell.id
+                )
+                conditions.append(hits.c.cell_id.isnot(None))
+            q = q.where(or_(*conditions))
+
+        if not (text and words):
+            q = q.add_columns(
+                null().label("obs_hits"), null().label("last_obs_cycle")
+            )
+
+        if status:
+            q = q.where(Cell.status == status)
+        if after is not None:
+            q = q.where(Cell.cell_id > after)
+        rows = db.execute(q.order_by(Cell.cell_id).limit(page_size + 1)).all()
+    return rows[:page_size], len(rows) > page_size
@@ -0,0 +1,66 @@
+# services/warmup.py
+"""Background warm-up, once per server process, after the first page renders.
+
+Pages import only what their first render needs (forms like Add Cell never
+load pandas). start() then schedules one daemon thread that, WARMUP_DELAY_S
+later, imports the heavy modules the other pages use, opens the engine's
+first pooled connection and fills the shared query caches, so the next page
+a user opens doesn't pay for any of it.
+
+Nothing here is required: a failure is logged and the pages load what they
+need themselves.
+"""
+import importlib
+import logging
+import threading
+import time
+
+WARMUP_DELAY_S = 1.0  # let the first page finish sending before competing
+MODULES = [
+    "pandas",
+    "pyarrow",  # st.dataframe serialization
+    "PIL.Image",
+    "plotly.graph_objects",
+    "services.importer",
+    "services.derived",
+    "services.curves",
+    "services.cycle_edits",
+    "services.analytics",
+    "services.plotting",
+    "services.search",
+]
+
+logger = logging.getLogger("znbr.warmup")
+_lock = threading.Lock()
+_started = False
+
+
+def _warm(delay: float) -> None:
+    time.sleep(delay)
+    t0 = time.perf_counter()
+    try:
+        for name in MODULES:
+            importlib.import_module(name)
+
+        from database import get_engine
+        from services import queries
+
+        with get_engine().connect() as conn:
+            conn.exec_driver_sql("SELECT 1")  # connect (and TLS) while idle
+        queries.cyclers()
+        queries.all_cells()
+        queries.running_cells()
+    except Exception as e:  # never let the warm-up break the app
+        logger.warning("warm-up stopped: %s", e)
+        return
+    logger.info("warm-up done in %.0f ms", (time.perf_counter() - t0) * 1000)
+
+
+def start(delay: float = WARMUP_DELAY_S) -> None:
+    """Schedule the warm-up; only the first call in a process does anything."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_warm, args=(delay,), name="warmup", daemon=True).start()